@@ -6,61 +6,127 @@ Usage:
   # DOCX -> MD
   python docx_md_roundtrip.py to-md "input.docx" -o out.md --media-dir media
 
+  # Either direction can stream to stdout instead of writing a file
+  python docx_md_roundtrip.py to-md "input.docx" -o - | less
+
+  # Same output, rendered in-process; blocks it can't match exactly still go to pandoc
+  python docx_md_roundtrip.py to-md "input.docx" -o out.md --engine native
+
   # MD -> DOCX (use the original DOCX as reference to keep the exact styles)
   python docx_md_roundtrip.py to-docx out.md -o new.docx --ref "input.docx"
 
+  # Convert a whole tree (or a JSONL manifest) across all cores, with a JSONL report
+  python docx_md_roundtrip.py batch docs/ -o converted/ --ref "input.docx" -j 8
+
+  # Previews of image-heavy documents: placeholder links only, or links to images
+  # that stay in the DOCX until extract-media (or to-docx) needs them
+  python docx_md_roundtrip.py to-md "scan.docx" -o preview.md --images skip
+  python docx_md_roundtrip.py to-md "scan.docx" -o out.md --images lazy
+  python docx_md_roundtrip.py extract-media out.md
+
+  # Translate through the python-services TranslationService; a rerun after editing
+  # the source only sends new or changed text (see <out>.translations.json)
+  python docx_md_roundtrip.py translate "input.docx" -o "input.fr.docx" --to fr
+
+  # Drop exported images that no Markdown under the given paths links to any more
+  python docx_md_roundtrip.py gc-media . --media-dir media --dry-run
+
+  # Any conversion: reuse results from an earlier run with the same input, --ref,
+  # pandoc and tool version (or set DOCX_MD_CACHE_DIR)
+  python docx_md_roundtrip.py to-docx out.md -o new.docx --ref "input.docx" --cache-dir .cache
+
+  # Per-stage timings (duration, bytes in/out, images, styles) as JSON lines on stderr
+  python docx_md_roundtrip.py to-md "input.docx" -o out.md --metrics-out -
+
+Library use (e.g. from a long-lived worker process):
+  warm_up()                                   # probe pandoc, write the Lua filter once
+  md = docx_bytes_to_md(data, Path("media"))  # bytes in, Markdown text out
+  docx = md_bytes_to_docx(md, ref_bytes)      # Markdown in, DOCX bytes out
+  for chunk in stream_docx_to_md(data, Path("media")): ...   # front matter first,
+  for chunk in stream_md_to_docx(md, ref_bytes): ...         # then pandoc's stdout
+  configure_cache(Path(".cache"))             # later conversions in this process are cached
+
+  # On an event loop: pandoc runs as an asyncio subprocess, at most
+  # configure_concurrency(n) at once; cancelling the task kills pandoc
+  md = await async_docx_bytes_to_md(data, Path("media"))
+  docx = await async_md_bytes_to_docx(md, ref_bytes)
+
 Notes:
-- Requires: python-docx, mammoth, pyyaml, and pandoc (CLI) on PATH.
+- Requires: mammoth, pyyaml, and pandoc (CLI) on PATH.
 - Preserves paragraph, character, and table styles via Markdown attributes like:
       {custom-style="Heading 2"}
-- Images export to --media-dir on DOCX -> MD and are re-linked in the MD.
+- --ref documents are compiled once into a styles-only template (see compile_reference),
+  so pandoc does not load their body and media on every MD -> DOCX run.
+- Images export to --media-dir on DOCX -> MD and are re-linked in the MD. File names
+  are content hashes, so converting the same document again reuses the files.
+  Either way images are copied chunk-wise from the package, never read whole.
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import atexit
+import contextlib
+import functools
+import hashlib
+import io
+import json
 import os
+import posixpath
 import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+import unicodedata
 import uuid
+import weakref
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Iterator, Optional, Tuple, Union
 
 import yaml
-from docx import Document
-from docx.enum.style import WD_STYLE_TYPE
 import mammoth
 
+# Part of every cache key: bump when a change to this file changes conversion output.
+__version__ = "1.6.0"
+
 
 # ---------- helpers ----------
 
-def check_pandoc() -> None:
+@functools.lru_cache(maxsize=None)
+def pandoc_version() -> str | None:
+    """Return the installed pandoc version (probed once per process), or None if missing."""
     try:
-        subprocess.run(
+        p = subprocess.run(
             ["pandoc", "--version"],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             check=True,
+            text=True,
         )
+        return p.stdout.splitlines()[0].split()[1]
     except Exception:
+        return None
+
+
+def check_pandoc() -> None:
+    if pandoc_version() is None:
         sys.exit("pandoc not found on PATH. Please install pandoc and try again.")
 
 
 def pandoc_heading_arg() -> str:
     """Return the appropriate pandoc flag for ATX-style headings."""
     try:
-        p = subprocess.run(
-            ["pandoc", "--version"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-            text=True,
-        )
-        version = p.stdout.splitlines()[0].split()[1]
-        major = int(version.split(".")[0])
+        major = int(pandoc_version().split(".")[0])
         if major >= 3:
             return "--markdown-headings=atx"
     except Exception:
@@ -68,6 +134,105 @@ def pandoc_heading_arg() -> str:
     return "--atx-headers"
 
 
+_scratch_dir: Path | None = None
+
+
+def scratch_dir() -> Path:
+    """
+    Per-process directory for pandoc inputs that can be reused across conversions
+    (the Lua filter, metadata files, reference documents). Removed at exit.
+    """
+    global _scratch_dir
+    if _scratch_dir is None:
+        _scratch_dir = Path(tempfile.mkdtemp(prefix="roundtrip-"))
+        atexit.register(shutil.rmtree, _scratch_dir, True)
+    return _scratch_dir
+
+
+def scratch_file(data: bytes, suffix: str) -> Path:
+    """Store data in the scratch dir under its content hash; identical data is written only once."""
+    target = scratch_dir() / f"{hashlib.sha256(data).hexdigest()[:32]}{suffix}"
+    if not target.exists():
+        tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+    return target
+
+
+@functools.lru_cache(maxsize=None)
+def lua_filter_path() -> Path:
+    """Write the Lua filter once per process and return its path."""
+    return write_lua_filter(scratch_dir() / "classes_to_customstyle.lua")
+
+
+def warm_up(
+    cache_dir: Path | None = None,
+    cache_max_bytes: int | None = None,
+    metrics_out: Path | str | None = None,
+    max_pandoc: int | None = None,
+) -> str | None:
+    """
+    Pay the one-off costs of a conversion up front: module imports (already done
+    by importing this file), the pandoc probe and the Lua filter. Used as the
+    initializer of long-lived worker processes; with cache_dir, conversions in this
+    process also go through a ConversionCache there (see configure_cache), with
+    metrics_out they report stage spans (see configure_metrics), and max_pandoc caps
+    the pandoc processes of the async API (see configure_concurrency).
+    """
+    check_pandoc()
+    pandoc_heading_arg()
+    lua_filter_path()
+    if cache_dir is not None:
+        configure_cache(cache_dir, cache_max_bytes)
+    if metrics_out is not None:
+        configure_metrics(metrics_out)
+    if max_pandoc is not None:
+        configure_concurrency(max_pandoc)
+    return pandoc_version()
+
+
+# ---------- metrics ----------
+
+_metrics_out = None  # text stream that receives span lines; None = metrics off
+
+
+def configure_metrics(target: Path | str | None) -> None:
+    """Write stage spans as JSON lines to target: a file (appended), "-" for stderr, or None for off."""
+    global _metrics_out
+    if _metrics_out is not None and _metrics_out is not sys.stderr:
+        _metrics_out.close()
+    if target is None:
+        _metrics_out = None
+    elif str(target) == "-":
+        _metrics_out = sys.stderr
+    else:
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        _metrics_out = open(target, "a", encoding="utf-8", buffering=1)
+
+
+@contextlib.contextmanager
+def span(name: str, **fields):
+    """
+    Time one conversion stage. The yielded dict collects bytes_in, bytes_out,
+    images, styles, ... while the stage runs; on exit it is written as one JSON line
+    with the duration. Stages that stream their output also include the time the
+    consumer spends between chunks.
+    """
+    record = {"span": name, **fields}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as exc:
+        record["error"] = type(exc).__name__
+        raise
+    finally:
+        if _metrics_out is not None:
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            record["pid"] = os.getpid()
+            record["ts"] = round(time.time(), 3)
+            _metrics_out.write(json.dumps(record, ensure_ascii=False) + "\n")  # one write per line: appends don't interleave
+
+
 def slug_token(name: str) -> str:
     """
     Convert a Word style name into a safe token we can round‑trip through HTML classes.
@@ -77,37 +242,120 @@ def slug_token(name: str) -> str:
     return token.strip("_") or "Style"
 
 
-def collect_used_styles(docx_path: Path) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
-    """Return three dicts: {token: original_name} for paragraph, character, table styles used in the document."""
-    doc = Document(str(docx_path))
-    p_styles: Dict[str, str] = {}
-    r_styles: Dict[str, str] = {}
-    t_styles: Dict[str, str] = {}
+DocxSource = Union[Path, BinaryIO]
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_ON = {"1", "true", "on"}
+# Built-in styles whose styles.xml name differs from the name Word shows (same as python-docx).
+_UI_NAMES = {"caption": "Caption", "footer": "Footer", "header": "Header"}
+_UI_NAMES.update({f"heading {i}": f"Heading {i}" for i in range(1, 10)})
 
-    # paragraphs + runs
-    for p in doc.paragraphs:
-        if p.style and p.style.type == WD_STYLE_TYPE.PARAGRAPH:
-            n = p.style.name
-            p_styles.setdefault(slug_token(n), n)
-        for r in p.runs:
-            try:
-                if r.style and r.style.type == WD_STYLE_TYPE.CHARACTER:
-                    n = r.style.name
-                    r_styles.setdefault(slug_token(n), n)
-            except Exception:
-                # Some runs may not expose style cleanly; ignore.
-                pass
 
-    # tables
-    for t in doc.tables:
+def _docx_part_paths(zf: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+    """Return the zip paths of the main document part and its styles part (if any)."""
+    def rel_targets(rels_path: str, base: str) -> Dict[str, str]:
         try:
-            if t.style and t.style.type == WD_STYLE_TYPE.TABLE:
-                n = t.style.name
-                t_styles.setdefault(slug_token(n), n)
-        except Exception:
-            pass
+            root = ET.fromstring(zf.read(rels_path))
+        except KeyError:
+            return {}
+        targets = {}
+        for rel in root.iter(_REL):
+            target = rel.get("Target", "")
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+            targets[rel.get("Type", "").rsplit("/", 1)[-1]] = path
+        return targets
 
-    return p_styles, r_styles, t_styles
+    main = rel_targets("_rels/.rels", "").get("officeDocument", "word/document.xml")
+    base, name = posixpath.split(main)
+    styles = rel_targets(posixpath.join(base, "_rels", name + ".rels"), base).get("styles")
+    return main, styles
+
+
+def _read_style_defs(zf: zipfile.ZipFile, styles_part: Optional[str]) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, str]]:
+    """Return {styleId: (type, name)} and {type: default styleId} from styles.xml."""
+    by_id: Dict[str, Tuple[str, str]] = {}
+    defaults: Dict[str, str] = {}
+    if not styles_part:
+        return by_id, defaults
+    with zf.open(styles_part) as f:
+        for _, el in ET.iterparse(f):
+            if el.tag != _W + "style":
+                continue
+            style_id, style_type = el.get(_W + "styleId"), el.get(_W + "type")
+            name_el = el.find(_W + "name")
+            name = name_el.get(_W + "val") if name_el is not None else None
+            by_id.setdefault(style_id, (style_type, _UI_NAMES.get(name, name)))
+            if style_type and el.get(_W + "default") in _ON:
+                defaults[style_type] = style_id  # last default wins, as in Word
+            el.clear()
+    return by_id, defaults
+
+
+def collect_used_styles(docx: Union[DocxSource, zipfile.ZipFile]) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    """
+    Return three dicts: {token: original_name} for paragraph, character, table styles used in the document.
+
+    Streams word/document.xml once instead of building a full document object model.
+    Like python-docx, only body-level paragraphs (and their direct runs) and tables are
+    considered, and a missing or mismatched style reference resolves to the default style.
+    """
+    if not isinstance(docx, zipfile.ZipFile):
+        with zipfile.ZipFile(docx) as zf:
+            return collect_used_styles(zf)
+
+    zf = docx
+    main_part, styles_part = _docx_part_paths(zf)
+    by_id, defaults = _read_style_defs(zf, styles_part)
+
+    def resolve(style_id: Optional[str], style_type: str) -> Optional[str]:
+        entry = by_id.get(style_id) if style_id is not None else None
+        if entry is None or entry[0] != style_type:
+            entry = by_id.get(defaults.get(style_type))
+        return entry[1] if entry else None
+
+    found = {"paragraph": {}, "character": {}, "table": {}}
+
+    def record(style_id: Optional[str], style_type: str) -> None:
+        name = resolve(style_id, style_type)
+        if name:
+            found[style_type].setdefault(slug_token(name), name)
+
+    # Element paths below <w:body>, e.g. ("p", "r", "rPr", "rStyle").
+    style_refs = {
+        ("p", "pPr", "pStyle"): "paragraph",
+        ("p", "r", "rPr", "rStyle"): "character",
+        ("tbl", "tblPr", "tblStyle"): "table",
+    }
+    stack: list = []
+    path: list = []
+    refs: Dict[str, Optional[str]] = {}
+    with zf.open(main_part) as f:
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                stack.append(el)
+                if len(stack) > 2:  # below <w:document><w:body>
+                    path.append(el.tag[len(_W):] if el.tag.startswith(_W) else el.tag)
+                    kind = style_refs.get(tuple(path))
+                    if kind:
+                        refs[kind] = el.get(_W + "val")
+                continue
+
+            stack.pop()
+            if not path:
+                continue
+            tail = tuple(path)
+            path.pop()
+            if tail == ("p", "r"):
+                record(refs.pop("character", None), "character")
+            elif tail == ("p",):
+                record(refs.pop("paragraph", None), "paragraph")
+            elif tail == ("tbl",):
+                record(refs.pop("table", None), "table")
+            if len(stack) == 2:
+                stack[1].remove(el)  # finished a body-level block; keep memory flat
+
+    return found["paragraph"], found["character"], found["table"]
 
 
 def build_mammoth_style_map(p_styles, r_styles, t_styles) -> str:
@@ -193,23 +441,1200 @@ function Para(el)   el.attr = apply_custom_style(el.attr); return el end
 function Div(el)    el.attr = apply_custom_style(el.attr); return el end
 function Span(el)   el.attr = apply_custom_style(el.attr); return el end
 function Table(el)  el.attr = apply_custom_style(el.attr); return el end
+
+-- Meta must run before the element functions, or style_map is still empty
+return {
+  { Meta = Meta },
+  { Header = Header, Para = Para, Div = Div, Span = Span, Table = Table },
+}
 '''
     dest.write_text(lua, encoding="utf-8")
     return dest
 
 
-def docx_to_md(input_docx: Path, out_md: Path, media_dir: Path) -> Path:
-    check_pandoc()
-    media_dir.mkdir(parents=True, exist_ok=True)
+MEDIA_CHUNK = 1 << 16
+MEDIA_NAME = re.compile(r"img-[0-9a-f]{32}\.[A-Za-z0-9+-]+")
+
+
+def store_media(open_image, media_dir: Path, ext: str) -> Path:
+    """
+    Save an image under a content-hash name (img-<sha256>.<ext>) and return its path.
+    open_image() must return a fresh binary stream each call. The bytes are streamed
+    in chunks: once to hash them and, only if the file is not already there, once more
+    to copy them -- so repeat conversions of a document write nothing.
+    """
+    digest = hashlib.sha256()
+    # IMPORTANT: read inside the context manager (fixes 'closing' object error)
+    with open_image() as src:
+        for chunk in iter(lambda: src.read(MEDIA_CHUNK), b""):
+            digest.update(chunk)
+    target = media_dir / f"img-{digest.hexdigest()[:32]}.{ext}"
+    if target.exists():
+        return target
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    with open_image() as src, tmp.open("wb") as out:
+        shutil.copyfileobj(src, out, MEDIA_CHUNK)
+    os.replace(tmp, target)  # atomic: concurrent writers of the same image both succeed
+    return target
+
+
+# Image modes for DOCX -> Markdown: "extract" copies each image out of the package
+# (store_media), "skip" writes a placeholder link and never opens the image, and
+# "lazy" links lazy-<doc>-<file> names that materialize_media() extracts when needed.
+IMAGE_MODES = ("extract", "skip", "lazy")
+LAZY_DIR = ".lazy"
+LAZY_NAME = re.compile(r"lazy-([0-9a-f]{16})-[^/\\\s()<>]+")
+
+
+def store_lazy_source(source: BinaryIO, media_dir: Path) -> tuple[str, dict | None]:
+    """
+    Make a DOCX available for later extraction and return (id, source record); the id
+    is the first 16 hex digits of its sha256. A DOCX read from a file on disk is not
+    copied: the record holds its path, size, mtime and hash, and images are extracted
+    from it as long as it is still there unchanged. Only a transient stream (bytes,
+    an upload) is copied, content-addressed, to media_dir/.lazy/<id>.docx, and the
+    record is None. source is rewound.
+    """
+    source.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(MEDIA_CHUNK), b""):
+        digest.update(chunk)
+    doc_id = digest.hexdigest()[:16]
+    source.seek(0)
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        st = os.stat(name)
+        return doc_id, {"path": os.path.abspath(name), "sha256": digest.hexdigest(), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    target = media_dir / LAZY_DIR / f"{doc_id}.docx"
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+        with tmp.open("wb") as out:
+            shutil.copyfileobj(source, out, MEDIA_CHUNK)
+        os.replace(tmp, target)
+        source.seek(0)
+    return doc_id, None
+
+
+def _write_lazy_index(media_dir: Path, doc_id: str, members: dict[str, str], source: dict | None) -> None:
+    """media_dir/.lazy/<doc_id>.json: the source record (see store_lazy_source) and each lazy link name's zip member."""
+    index = media_dir / LAZY_DIR / f"{doc_id}.json"
+    index.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index.with_name(f"{index.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps({"source": source, "members": members}, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, index)
+
+
+def _read_lazy_index(media_dir: Path, doc_id: str) -> tuple[dict | None, dict[str, str]]:
+    """(source record, members) of a lazy index; indexes without a record are a bare member map."""
+    index = json.loads((media_dir / LAZY_DIR / f"{doc_id}.json").read_text(encoding="utf-8"))
+    if "members" in index:
+        return index["source"], index["members"]
+    return None, index
+
+
+def _lazy_source(media_dir: Path, doc_id: str, record: dict | None) -> Path | None:
+    """The DOCX to extract doc_id's images from: the recorded file while it is unchanged,
+    else the stored copy; None when neither is available."""
+    if record is not None:
+        path = Path(record["path"])
+        try:
+            st = path.stat()
+        except OSError:
+            st = None
+        if st is not None and (
+            (st.st_size, st.st_mtime_ns) == (record["size"], record["mtime_ns"])
+            or (st.st_size == record["size"] and file_sha256(path) == record["sha256"])  # touched, not edited
+        ):
+            return path
+    copy = media_dir / LAZY_DIR / f"{doc_id}.docx"
+    return copy if copy.exists() else None
+
+
+def materialize_media(media_dir: Path, name: str) -> Path:
+    """
+    Return media_dir/name, extracting it first (streamed, atomically) if it is a
+    lazy link that has not been materialized yet. Raises FileNotFoundError when the
+    name is neither on disk nor known to a lazy index, or its source DOCX has been
+    moved or changed since.
+    """
+    target = media_dir / name
+    m = LAZY_NAME.fullmatch(name)
+    if target.exists() or not m:
+        if not target.exists():
+            raise FileNotFoundError(f"Image not found: {target}")
+        return target
+    try:
+        record, members = _read_lazy_index(media_dir, m.group(1))
+        member = members[name]
+    except (FileNotFoundError, KeyError):
+        raise FileNotFoundError(f"No lazy source for image: {target}") from None
+    source = _lazy_source(media_dir, m.group(1), record)
+    if source is None:
+        raise FileNotFoundError(f"Source DOCX of {target} is gone or changed: {record['path'] if record else 'no copy'}")
+    tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    with zipfile.ZipFile(source) as zf, zf.open(member) as src, tmp.open("wb") as out:
+        shutil.copyfileobj(src, out, MEDIA_CHUNK)
+    os.replace(tmp, target)
+    return target
+
+
+def materialize_lazy_links(md: bytes | str, base_dir: Path = Path(".")) -> list[Path]:
+    """
+    Extract every lazy image a Markdown document links (relative to base_dir) and
+    return their paths. Links whose source is gone are left alone, as pandoc leaves
+    any other missing image.
+    """
+    if isinstance(md, bytes):
+        md = md.decode("utf-8", "replace")
+    paths = []
+    for target in sorted(set(MD_RESOURCE.findall(md))):
+        path = base_dir / target
+        if LAZY_NAME.fullmatch(path.name):
+            try:
+                paths.append(materialize_media(path.parent, path.name))
+            except FileNotFoundError:
+                continue
+    return paths
+
+
+def gc_media(media_dir: Path, md_roots: list[Path], min_age: float = 300.0, dry_run: bool = False) -> list[Path]:
+    """
+    Delete content-addressed images in media_dir that no Markdown file under md_roots
+    references. Only files named like store_media() output or lazy links are
+    considered (plus the .lazy sources no lazy link points at any more), and files
+    younger than min_age seconds are kept so in-flight conversions are not raced.
+    Returns the (would-be) removed paths.
+    """
+    referenced = set()
+    for root in md_roots:
+        files = [root] if root.is_file() else root.rglob("*.md")
+        for md in files:
+            text = md.read_text(encoding="utf-8", errors="replace")
+            referenced.update(MEDIA_NAME.findall(text))
+            referenced.update(m.group(0) for m in LAZY_NAME.finditer(text))
+    lazy_docs = {LAZY_NAME.fullmatch(name).group(1) for name in referenced if name.startswith("lazy-")}
+
+    cutoff = time.time() - min_age
+    removed = []
+    candidates = [f for f in media_dir.glob("img-*") if MEDIA_NAME.fullmatch(f.name)]
+    candidates += [f for f in media_dir.glob("lazy-*") if LAZY_NAME.fullmatch(f.name)]
+    candidates += [f for f in (media_dir / LAZY_DIR).glob("*.*") if f.suffix in (".docx", ".json")]
+    for f in sorted(candidates):
+        if f.name in referenced or (f.parent.name == LAZY_DIR and f.stem in lazy_docs):
+            continue
+        if f.stat().st_mtime > cutoff:
+            continue
+        if not dry_run:
+            f.unlink(missing_ok=True)
+        removed.append(f)
+    return removed
+
+
+# ---------- reference templates ----------
+#
+# pandoc only takes styles, numbering, theme, fonts, settings and the final section
+# properties (with its headers/footers) from --reference-doc, but it loads the whole
+# package to get them. compile_reference() keeps just those parts.
+
+TEMPLATE_DIR = Path(os.environ.get("DOCX_MD_TEMPLATE_DIR") or Path(tempfile.gettempdir()) / "docx_md_roundtrip" / "templates")
+# Relationships of the main document whose targets a template keeps (with everything they link to)
+_TEMPLATE_RELS = {
+    "styles", "stylesWithEffects", "numbering", "theme", "settings", "webSettings", "fontTable",
+    "header", "footer", "footnotes", "endnotes",
+}
+_CT = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+_FINAL_SECTPR = re.compile(rb"<w:sectPr\b(?:(?!<w:sectPr\b).)*?</w:sectPr>\s*</w:body>", re.S)
+
+
+def _rels_part(part: str) -> str:
+    base, name = posixpath.split(part)
+    return posixpath.join(base, "_rels", name + ".rels")
+
+
+def _part_rels(zf: zipfile.ZipFile, part: str) -> list:
+    """(rel element, type, target part or None if external) for each relationship of part."""
+    try:
+        root = ET.fromstring(zf.read(_rels_part(part)))
+    except KeyError:
+        return []
+    base = posixpath.dirname(part)
+    out = []
+    for rel in root.iter(_REL):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External":
+            path = None
+        else:
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        out.append((rel, rel.get("Type", "").rsplit("/", 1)[-1], path))
+    return out
+
+
+def _write_template(src: zipfile.ZipFile, dest: Path) -> None:
+    main, _ = _docx_part_paths(src)
+    names = set(src.namelist())
+
+    main_rels = _part_rels(src, main)
+    kept_rels = [r for r in main_rels if r[1] in _TEMPLATE_RELS and r[2] in names]
+    keep = {"[Content_Types].xml", "_rels/.rels", main, _rels_part(main)}
+    for _, kind, target in _part_rels(src, ""):
+        if target in names and kind != "thumbnail":
+            keep.add(target)  # document properties
+    todo = [target for _, _, target in kept_rels]
+    while todo:  # headers keep their images, fontTable its embedded fonts, ...
+        part = todo.pop()
+        if part in keep:
+            continue
+        keep.add(part)
+        if _rels_part(part) in names:
+            keep.add(_rels_part(part))
+        todo.extend(target for _, _, target in _part_rels(src, part) if target in names)
+
+    # the body shrinks to its final section properties, which refer to headers/footers by id
+    doc = src.read(main)
+    body_start = re.search(rb"<w:body\b[^>]*>", doc)
+    sect = _FINAL_SECTPR.search(doc)
+    if body_start is None:
+        raise ValueError(f"{main} has no w:body")
+    document = doc[: body_start.end()] + (sect.group(0) if sect else b"</w:body>") + b"</w:document>"
+
+    kept_ids = {rel.get("Id") for rel, _, _ in kept_rels}
+    rels_root = ET.fromstring(src.read(_rels_part(main)))
+    for rel in list(rels_root):
+        if rel.get("Id") not in kept_ids:
+            rels_root.remove(rel)
+    ET.register_namespace("", _REL[1:].split("}")[0])
+    rels = ET.tostring(rels_root, encoding="UTF-8", xml_declaration=True)
+
+    types_root = ET.fromstring(src.read("[Content_Types].xml"))
+    for override in list(types_root.iter(_CT + "Override")):
+        if override.get("PartName", "").lstrip("/") not in keep:
+            types_root.remove(override)
+    ET.register_namespace("", _CT[1:-1])
+    types = ET.tostring(types_root, encoding="UTF-8", xml_declaration=True)
+
+    with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as out:
+        for info in src.infolist():
+            if info.filename not in keep:
+                continue
+            if info.filename == main:
+                out.writestr(info, document)
+            elif info.filename == _rels_part(main):
+                out.writestr(info, rels)
+            elif info.filename == "[Content_Types].xml":
+                out.writestr(info, types)
+            else:
+                with src.open(info) as data, out.open(info, "w") as part:
+                    shutil.copyfileobj(data, part, MEDIA_CHUNK)
+
+
+def compile_reference(reference_docx: Path | bytes, template_dir: Path | None = None) -> Path:
+    """
+    Return a styles-only copy of reference_docx for pandoc's --reference-doc:
+    styles, numbering, theme, fonts, settings and the final section properties
+    with its headers and footers, but no body content and no media the body used.
+    Templates are stored under the source's content hash, so each reference
+    document is compiled once.
+    """
+    if isinstance(reference_docx, bytes):
+        digest = hashlib.sha256(reference_docx).hexdigest()
+    else:
+        digest = file_sha256(reference_docx)
+    template_dir = template_dir or TEMPLATE_DIR
+    target = template_dir / f"{digest[:32]}-{__version__}.docx"
+    if target.exists():
+        return target
+
+    template_dir.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    source = io.BytesIO(reference_docx) if isinstance(reference_docx, bytes) else reference_docx
+    try:
+        with zipfile.ZipFile(source) as src:
+            _write_template(src, tmp)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return target
+
+
+# ---------- conversion cache ----------
+
+DEFAULT_CACHE_BYTES = 1 << 30
+# Local files a Markdown document pulls in: images and links pandoc resolves against the cwd
+MD_RESOURCE = re.compile(r"\]\(<?([^)\s>]+)")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(MEDIA_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    Conversion results on disk, keyed by everything that determines them: the input
+    bytes, the direction, the reference document, the pandoc version and this tool's
+    __version__ (see key()). Entries are written atomically (temp file + rename) and
+    evicted least-recently-used once they total more than max_bytes. File mtimes are
+    the LRU clock, so processes sharing a directory (batch workers, ConvertService
+    workers, the CLI) see each other's hits. hits/misses/evictions count this
+    process's lookups.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None) -> None:
+        self.root = Path(root)
+        self.max_bytes = DEFAULT_CACHE_BYTES if max_bytes is None else max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: OrderedDict | None = None  # key -> size, least recently used first
+        self._total = 0
+
+    @staticmethod
+    def key(direction: str, data: bytes, reference_docx: Path | bytes | None = None, *extra: str) -> str:
+        if isinstance(reference_docx, bytes):
+            ref = hashlib.sha256(reference_docx).hexdigest() if reference_docx else ""
+        else:
+            ref = file_sha256(reference_docx) if reference_docx is not None else ""
+        parts = (direction, hashlib.sha256(data).hexdigest(), ref, pandoc_version() or "", __version__, *extra)
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _scan(self) -> None:
+        entries = []
+        for f in self.root.glob("??/*"):
+            if f.name.endswith(".tmp"):
+                continue
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, f.name, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((name, size) for _, name, size in entries)
+        self._total = sum(self._index.values())
+
+    def _forget(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total -= size
+
+    def get(self, key: str, valid=None) -> bytes | None:
+        """Cached bytes for key, or None. valid(data) can reject an entry whose side files are gone."""
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                self._forget(key)
+                self.misses += 1
+                return None
+            if valid is not None and not valid(data):
+                self.misses += 1
+                return None
+            try:
+                os.utime(path)
+            except FileNotFoundError:  # evicted by another process meanwhile; the data is still good
+                pass
+            self._forget(key)
+            self._index[key] = len(data)
+            self._total += len(data)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._forget(key)
+            self._index[key] = len(data)
+            self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        self._scan()  # pick up what other processes wrote and touched since the last scan
+        while self._total > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            self._path(key).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total,
+            }
+
+
+_cache: ConversionCache | None = None
+
+
+def configure_cache(cache_dir: Path | None, max_bytes: int | None = None) -> ConversionCache | None:
+    """Set (or, with None, clear) the cache used by conversions that are not given one explicitly."""
+    global _cache
+    if cache_dir is None:
+        _cache = None
+    elif _cache is None or _cache.root != Path(cache_dir) or (max_bytes is not None and _cache.max_bytes != max_bytes):
+        _cache = ConversionCache(Path(cache_dir), max_bytes)
+    return _cache
+
+
+def _media_present(media_dir: Path):
+    """Cache validator for Markdown: every image it links must still exist, or be extractable."""
+    def valid(data: bytes) -> bool:
+        text = data.decode("utf-8", "replace")
+        names = set(MEDIA_NAME.findall(text))
+        docs = {m.group(1) for m in LAZY_NAME.finditer(text)}
+        return all((media_dir / name).exists() for name in names) and all(_lazy_present(media_dir, doc) for doc in docs)
+    return valid
+
+
+def _lazy_present(media_dir: Path, doc_id: str) -> bool:
+    try:
+        record, _ = _read_lazy_index(media_dir, doc_id)
+    except FileNotFoundError:
+        return False
+    return _lazy_source(media_dir, doc_id, record) is not None
+
+
+def _md_resources_key(md: bytes) -> str:
+    """Digest of the local files a Markdown document references, so edited images invalidate it."""
+    parts = []
+    for target in sorted(set(MD_RESOURCE.findall(md.decode("utf-8", "replace")))):
+        if MEDIA_NAME.fullmatch(Path(target).name) or LAZY_NAME.fullmatch(Path(target).name) or "://" in target or target.startswith(("#", "mailto:")):
+            continue  # content-hash names already pin their bytes
+        path = Path(target)
+        if path.is_file():
+            parts.append(f"{target}={file_sha256(path)}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+MD_FORMAT = "markdown+bracketed_spans+fenced_divs+pipe_tables+header_attributes"
+
+
+def _html_to_markdown_cmd(meta_file: Path) -> list[str]:
+    return [
+        "pandoc",
+        "--from=html",
+        f"--to={MD_FORMAT}",
+        "--wrap=none",
+        pandoc_heading_arg(),
+        f"--metadata-file={meta_file}",
+        f"--lua-filter={lua_filter_path()}",
+    ]
+
+
+def html_to_markdown(html: str, meta_file: Path) -> str:
+    """Run one pandoc HTML -> Markdown pass with the custom-style Lua filter."""
+    p = subprocess.run(_html_to_markdown_cmd(meta_file), input=html.encode("utf-8"), capture_output=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"pandoc HTML->MD failed:\n{p.stderr.decode('utf-8', 'replace')}")
+    return p.stdout.decode("utf-8")
+
+
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _SectionSplitter(HTMLParser):
+    """Collect offsets of top-level start tags named in split_tags."""
+
+    def __init__(self, split_tags) -> None:
+        super().__init__(convert_charrefs=False)
+        self.split_tags = set(split_tags)
+        self.depth = 0
+        self.positions: list = []
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if self.depth == 0 and tag in self.split_tags:
+            self.positions.append(self.getpos())
+        if tag not in _VOID_TAGS:
+            self.depth += 1
+
+    def handle_endtag(self, tag) -> None:
+        if tag not in _VOID_TAGS:
+            self.depth = max(0, self.depth - 1)
+
+
+def split_html_sections(html: str, split_tags=("h1", "h2")) -> list[str]:
+    """
+    Split mammoth's HTML into consecutive pieces, cutting only in front of top-level
+    headings. Pieces concatenate back to the original string.
+    """
+    parser = _SectionSplitter(split_tags)
+    parser.feed(html)
+    parser.close()
+
+    line_starts = [0]
+    for m in re.finditer("\n", html):
+        line_starts.append(m.end())
+    cuts = [line_starts[line - 1] + col for line, col in parser.positions]
+    cuts = [c for c in cuts if c > 0]
+    return [html[a:b] for a, b in zip([0] + cuts, cuts + [len(html)])]
+
+
+_HEADING = re.compile(r"<h[1-6][\s>].*?</h[1-6]>", re.DOTALL)
+_CHUNK_MARK = "docx-md-chunk-starts-here"
+
+
+def html_to_markdown_chunked(html: str, meta_file: Path, workers: int, min_chunk: int = 32 * 1024) -> str:
+    """
+    Same result as html_to_markdown(), but sections are converted by up to `workers`
+    pandoc processes at once and stitched back in order. Neighbouring sections are
+    packed into chunks of at least min_chunk characters so small documents do not
+    pay one pandoc start-up per heading.
+
+    Headings with attributes are printed with their auto identifier, which pandoc
+    numbers against every earlier heading (scope, scope-1, ...). When there are any,
+    each chunk is converted behind a copy of the earlier chunks' headings, whose
+    Markdown is dropped again, so the numbering comes out as in a single pass.
+    """
+    sections = split_html_sections(html)
+    target = max(min_chunk, len(html) // (workers * 2) + 1)
+    chunks: list = []
+    for section in sections:
+        if chunks and len(chunks[-1]) < target:
+            chunks[-1] += section
+        else:
+            chunks.append(section)
+    if len(chunks) <= 1:
+        return html_to_markdown(html, meta_file)
+
+    preambles = [""] * len(chunks)
+    if re.search(r"<h[1-6]\s", html):
+        headings = ""
+        for i, chunk in enumerate(chunks[:-1]):
+            headings += "".join(_HEADING.findall(chunk))
+            preambles[i + 1] = f"{headings}<p>{_CHUNK_MARK}</p>"
+
+    def convert(preamble: str, chunk: str) -> str:
+        if not preamble:
+            return html_to_markdown(chunk, meta_file)
+        return html_to_markdown(preamble + chunk, meta_file).split(f"{_CHUNK_MARK}\n\n", 1)[1]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:  # the work happens in pandoc subprocesses
+        parts = list(pool.map(convert, preambles, chunks))
+    # pandoc ends each part with one newline; blocks inside a part are separated by a blank line
+    return "\n".join(part for part in parts if part)
+
+
+# ---------- native HTML -> Markdown ----------
+#
+# An in-process renderer for the subset of mammoth's HTML that is easy to get
+# byte-for-byte identical to `pandoc --from=html --to=<MD_FORMAT>` plus the Lua
+# filter. Anything outside that subset raises NativeUnsupported; such top-level
+# blocks are converted by one pandoc call and spliced back in, so the result is
+# always the same as the pandoc engine.
+
+ENGINES = ("pandoc", "native")
+
+
+class NativeUnsupported(Exception):
+    """HTML the native engine cannot render exactly like pandoc."""
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(self, tag: str, attrs: dict) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.children: list = []
+
+
+class _TreeBuilder(HTMLParser):
+    """Build a _Node tree and remember where each top-level element starts."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#root", {})
+        self.stack = [self.root]
+        self.starts: list = []
+        self.stray_text = False
+        self.malformed = False  # end tags that do not close the innermost element
+
+    def handle_starttag(self, tag, attrs) -> None:
+        node = _Node(tag, dict(attrs))
+        if len(self.stack) == 1:
+            self.starts.append(self.getpos())
+        self.stack[-1].children.append(node)
+        if tag not in _VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs) -> None:
+        if len(self.stack) == 1:
+            self.starts.append(self.getpos())
+        self.stack[-1].children.append(_Node(tag, dict(attrs)))
+
+    def handle_endtag(self, tag) -> None:
+        if self.stack[-1].tag != tag:
+            self.malformed = True
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data) -> None:
+        if len(self.stack) == 1 and data.strip():
+            self.stray_text = True
+        self.stack[-1].children.append(data)
+
+
+_WS = re.compile(r"[ \t\n\r\f]+")
+_SMART = {"\u2019": "'", "\u2018": "'", "\u201c": '"', "\u201d": '"', "\u2014": "---", "\u2013": "--", "\u2026": "..."}
+_ALWAYS_ESCAPED = set("\\*[]^`|~<>\"'$")
+# Text that pandoc escapes (or not) depending on what follows it at the start of a line.
+_RISKY_LINE_START = re.compile(r"[-+*#>%:=|~(\[!<`'\"{}]|\d+[.)]|[A-Za-z]+[.)]")
+_ATTR_TOKEN = re.compile(r"[\w.:-]+")
+_CONTAINERS = {"strong": "**", "emph": "*", "strike": "~~", "sup": "^", "sub": "~"}
+_INLINE_TAGS = {"strong": "strong", "b": "strong", "em": "emph", "i": "emph", "s": "strike", "del": "strike", "sup": "sup", "sub": "sub"}
+
+
+def _is_plain_char(c: str) -> bool:
+    """Characters whose rendering and column width pandoc treats like ASCII text."""
+    if c.isascii():
+        return c.isprintable()
+    return (
+        unicodedata.category(c)[0] not in "CZM" or c == "\xa0"
+    ) and unicodedata.east_asian_width(c) not in ("W", "F") and len(c.lower()) == 1
+
+
+class _NativeRenderer:
+    """Render mammoth HTML blocks to pandoc-identical Markdown (see module notes above)."""
 
-    # 1) Collect used styles
-    p_styles, r_styles, t_styles = collect_used_styles(input_docx)
+    def __init__(self, style_map: Dict[str, str]) -> None:
+        self.style_map = style_map
+        self.header_ids: set = set()
 
-    # 2) Build Mammoth style map (so HTML gets classes for styles)
-    style_map_text = build_mammoth_style_map(p_styles, r_styles, t_styles)
+    # -- inline tree --
+
+    def inlines(self, nodes) -> list:
+        out: list = []
+        for n in nodes:
+            if isinstance(n, str):
+                for i, part in enumerate(_WS.split(n)):
+                    if i:
+                        out.append(("space",))
+                    if part:
+                        out.append(("str", part))
+                continue
+            tag, attrs = n.tag, n.attrs
+            if tag in _INLINE_TAGS and not attrs:
+                children = self.inlines(n.children)
+                if not children and any(not isinstance(c, str) for c in n.children):
+                    raise NativeUnsupported(f"<{tag}> around empty markup")
+                out.append((_INLINE_TAGS[tag], children))
+            elif tag == "br" and not attrs:
+                out.append(("br",))
+            elif tag == "a" and set(attrs) <= {"href", "id"}:
+                if any(not isinstance(c, str) and c.tag == "a" for c in n.children):
+                    raise NativeUnsupported("nested <a>")  # an HTML parser would close the outer one
+                attr = self.attr(attrs.get("id"), [])
+                if "href" in attrs:
+                    out.append(("link", self.inlines(n.children), attrs["href"] or "", attr))
+                elif attr[0]:
+                    out.append(("span", self.inlines(n.children), attr))
+                else:
+                    raise NativeUnsupported("<a> without href or id")
+            elif tag == "span" and set(attrs) == {"class"}:
+                out.append(("span", self.inlines(n.children), self.attr(None, attrs["class"].split())))
+            elif tag == "img" and set(attrs) <= {"src", "alt"}:
+                alt = self.normalize(self.inlines([attrs.get("alt") or ""]))
+                if alt != self.trim(alt):
+                    raise NativeUnsupported("image alt text with edge spaces")
+                out.append(("image", alt, attrs.get("src") or ""))
+            else:
+                raise NativeUnsupported(f"inline <{tag}>")
+        return self.normalize(out)
+
+    @staticmethod
+    def _merge(out: list, item: tuple) -> None:
+        """Append item the way pandoc's Inlines builder concatenates."""
+        prev = out[-1] if out else None
+        kind = item[0]
+        if prev is None:
+            out.append(item)
+        elif kind == "space" and prev[0] in ("space", "br"):
+            pass
+        elif kind == "br" and prev[0] == "space":
+            out[-1] = item
+        elif kind == "str" and prev[0] == "str":
+            out[-1] = ("str", prev[1] + item[1])
+        elif kind in _CONTAINERS and prev[0] == kind:
+            merged: list = []
+            for child in prev[1] + item[1]:
+                _NativeRenderer._merge(merged, child)
+            out[-1] = (kind, merged)
+        else:
+            out.append(item)
+
+    def normalize(self, items: list) -> list:
+        out: list = []
+        for item in items:
+            if item[0] in ("strong", "emph"):
+                # pandoc's HTML reader moves edge spaces out of emphasis and drops empty ones
+                children = item[1]
+                lead = bool(children) and children[0][0] == "space"
+                trail = bool(children) and children[-1][0] == "space"
+                children = self.trim(children)
+                if lead or (not children and trail):
+                    self._merge(out, ("space",))
+                if children:
+                    self._merge(out, (item[0], children))
+                if trail and children:
+                    self._merge(out, ("space",))
+            else:
+                self._merge(out, item)
+        return out
+
+    @staticmethod
+    def trim(items: list) -> list:
+        start, end = 0, len(items)
+        while start < end and items[start][0] == "space":
+            start += 1
+        while end > start and items[end - 1][0] == "space":
+            end -= 1
+        return items[start:end]
+
+    def attr(self, ident: Optional[str], classes: list, kvs: Optional[list] = None) -> tuple:
+        """(id, classes, key-values) after the Lua filter's class -> custom-style mapping."""
+        classes, kvs = list(classes), list(kvs or [])
+        for i, cls in enumerate(classes):
+            mapped = self.style_map.get(cls)
+            if mapped:
+                kvs.append(("custom-style", str(mapped)))
+                del classes[i]
+                break
+        return (ident or "", classes, kvs)
+
+    # -- inline rendering --
+
+    @staticmethod
+    def escape(text: str, line_start: bool) -> str:
+        if line_start and _RISKY_LINE_START.match(text):
+            raise NativeUnsupported(f"line starts with {text[:8]!r}")
+        if "--" in text or ".." in text or "![" in text or re.search(r"[-\u2013\u2014][-\u2013\u2014]|[.\u2026][.\u2026]", text):
+            raise NativeUnsupported("smart punctuation sequence")
+        out = []
+        for i, c in enumerate(text):
+            if c in _ALWAYS_ESCAPED:
+                out.append("\\" + c)
+            elif c in _SMART:
+                out.append(_SMART[c])
+            elif c == "_":
+                if 0 < i < len(text) - 1 and text[i - 1].isalnum() and text[i + 1].isalnum():
+                    out.append(c)
+                elif 0 < i < len(text) - 1:
+                    out.append("\\_")
+                else:
+                    raise NativeUnsupported("underscore at a text boundary")
+            elif c in "#@" or not _is_plain_char(c):
+                raise NativeUnsupported(f"character {c!r}")
+            else:
+                out.append(c)
+        return "".join(out)
+
+    @staticmethod
+    def render_attr(attr: tuple) -> str:
+        ident, classes, kvs = attr
+        parts = [f"#{ident}"] if ident else []
+        parts += [f".{c}" for c in classes]
+        for k, v in kvs:
+            if '"' in v or "\\" in v:
+                raise NativeUnsupported("attribute value needs escaping")
+            parts.append(f'{k}="{v}"')
+        for token in [ident, *classes, *(k for k, _ in kvs)]:
+            if token and not _ATTR_TOKEN.fullmatch(token):
+                raise NativeUnsupported(f"attribute {token!r}")
+        return "{" + " ".join(parts) + "}" if parts else ""
+
+    @staticmethod
+    def check_url(url: str) -> str:
+        if not url or not url.isascii() or any(c in url for c in " ()<>\"\\`"):
+            raise NativeUnsupported(f"url {url!r}")
+        return url
+
+    def render(self, items: list, line_start: bool = True) -> str:
+        if items and (items[0][0] in ("br", "space") or items[-1][0] in ("br", "space")):
+            raise NativeUnsupported("break or space at the edge of an inline run")
+        out = []
+        prev = None
+        for item in items:
+            kind = item[0]
+            if kind == "str":
+                text = item[1]
+                if prev in ("link", "span", "image") and text[:1] in "{(":
+                    raise NativeUnsupported("text could extend the previous element")
+                out.append(self.escape(text, line_start))
+            elif kind == "space":
+                out.append(" ")
+            elif kind == "br":
+                if prev == "br":
+                    raise NativeUnsupported("consecutive line breaks")
+                out.append("\\\n")
+                line_start = True
+                prev = kind
+                continue
+            elif kind in _CONTAINERS:
+                if kind in ("sup", "sub", "strike") and self.has_space(item[1]):
+                    raise NativeUnsupported(f"{kind} containing spaces")
+                if kind in ("strong", "emph") and any(child[0] == kind for child in item[1]):
+                    raise NativeUnsupported(f"nested {kind}")
+                if not item[1]:
+                    raise NativeUnsupported(f"empty {kind}")
+                delim = _CONTAINERS[kind]
+                out.append(delim + self.render(item[1], False) + delim)
+            elif kind in ("link", "span", "image") and out and out[-1].endswith("!"):
+                raise NativeUnsupported("'!' before a bracket")
+            elif kind == "link":
+                _, children, href, attr = item
+                text = self.stringify(children)
+                if not children or href in (text, "mailto:" + text):
+                    raise NativeUnsupported("autolink or empty link")
+                out.append(f"[{self.render(children, False)}]({self.check_url(href)}){self.render_attr(attr)}")
+            elif kind == "span":
+                _, children, attr = item
+                rendered_attr = self.render_attr(attr)
+                if not rendered_attr:
+                    raise NativeUnsupported("span without attributes")
+                out.append(f"[{self.render(children, False) if children else ''}]{rendered_attr}")
+            elif kind == "image":
+                _, alt, src = item
+                out.append(f"![{self.render(alt, False) if alt else ''}]({self.check_url(src)})")
+            line_start = False
+            prev = kind
+        return "".join(out)
+
+    @classmethod
+    def has_space(cls, items: list) -> bool:
+        """Spaces anywhere below a sup/sub/strike are escaped by pandoc, even inside links."""
+        for item in items:
+            if item[0] in ("space", "br"):
+                return True
+            if item[0] in _CONTAINERS or item[0] in ("link", "span", "image"):
+                if cls.has_space(item[1]):
+                    return True
+        return False
+
+    @classmethod
+    def stringify(cls, items: list) -> str:
+        parts = []
+        for item in items:
+            kind = item[0]
+            if kind == "str":
+                parts.append(item[1])
+            elif kind in ("space", "br"):
+                parts.append(" ")
+            elif kind in _CONTAINERS or kind in ("link", "span", "image"):
+                parts.append(cls.stringify(item[1]))
+        return "".join(parts)
+
+    def auto_identifier(self, items: list) -> str:
+        """pandoc's auto_identifiers algorithm, including the -1, -2 ... de-duplication."""
+        text = "".join(c for c in self.stringify(items).lower() if c.isalnum() or c in "_-. ")
+        ident = "-".join(text.split())
+        while ident and not ident[0].isalpha():
+            ident = ident[1:]
+        ident = ident or "section"
+        if ident in self.header_ids:
+            n = 1
+            while f"{ident}-{n}" in self.header_ids:
+                n += 1
+            ident = f"{ident}-{n}"
+        self.header_ids.add(ident)
+        return ident
+
+    # -- blocks --
+
+    @staticmethod
+    def block_children(node: _Node) -> list:
+        """Element children of a block node; non-blank text between them is unsupported."""
+        children = []
+        for child in node.children:
+            if isinstance(child, str):
+                if child.strip():
+                    raise NativeUnsupported(f"text directly inside <{node.tag}>")
+            else:
+                children.append(child)
+        return children
+
+    def cell(self, node: _Node) -> str:
+        if set(node.attrs):
+            raise NativeUnsupported("cell attributes")
+        children = node.children
+        if any(not isinstance(c, str) and c.tag == "p" for c in children):
+            paras = self.block_children(node)
+            if len(paras) != 1 or paras[0].tag != "p" or paras[0].attrs:
+                raise NativeUnsupported("cell with several blocks")
+            children = paras[0].children
+        items = self.trim(self.inlines(children))
+        return self.render(items) if items else ""
+
+    def table(self, node: _Node) -> str:
+        if set(node.attrs) - {"class"}:
+            raise NativeUnsupported("table attributes")
+        header: Optional[list] = None
+        rows: list = []
+        for part in self.block_children(node):
+            if part.tag == "thead" and header is None and not rows and not part.attrs:
+                trs = self.block_children(part)
+                if len(trs) != 1:
+                    raise NativeUnsupported("multi-row table head")
+                cells = self.block_children(trs[0])
+                if not cells or any(c.tag != "th" for c in cells):
+                    raise NativeUnsupported("table head without th cells")
+                header = [self.cell(c) for c in cells]
+            elif part.tag in ("tbody", "tr") and not part.attrs:
+                for tr in [part] if part.tag == "tr" else self.block_children(part):
+                    cells = self.block_children(tr)
+                    if tr.tag != "tr" or tr.attrs or not cells or any(c.tag != "td" for c in cells):
+                        raise NativeUnsupported("unexpected table row")
+                    rows.append([self.cell(c) for c in cells])
+            else:
+                raise NativeUnsupported(f"table part <{part.tag}>")
+        ncols = len(header) if header else len(rows[0]) if rows else 0
+        if not rows or any(len(r) != ncols or not any(r) for r in rows) or (header is not None and not any(header)):
+            raise NativeUnsupported("irregular table")
+        grid = ([header] if header else []) + rows
+        if any("\n" in c for r in grid for c in r):
+            raise NativeUnsupported("multi-line table cell")
+        widths = [max(len(r[i]) for r in grid) for i in range(ncols)]
+        if not all(widths):
+            raise NativeUnsupported("empty table column")
+        # pandoc simple table: 2-space indent, columns two wider than their content
+        rule = "  " + " ".join("-" * (w + 2) for w in widths)
+        line = lambda r: "  " + " ".join(c.ljust(w + 2) for c, w in zip(r[:-1], widths)) + (" " if ncols > 1 else "") + r[-1]
+        if header:
+            return "\n".join([line(header), rule] + [line(r) for r in rows])
+        return "\n".join([rule] + [line(r) for r in rows] + [rule])
+
+    def list_block(self, node: _Node) -> str:
+        if node.attrs:
+            raise NativeUnsupported("list attributes")
+        lines = []
+        for n, li in enumerate(self.block_children(node), 1):
+            if li.tag != "li" or li.attrs:
+                raise NativeUnsupported("list item")
+            if any(not isinstance(c, str) and c.tag not in _INLINE_TAGS and c.tag not in ("a", "span", "img", "br") for c in li.children):
+                raise NativeUnsupported("block content in list item")
+            items = self.trim(self.inlines(li.children))
+            text = self.render(items) if items else ""
+            if not text or "\n" in text:
+                raise NativeUnsupported("empty or multi-line list item")
+            marker = "-" if node.tag == "ul" else f"{n}.".ljust(3)
+            lines.append(f"{marker} {text}")
+        if not lines:
+            raise NativeUnsupported("empty list")
+        return "\n".join(lines)
+
+    def block(self, node: _Node) -> str:
+        tag = node.tag
+        if tag == "p":
+            if set(node.attrs) - {"class"}:
+                raise NativeUnsupported("paragraph attributes")
+            items = self.trim(self.inlines(node.children))
+            return self.render(items) if items else ""
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            if set(node.attrs) - {"class"}:
+                raise NativeUnsupported("heading attributes")
+            items = self.trim(self.inlines(node.children))
+            if not items or any(item[0] == "br" for item in items):
+                raise NativeUnsupported("empty or multi-line heading")
+            if "{" in self.stringify(items) or "}" in self.stringify(items):
+                raise NativeUnsupported("braces in heading text")
+            text = self.render(items)
+            ident = self.auto_identifier(items)
+            attr = self.attr(ident, node.attrs.get("class", "").split())
+            suffix = " " + self.render_attr(attr) if attr[1] or attr[2] else ""
+            return f"{'#' * int(tag[1])} {text}{suffix}"
+        if tag in ("ul", "ol"):
+            return self.list_block(node)
+        if tag == "table":
+            return self.table(node)
+        if tag == "div" and set(node.attrs) == {"class"}:
+            attr = self.attr(None, node.attrs["class"].split())
+            paras = self.block_children(node)
+            if not paras or any(p.tag != "p" for p in paras):
+                raise NativeUnsupported("div content")
+            body = "\n\n".join(b for b in (self.block(p) for p in paras) if b)
+            if not body:
+                raise NativeUnsupported("empty div")
+            opener = attr[1][0] if len(attr[1]) == 1 and not attr[2] else self.render_attr(attr)
+            return f"::: {opener}\n{body}\n:::"
+        raise NativeUnsupported(f"block <{tag}>")
+
+
+def native_html_to_markdown(html: str, style_map: Dict[str, str], meta_file: Path) -> str:
+    """
+    Pure-Python HTML -> Markdown with the same output as html_to_markdown().
+
+    Top-level blocks the native renderer does not support are batched into a single
+    pandoc run (separated by sentinel paragraphs) and spliced back in order; if a
+    heading is unsupported, or nothing could be rendered natively, the whole document
+    goes to pandoc so header identifiers stay consistent.
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    nodes = [c for c in builder.root.children if not isinstance(c, str)]
+    if builder.stray_text or builder.malformed or len(builder.stack) > 1 or len(nodes) != len(builder.starts):
+        return html_to_markdown(html, meta_file)
+
+    line_starts = [0] + [m.end() for m in re.finditer("\n", html)]
+    offsets = [line_starts[line - 1] + col for line, col in builder.starts] + [len(html)]
+    raw = [html[a:b] for a, b in zip(offsets, offsets[1:])]
+
+    renderer = _NativeRenderer(style_map)
+    rendered: list = []
+    for node in nodes:
+        try:
+            rendered.append(renderer.block(node))
+        except NativeUnsupported:
+            if node.tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                return html_to_markdown(html, meta_file)
+            rendered.append(None)
+    # pandoc separates adjacent lists with "<!-- -->" (empty blocks in between don't
+    # count); let it handle those stretches
+    prev = None
+    for i, node in enumerate(nodes):
+        if rendered[i] == "":
+            continue
+        if prev is not None and nodes[prev].tag in ("ul", "ol") and node.tag in ("ul", "ol"):
+            rendered[prev : i + 1] = [None] * (i + 1 - prev)
+        prev = i
+    if all(r is None for r in rendered):
+        return html_to_markdown(html, meta_file)
+
+    runs: list = []  # [first, last] index of consecutive fallback blocks
+    for i, r in enumerate(rendered):
+        if r is None:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+    if runs:
+        sentinel = f"RTNATIVESPLIT{uuid.uuid4().hex}"
+        joined = f"<p>{sentinel}</p>".join("".join(raw[a : b + 1]) for a, b in runs)
+        parts = re.split(rf"(?m)^{sentinel}$", html_to_markdown(joined, meta_file))
+        if len(parts) != len(runs):
+            return html_to_markdown(html, meta_file)
+        for (a, _), part in zip(runs, parts):
+            rendered[a] = part.strip("\n")
+
+    body = "\n\n".join(r for r in rendered if r)
+    return body + "\n" if body else html_to_markdown(html, meta_file)
+
+
+def stream_pandoc(cmd: list[str], data: bytes, what: str, chunk_size: int = MEDIA_CHUNK) -> Iterator[bytes]:
+    """
+    Run pandoc with data on stdin and yield its stdout as it is produced. Closing the
+    generator early kills pandoc; a non-zero exit raises RuntimeError once the output
+    has been consumed.
+    """
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr: list = []
+
+    def feed() -> None:
+        try:
+            proc.stdin.write(data)
+        except (BrokenPipeError, ValueError):  # pandoc exited (or was killed) early; its exit status tells
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    # stdin and stderr get their own threads so neither pipe can fill up and block pandoc
+    threads = [
+        threading.Thread(target=feed, daemon=True),
+        threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    try:
+        for chunk in iter(lambda: proc.stdout.read(chunk_size), b""):
+            yield chunk
+        proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            proc.wait()
+        for t in threads:
+            t.join()
+        proc.stdout.close()
+        proc.stderr.close()
+    if proc.returncode != 0:
+        raise RuntimeError(f"pandoc {what} failed:\n{b''.join(stderr).decode('utf-8', 'replace')}")
+
+
+def _docx_front_matter(source: BinaryIO, size: int) -> tuple[tuple[dict, dict, dict], str, Path]:
+    """Styles used by the package, the YAML front matter, and the metadata file for the Lua filter."""
+    # 1) Collect used styles: one streaming pass over the package, and the same
+    #    open handle is rewound and handed to mammoth afterwards
+    with span("collect_styles", bytes_in=size) as sp:
+        with zipfile.ZipFile(source) as zf:
+            styles = collect_used_styles(zf)
+        sp["styles"] = sum(len(s) for s in styles)
+    source.seek(0)
+
+    # 2) Prepare metadata (style tokens -> real names) for the Lua filter; it is also
+    #    the YAML header (keeps the mapping in the MD file for future edits), which
+    #    can go out before the slow stages start
+    metadata = {"style_map": {k: v for s in styles for k, v in s.items()}}
+    meta_yaml = yaml.safe_dump(metadata, sort_keys=True, allow_unicode=True)
+    meta_file = scratch_file(meta_yaml.encode("utf-8"), ".yaml")
+    return styles, "---\n" + meta_yaml + "---\n\n", meta_file
+
+
+def _docx_to_html(
+    source: BinaryIO,
+    size: int,
+    styles: tuple[dict, dict, dict],
+    media_dir: Path,
+    link_base: Path,
+    image_mode: str,
+) -> str:
+    # 3) Build Mammoth style map (so HTML gets classes for styles)
+    style_map_text = build_mammoth_style_map(*styles)
+
+    # 4) Convert DOCX -> HTML with mammoth; extract, skip or lazily link images.
+    #    Extracted images are copied chunk-wise from their zip member, so no image is
+    #    ever held in memory whole
+    counts = {"images": 0, "image_bytes": 0, "image_seconds": 0.0}
+    lazy_id, lazy_source = store_lazy_source(source, media_dir) if image_mode == "lazy" else (None, None)
+    lazy_members: dict[str, str] = {}
 
-    # 3) Convert DOCX -> HTML with mammoth; extract images
     def save_image(image):
+        counts["images"] += 1
+        if image_mode == "skip":
+            return {"src": f"#skipped-image-{counts['images']}"}
+        if lazy_id is not None:
+            with image.open() as src:
+                member = src.name if isinstance(src, zipfile.ZipExtFile) else None
+            if member is not None:  # linked (external) images have no member; extract those
+                name = f"lazy-{lazy_id}-{re.sub(r'[^A-Za-z0-9._+-]', '_', member.rsplit('/', 1)[-1])}"
+                lazy_members[name] = member
+                return {"src": Path(os.path.relpath(media_dir / name, link_base)).as_posix()}
+
         # e.g., "image/png"; handle missing content-type safely
         ct = (image.content_type or "image/png").lower()
         ext_map = {
@@ -224,118 +1649,1003 @@ def docx_to_md(input_docx: Path, out_md: Path, media_dir: Path) -> Path:
             "image/x-wmf": "wmf",
         }
         ext = ext_map.get(ct, ct.split("/")[-1] or "png")
-
-        fname = f"img-{uuid.uuid4().hex}.{ext}"
-        target = media_dir / fname
-        target.parent.mkdir(parents=True, exist_ok=True)
-
-        # IMPORTANT: read inside the context manager (fixes 'closing' object error)
-        with image.open() as img_bytes, target.open("wb") as out:
-            out.write(img_bytes.read())
+        start = time.perf_counter()
+        target = store_media(image.open, media_dir, ext)
+        counts["image_seconds"] += time.perf_counter() - start
+        counts["image_bytes"] += target.stat().st_size
 
         # return the relative src used in HTML
-        return {"src": str(Path(os.path.relpath(target, out_md.parent)).as_posix())}
+        return {"src": str(Path(os.path.relpath(target, link_base)).as_posix())}
 
-    with open(input_docx, "rb") as f:
+    with span("mammoth", bytes_in=size) as sp:
         html_result = mammoth.convert_to_html(
-            f,
+            source,
             style_map=style_map_text,
             convert_image=mammoth.images.inline(save_image),
         )
-    html = html_result.value
-
-    # 4) Prepare metadata (style tokens -> real names) for the Lua filter
-    metadata = {"style_map": {**p_styles, **r_styles, **t_styles}}
-    tmpdir = Path(tempfile.mkdtemp(prefix="roundtrip-"))
-    meta_file = tmpdir / "meta.yaml"
-    meta_file.write_text(
-        yaml.safe_dump(metadata, sort_keys=True, allow_unicode=True),
-        encoding="utf-8",
-    )
-    lua_filter = write_lua_filter(tmpdir / "classes_to_customstyle.lua")
+        html = html_result.value
+        sp.update(counts, image_mode=image_mode, bytes_out=len(html), image_seconds=round(counts["image_seconds"], 6))
+    if lazy_members:
+        _write_lazy_index(media_dir, lazy_id, lazy_members, lazy_source)
+    return html
+
+
+def _stream_docx_to_markdown(
+    source: DocxSource,
+    media_dir: Path,
+    link_base: Path,
+    parallel_chunks: int,
+    engine: str,
+    image_mode: str = "extract",
+) -> Iterator[bytes]:
+    if not hasattr(source, "read"):
+        with open(source, "rb") as f:
+            yield from _stream_docx_to_markdown(f, media_dir, link_base, parallel_chunks, engine, image_mode)
+        return
+
+    media_dir.mkdir(parents=True, exist_ok=True)
+    size = source.seek(0, io.SEEK_END)
+    source.seek(0)
+    styles, front_matter, meta_file = _docx_front_matter(source, size)
+    yield front_matter.encode("utf-8")
+    html = _docx_to_html(source, size, styles, media_dir, link_base, image_mode)
 
     # 5) HTML -> Markdown (keep attributes); Lua filter injects custom-style
+    html_bytes = html.encode("utf-8")
+    with span("html_to_md", engine=engine, bytes_in=len(html_bytes), bytes_out=0) as sp:
+        if engine == "native":
+            style_map = {k: v for s in styles for k, v in s.items()}
+            chunks = [native_html_to_markdown(html, style_map, meta_file).encode("utf-8")]
+        elif parallel_chunks > 1:
+            chunks = [html_to_markdown_chunked(html, meta_file, parallel_chunks).encode("utf-8")]
+        else:
+            chunks = stream_pandoc(_html_to_markdown_cmd(meta_file), html_bytes, "HTML->MD")
+        for chunk in chunks:
+            sp["bytes_out"] += len(chunk)
+            yield chunk
+
+
+def docx_to_markdown(
+    source: DocxSource,
+    media_dir: Path,
+    link_base: Path,
+    parallel_chunks: int = 0,
+    engine: str = "pandoc",
+    image_mode: str = "extract",
+) -> str:
+    """
+    Convert a DOCX (path or binary stream) to Markdown text, YAML front matter included.
+    Images are written to media_dir and linked relative to link_base. With
+    parallel_chunks > 1 the HTML -> Markdown stage runs that many pandoc processes
+    over h1/h2 sections (see html_to_markdown_chunked); engine="native" renders it
+    in-process (see native_html_to_markdown). The output is the same either way.
+    image_mode is one of IMAGE_MODES.
+    """
+    _check_modes(engine, image_mode)
+    return b"".join(_stream_docx_to_markdown(source, media_dir, link_base, parallel_chunks, engine, image_mode)).decode("utf-8")
+
+
+def _check_modes(engine: str, image_mode: str) -> None:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    if image_mode not in IMAGE_MODES:
+        raise ValueError(f"Unknown image mode {image_mode!r}; expected one of {', '.join(IMAGE_MODES)}")
+
+
+def _to_md_key(cache: ConversionCache, data: bytes, media_dir: Path, link_base: Path, image_mode: str = "extract") -> str:
+    # image links are written relative to link_base, so that is part of the result too
+    return cache.key("to-md", data, None, Path(os.path.relpath(media_dir, link_base)).as_posix(), image_mode)
+
+
+def stream_docx_to_md(
+    source: DocxSource | bytes,
+    media_dir: Path,
+    link_base: Path = Path("."),
+    parallel_chunks: int = 0,
+    engine: str = "pandoc",
+    cache: ConversionCache | None = None,
+    image_mode: str = "extract",
+) -> Iterator[bytes]:
+    """
+    DOCX -> Markdown as UTF-8 chunks: the YAML front matter first, then pandoc's
+    stdout as it arrives, so a caller can pipe a large document to a file or an
+    HTTP response without holding all of it. A cache hit (default cache: the one set
+    by configure_cache) comes in one piece; a miss is stored once fully streamed.
+    """
+    check_pandoc()
+    _check_modes(engine, image_mode)
+    cache = cache if cache is not None else _cache
+    with span("docx_to_md", bytes_in=None, bytes_out=0) as total:
+        hit = None
+        if cache is None:
+            if isinstance(source, bytes):
+                total["bytes_in"], source = len(source), io.BytesIO(source)
+            elif not hasattr(source, "read"):
+                total["bytes_in"] = os.path.getsize(source)
+            chunks = _stream_docx_to_markdown(source, media_dir, link_base, parallel_chunks, engine, image_mode)
+        else:
+            if isinstance(source, bytes):
+                data = source
+            elif hasattr(source, "read"):
+                data = source.read()
+            else:
+                data = Path(source).read_bytes()
+            total["bytes_in"] = len(data)
+            with span("cache_lookup", bytes_in=len(data)) as sp:
+                key = _to_md_key(cache, data, media_dir, link_base, image_mode)
+                hit = cache.get(key, _media_present(media_dir))
+                sp["hit"] = hit is not None
+            total["cache"] = "miss" if hit is None else "hit"
+            chunks = [hit] if hit is not None else _stream_docx_to_markdown(io.BytesIO(data), media_dir, link_base, parallel_chunks, engine, image_mode)
+
+        parts = []
+        for chunk in chunks:
+            total["bytes_out"] += len(chunk)
+            if cache is not None and hit is None:
+                parts.append(chunk)
+            yield chunk
+        if cache is not None and hit is None:
+            with span("cache_store", bytes_in=total["bytes_out"]):
+                cache.put(key, b"".join(parts))
+
+
+def docx_to_md(
+    input_docx: Path,
+    out_md: Path,
+    media_dir: Path,
+    parallel_chunks: int = 0,
+    engine: str = "pandoc",
+    cache: ConversionCache | None = None,
+    link_base: Path | None = None,
+    image_mode: str = "extract",
+) -> Path:
+    """Stream the Markdown into out_md (atomically replaced); images link relative to its directory by default."""
     out_md.parent.mkdir(parents=True, exist_ok=True)
-    cmd = [
+    link_base = out_md.parent if link_base is None else link_base
+    tmp = out_md.with_name(f"{out_md.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as out:
+            for chunk in stream_docx_to_md(input_docx, media_dir, link_base, parallel_chunks, engine, cache, image_mode):
+                out.write(chunk)
+        os.replace(tmp, out_md)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return out_md
+
+
+def docx_bytes_to_md(
+    data: bytes,
+    media_dir: Path,
+    link_base: Path = Path("."),
+    parallel_chunks: int = 0,
+    engine: str = "pandoc",
+    cache: ConversionCache | None = None,
+    image_mode: str = "extract",
+) -> str:
+    """
+    In-memory DOCX -> Markdown; no temp files besides the extracted images. Goes
+    through cache (default: the one set by configure_cache) when there is one.
+    """
+    return b"".join(stream_docx_to_md(data, media_dir, link_base, parallel_chunks, engine, cache, image_mode)).decode("utf-8")
+
+
+def _reference_arg(reference_docx: Path | bytes | None) -> list[str]:
+    if reference_docx is None or reference_docx == b"":
+        return []
+    # ensure the reference file exists (nicer error than pandoc's)
+    if not isinstance(reference_docx, bytes) and not Path(reference_docx).exists():
+        raise FileNotFoundError(f"Reference DOCX not found: {reference_docx}")
+    try:
+        return [f"--reference-doc={compile_reference(reference_docx)}"]
+    except (zipfile.BadZipFile, KeyError, ValueError, ET.ParseError):
+        pass  # not a package we can slim down; let pandoc read (or reject) it as is
+    if isinstance(reference_docx, bytes):
+        return [f"--reference-doc={scratch_file(reference_docx, '.docx')}"]
+    return [f"--reference-doc={reference_docx}"]
+
+
+def _md_to_docx_cmd(reference_docx: Path | bytes | None) -> list[str]:
+    return [
         "pandoc",
-        "--from=html",
-        "--to=markdown+bracketed_spans+fenced_divs+pipe_tables+header_attributes",
+        f"--from={MD_FORMAT}",
+        "--to=docx",
         "--wrap=none",
-        pandoc_heading_arg(),
-        f"--metadata-file={meta_file}",
-        f"--lua-filter={lua_filter}",
-        "-o",
-        str(out_md),
+        f"--lua-filter={lua_filter_path()}",
+        *_reference_arg(reference_docx),
     ]
-    p = subprocess.run(cmd, input=html, text=True, capture_output=True)
-    if p.returncode != 0:
-        raise RuntimeError(f"pandoc HTML->MD failed:\n{p.stderr}")
 
-    # 6) Prepend YAML header (keeps the mapping in the MD file for future edits)
-    md_text = out_md.read_text(encoding="utf-8")
-    front_matter = "---\n" + yaml.safe_dump(metadata, sort_keys=True, allow_unicode=True) + "---\n\n"
-    out_md.write_text(front_matter + md_text, encoding="utf-8")
 
-    shutil.rmtree(tmpdir, ignore_errors=True)
+def md_to_docx(
+    in_md: Path,
+    out_docx: Path,
+    reference_docx: Path | None = None,
+    cache: ConversionCache | None = None,
+) -> Path:
+    """Stream the DOCX into out_docx (atomically replaced); see stream_md_to_docx."""
+    tmp = out_docx.with_name(f"{out_docx.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as out:
+            for chunk in stream_md_to_docx(in_md.read_bytes(), reference_docx, cache):
+                out.write(chunk)
+        os.replace(tmp, out_docx)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return out_docx
+
+
+CUSTOM_STYLE = re.compile(r'custom-style="([^"]+)"')
+
+
+def stream_md_to_docx(
+    md: bytes | str,
+    reference_docx: Path | bytes | None = None,
+    cache: ConversionCache | None = None,
+) -> Iterator[bytes]:
+    """
+    Markdown -> DOCX bytes as they come out of pandoc's stdout (`-o -`), for piping
+    to a file or an HTTP response. Goes through cache (default: the one set by
+    configure_cache) when there is one.
+    """
+    check_pandoc()
+    if isinstance(md, str):
+        md = md.encode("utf-8")
+    cache = cache if cache is not None else _cache
+    materialize_lazy_links(md)  # pandoc resolves image links relative to the working directory
+    styles = len(set(CUSTOM_STYLE.findall(md.decode("utf-8", "replace"))))
+    with span("md_to_docx", bytes_in=len(md), bytes_out=0, styles=styles) as total:
+        hit = None
+        if cache is not None:
+            with span("cache_lookup", bytes_in=len(md)) as sp:
+                key = cache.key("to-docx", md, reference_docx, _md_resources_key(md))
+                hit = cache.get(key)
+                sp["hit"] = hit is not None
+            total["cache"] = "miss" if hit is None else "hit"
+        if hit is not None:
+            total["bytes_out"] = len(hit)
+            yield hit
+            return
+
+        with span("reference", ref=None if reference_docx is None else "bytes" if isinstance(reference_docx, bytes) else str(reference_docx)):
+            cmd = _md_to_docx_cmd(reference_docx) + ["-o", "-"]
+        parts = []
+        with span("pandoc_md_to_docx", bytes_in=len(md), bytes_out=0) as sp:
+            for chunk in stream_pandoc(cmd, md, "MD->DOCX"):
+                sp["bytes_out"] += len(chunk)
+                total["bytes_out"] += len(chunk)
+                if cache is not None:
+                    parts.append(chunk)
+                yield chunk
+        if cache is not None:
+            with span("cache_store", bytes_in=total["bytes_out"]):
+                cache.put(key, b"".join(parts))
+
+
+def md_bytes_to_docx(
+    md: bytes | str,
+    reference_docx: Path | bytes | None = None,
+    cache: ConversionCache | None = None,
+) -> bytes:
+    """
+    In-memory Markdown -> DOCX; pandoc reads stdin and writes the package to stdout.
+    Goes through cache (default: the one set by configure_cache) when there is one.
+    """
+    return b"".join(stream_md_to_docx(md, reference_docx, cache))
+
+
+# ---------- asyncio API ----------
+#
+# For callers on an event loop (grpc.aio, FastAPI): pandoc runs as an asyncio
+# subprocess, so the loop keeps serving other requests while it works, and the
+# in-process stages (style scan, mammoth, the native renderer) run in a worker
+# thread. Cancelling the awaiting task kills its pandoc process.
+
+DEFAULT_MAX_PANDOC = os.cpu_count() or 1
+
+
+def _default_max_pandoc() -> int:
+    return int(os.environ.get("DOCX_MD_MAX_PANDOC") or DEFAULT_MAX_PANDOC)
+
+
+_max_pandoc = _default_max_pandoc()
+_pandoc_slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # event loop -> Semaphore
+
+
+def configure_concurrency(max_pandoc: int | None) -> int:
+    """
+    Cap the pandoc processes the async API runs at once, per event loop (default:
+    $DOCX_MD_MAX_PANDOC, else the CPU count); None restores the default, a cap below
+    1 is a ValueError. Conversions beyond the cap wait for a slot. Returns the cap in
+    effect.
+    """
+    global _max_pandoc
+    if max_pandoc is not None and max_pandoc < 1:
+        raise ValueError(f"max_pandoc must be at least 1, got {max_pandoc}")
+    _max_pandoc = max(1, _default_max_pandoc()) if max_pandoc is None else max_pandoc
+    _pandoc_slots.clear()  # conversions holding a slot release it on the old semaphore
+    return _max_pandoc
+
+
+def _pandoc_slot() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _pandoc_slots.get(loop)
+    if slots is None:
+        slots = _pandoc_slots[loop] = asyncio.Semaphore(_max_pandoc)
+    return slots
+
+
+async def async_stream_pandoc(cmd: list[str], data: bytes, what: str, chunk_size: int = MEDIA_CHUNK) -> AsyncIterator[bytes]:
+    """
+    stream_pandoc for the event loop: waits for a slot (see configure_concurrency),
+    then yields pandoc's stdout as it is produced. Cancellation, or closing the
+    generator early (aclose), kills pandoc and frees the slot; a non-zero exit raises
+    RuntimeError once the output has been consumed.
+    """
+    async with _pandoc_slot():
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+
+        async def feed() -> None:
+            try:
+                proc.stdin.write(data)
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):  # pandoc exited (or was killed) early
+                pass
+            finally:
+                proc.stdin.close()
+
+        # stdin and stderr are serviced concurrently so neither pipe can fill up and block pandoc
+        feeder = asyncio.create_task(feed())
+        errors = asyncio.create_task(proc.stderr.read())
+        try:
+            while chunk := await proc.stdout.read(chunk_size):
+                yield chunk
+            await proc.wait()
+            stderr = await errors
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            for task in (feeder, errors):
+                task.cancel()
+            await asyncio.gather(feeder, errors, return_exceptions=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"pandoc {what} failed:\n{stderr.decode('utf-8', 'replace')}")
+
+
+async def _read_source(source: DocxSource | bytes) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    if hasattr(source, "read"):
+        return await asyncio.to_thread(source.read)
+    return await asyncio.to_thread(Path(source).read_bytes)
+
+
+async def _async_stream_docx_to_markdown(
+    data: bytes,
+    media_dir: Path,
+    link_base: Path,
+    engine: str,
+    image_mode: str,
+) -> AsyncIterator[bytes]:
+    media_dir.mkdir(parents=True, exist_ok=True)
+    source = io.BytesIO(data)
+    styles, front_matter, meta_file = await asyncio.to_thread(_docx_front_matter, source, len(data))
+    yield front_matter.encode("utf-8")
+    html = await asyncio.to_thread(_docx_to_html, source, len(data), styles, media_dir, link_base, image_mode)
+
+    html_bytes = html.encode("utf-8")
+    with span("html_to_md", engine=engine, bytes_in=len(html_bytes), bytes_out=0) as sp:
+        if engine == "native":
+            style_map = {k: v for s in styles for k, v in s.items()}
+            markdown = await asyncio.to_thread(native_html_to_markdown, html, style_map, meta_file)
+            sp["bytes_out"] = len(markdown.encode("utf-8"))
+            yield markdown.encode("utf-8")
+            return
+        async for chunk in async_stream_pandoc(_html_to_markdown_cmd(meta_file), html_bytes, "HTML->MD"):
+            sp["bytes_out"] += len(chunk)
+            yield chunk
+
+
+async def async_stream_docx_to_md(
+    source: DocxSource | bytes,
+    media_dir: Path,
+    link_base: Path = Path("."),
+    engine: str = "pandoc",
+    cache: ConversionCache | None = None,
+    image_mode: str = "extract",
+) -> AsyncIterator[bytes]:
+    """
+    Async stream_docx_to_md: the same chunks, cache and spans. Use
+    contextlib.aclosing() when a caller may stop early, so pandoc is killed at once
+    instead of when the generator is garbage-collected.
+    """
+    check_pandoc()
+    _check_modes(engine, image_mode)
+    cache = cache if cache is not None else _cache
+    data = await _read_source(source)
+    with span("docx_to_md", bytes_in=len(data), bytes_out=0) as total:
+        hit = None
+        if cache is not None:
+            with span("cache_lookup", bytes_in=len(data)) as sp:
+                key = _to_md_key(cache, data, media_dir, link_base, image_mode)
+                hit = await asyncio.to_thread(cache.get, key, _media_present(media_dir))
+                sp["hit"] = hit is not None
+            total["cache"] = "miss" if hit is None else "hit"
+        if hit is not None:
+            total["bytes_out"] = len(hit)
+            yield hit
+            return
+
+        parts = []
+        async with contextlib.aclosing(_async_stream_docx_to_markdown(data, media_dir, link_base, engine, image_mode)) as chunks:
+            async for chunk in chunks:
+                total["bytes_out"] += len(chunk)
+                if cache is not None:
+                    parts.append(chunk)
+                yield chunk
+        if cache is not None:
+            with span("cache_store", bytes_in=total["bytes_out"]):
+                await asyncio.to_thread(cache.put, key, b"".join(parts))
+
+
+async def async_docx_bytes_to_md(
+    data: bytes,
+    media_dir: Path,
+    link_base: Path = Path("."),
+    engine: str = "pandoc",
+    cache: ConversionCache | None = None,
+    image_mode: str = "extract",
+) -> str:
+    """Async docx_bytes_to_md."""
+    return b"".join([chunk async for chunk in async_stream_docx_to_md(data, media_dir, link_base, engine, cache, image_mode)]).decode("utf-8")
+
+
+async def async_docx_to_md(
+    input_docx: Path,
+    out_md: Path,
+    media_dir: Path,
+    engine: str = "pandoc",
+    cache: ConversionCache | None = None,
+    link_base: Path | None = None,
+    image_mode: str = "extract",
+) -> Path:
+    """Async docx_to_md: streams the Markdown into out_md (atomically replaced)."""
+    out_md.parent.mkdir(parents=True, exist_ok=True)
+    link_base = out_md.parent if link_base is None else link_base
+    tmp = out_md.with_name(f"{out_md.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as out:
+            async with contextlib.aclosing(async_stream_docx_to_md(input_docx, media_dir, link_base, engine, cache, image_mode)) as chunks:
+                async for chunk in chunks:
+                    out.write(chunk)
+        os.replace(tmp, out_md)
+    finally:
+        tmp.unlink(missing_ok=True)
     return out_md
 
 
-def md_to_docx(in_md: Path, out_docx: Path, reference_docx: Path | None = None) -> Path:
+async def async_stream_md_to_docx(
+    md: bytes | str,
+    reference_docx: Path | bytes | None = None,
+    cache: ConversionCache | None = None,
+) -> AsyncIterator[bytes]:
+    """Async stream_md_to_docx; see async_stream_docx_to_md about stopping early."""
     check_pandoc()
+    if isinstance(md, str):
+        md = md.encode("utf-8")
+    cache = cache if cache is not None else _cache
+    await asyncio.to_thread(materialize_lazy_links, md)
+    styles = len(set(CUSTOM_STYLE.findall(md.decode("utf-8", "replace"))))
+    with span("md_to_docx", bytes_in=len(md), bytes_out=0, styles=styles) as total:
+        hit = None
+        if cache is not None:
+            with span("cache_lookup", bytes_in=len(md)) as sp:
+                key = await asyncio.to_thread(lambda: cache.key("to-docx", md, reference_docx, _md_resources_key(md)))
+                hit = await asyncio.to_thread(cache.get, key)
+                sp["hit"] = hit is not None
+            total["cache"] = "miss" if hit is None else "hit"
+        if hit is not None:
+            total["bytes_out"] = len(hit)
+            yield hit
+            return
 
-    tmpdir = Path(tempfile.mkdtemp(prefix="roundtrip-"))
-    lua_filter = write_lua_filter(tmpdir / "classes_to_customstyle.lua")
+        with span("reference", ref=None if reference_docx is None else "bytes" if isinstance(reference_docx, bytes) else str(reference_docx)):
+            cmd = await asyncio.to_thread(_md_to_docx_cmd, reference_docx) + ["-o", "-"]
+        parts = []
+        with span("pandoc_md_to_docx", bytes_in=len(md), bytes_out=0) as sp:
+            async with contextlib.aclosing(async_stream_pandoc(cmd, md, "MD->DOCX")) as chunks:
+                async for chunk in chunks:
+                    sp["bytes_out"] += len(chunk)
+                    total["bytes_out"] += len(chunk)
+                    if cache is not None:
+                        parts.append(chunk)
+                    yield chunk
+        if cache is not None:
+            with span("cache_store", bytes_in=total["bytes_out"]):
+                await asyncio.to_thread(cache.put, key, b"".join(parts))
 
-    cmd = [
-        "pandoc",
-        str(in_md),
-        "--from=markdown+bracketed_spans+fenced_divs+pipe_tables+header_attributes",
-        "--to=docx",
-        "--wrap=none",
-        f"--lua-filter={lua_filter}",
-        "-o",
-        str(out_docx),
-    ]
-    if reference_docx:
-        # ensure the reference file exists (nicer error than pandoc's)
-        if not Path(reference_docx).exists():
-            shutil.rmtree(tmpdir, ignore_errors=True)
-            raise FileNotFoundError(f"Reference DOCX not found: {reference_docx}")
-        cmd.insert(-2, f"--reference-doc={reference_docx}")  # before -o
-
-    p = subprocess.run(cmd, capture_output=True, text=True)
-    if p.returncode != 0:
-        shutil.rmtree(tmpdir, ignore_errors=True)
-        raise RuntimeError(f"pandoc MD->DOCX failed:\n{p.stderr}")
 
-    shutil.rmtree(tmpdir, ignore_errors=True)
+async def async_md_bytes_to_docx(
+    md: bytes | str,
+    reference_docx: Path | bytes | None = None,
+    cache: ConversionCache | None = None,
+) -> bytes:
+    """Async md_bytes_to_docx."""
+    return b"".join([chunk async for chunk in async_stream_md_to_docx(md, reference_docx, cache)])
+
+
+async def async_md_to_docx(
+    in_md: Path,
+    out_docx: Path,
+    reference_docx: Path | None = None,
+    cache: ConversionCache | None = None,
+) -> Path:
+    """Async md_to_docx: streams the DOCX into out_docx (atomically replaced)."""
+    md = await asyncio.to_thread(in_md.read_bytes)
+    tmp = out_docx.with_name(f"{out_docx.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as out:
+            async with contextlib.aclosing(async_stream_md_to_docx(md, reference_docx, cache)) as chunks:
+                async for chunk in chunks:
+                    out.write(chunk)
+        os.replace(tmp, out_docx)
+    finally:
+        tmp.unlink(missing_ok=True)
     return out_docx
 
 
+# ---------- translation ----------
+#
+# translate_docx() converts to Markdown, parses the body into pandoc's AST and
+# sends only the text runs (consecutive words between formatting boundaries) to
+# the translator; custom-style attributes, link targets, images, code and table
+# structure never leave the tree. Finished segments are kept in a JSON sidecar
+# next to the output, so after an edit only new or changed runs are translated.
+
+TRANSLATION_SIDECAR_VERSION = 1
+TRANSLATE_BATCH_SIZE = 64
+_UNTRANSLATED = {"Image", "Code", "CodeBlock", "RawInline", "RawBlock", "Math"}
+_TEXT_NODES = {"Str", "Space", "SoftBreak"}
+
+SegmentTranslator = Callable[[list[str], str], list[str]]
+
+
+def split_front_matter(md: str) -> Tuple[str, str]:
+    """(YAML front matter block including its fences, body); the front matter is '' if absent."""
+    if md.startswith("---\n"):
+        end = md.find("\n---\n", 4)
+        if end != -1:
+            end += len("\n---\n")
+            while md.startswith("\n", end):
+                end += 1
+            return md[:end], md[end:]
+    return "", md
+
+
+def _text_runs(node, runs: list) -> None:
+    """Append (inline list, start, end, text) for every text run below node, in document order."""
+    if isinstance(node, dict):
+        if node.get("t") not in _UNTRANSLATED:
+            _text_runs(node.get("c"), runs)
+        return
+    if not isinstance(node, list):
+        return
+    i = 0
+    while i < len(node):
+        if not (isinstance(node[i], dict) and node[i].get("t") in _TEXT_NODES):
+            _text_runs(node[i], runs)
+            i += 1
+            continue
+        start = i
+        while i < len(node) and isinstance(node[i], dict) and node[i].get("t") in _TEXT_NODES:
+            i += 1
+        end = i
+        while start < end and node[start]["t"] != "Str":  # leading/trailing spaces stay in place
+            start += 1
+        while end > start and node[end - 1]["t"] != "Str":
+            end -= 1
+        text = "".join(n["c"] if n["t"] == "Str" else " " for n in node[start:end])
+        if any(c.isalpha() for c in text):
+            runs.append((node, start, end, text))
+
+
+def _text_nodes(text: str) -> list:
+    return [{"t": "Space"} if part.isspace() else {"t": "Str", "c": part} for part in re.split(r"(\s+)", text.strip()) if part]
+
+
+def segment_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_translation_sidecar(path: Path | None, target_language: str) -> dict[str, str]:
+    """Remembered translations (segment key -> text) for target_language; {} if none."""
+    if path is None or not path.exists():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != TRANSLATION_SIDECAR_VERSION or data.get("target_language") != target_language:
+        return {}
+    return {key: entry["translation"] for key, entry in data.get("segments", {}).items()}
+
+
+def save_translation_sidecar(path: Path, target_language: str, translations: dict[str, str]) -> None:
+    """Write the sidecar atomically: one entry per distinct source segment of the document."""
+    data = {
+        "version": TRANSLATION_SIDECAR_VERSION,
+        "target_language": target_language,
+        "segments": {segment_key(s): {"source": s, "translation": translations[s]} for s in translations},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_text(json.dumps(data, indent=1, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def translate_segments(
+    segments: list[str],
+    target_language: str,
+    translator: SegmentTranslator,
+    batch_size: int = TRANSLATE_BATCH_SIZE,
+    workers: int = 4,
+) -> dict[str, str]:
+    """Translate distinct segments in batches of batch_size, up to workers batches at a time."""
+    batches = [segments[i:i + batch_size] for i in range(0, len(segments), batch_size)]
+    done: dict[str, str] = {}
+    if not batches:
+        return done
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        futures = {pool.submit(translator, batch, target_language): batch for batch in batches}
+        for fut in as_completed(futures):
+            batch, results = futures[fut], fut.result()
+            if len(results) != len(batch):
+                raise RuntimeError(f"translator returned {len(results)} segments for {len(batch)}")
+            done.update(zip(batch, results))
+    return done
+
+
+def translate_markdown(
+    md: str,
+    target_language: str,
+    translator: SegmentTranslator,
+    known: dict[str, str] | None = None,
+    batch_size: int = TRANSLATE_BATCH_SIZE,
+    workers: int = 4,
+) -> Tuple[str, dict[str, str], dict]:
+    """
+    Translate the text runs of Markdown written by docx_to_markdown. known maps
+    segment_key(source) to a translation from an earlier run; only the other
+    segments go to translator. Returns (Markdown, translation of every distinct
+    segment by source text, counts). The front matter is kept verbatim.
+    """
+    check_pandoc()
+    front_matter, body = split_front_matter(md)
+    with span("translate", bytes_in=len(md)) as sp:
+        p = subprocess.run(["pandoc", f"--from={MD_FORMAT}", "--to=json"], input=body.encode("utf-8"), capture_output=True)
+        if p.returncode != 0:
+            raise RuntimeError(f"pandoc MD->JSON failed:\n{p.stderr.decode('utf-8', 'replace')}")
+        ast = json.loads(p.stdout)
+        runs: list = []
+        _text_runs(ast["blocks"], runs)
+        distinct = list(dict.fromkeys(text for *_, text in runs))
+        known = known or {}
+        translations = {s: known[segment_key(s)] for s in distinct if segment_key(s) in known}
+        misses = [s for s in distinct if s not in translations]
+        translations.update(translate_segments(misses, target_language, translator, batch_size, workers))
+        for node, start, end, text in reversed(runs):  # later runs first, so earlier indices stay valid
+            node[start:end] = _text_nodes(translations[text])
+        p = subprocess.run(
+            ["pandoc", "--from=json", f"--to={MD_FORMAT}", "--wrap=none", pandoc_heading_arg()],
+            input=json.dumps(ast).encode("utf-8"),
+            capture_output=True,
+        )
+        if p.returncode != 0:
+            raise RuntimeError(f"pandoc JSON->MD failed:\n{p.stderr.decode('utf-8', 'replace')}")
+        counts = {"segments": len(runs), "distinct": len(distinct), "reused": len(distinct) - len(misses), "translated": len(misses)}
+        sp.update(counts, bytes_out=len(p.stdout))
+    return front_matter + p.stdout.decode("utf-8"), translations, counts
+
+
+def translate_docx(
+    input_docx: Path,
+    out_docx: Path,
+    target_language: str,
+    translator: SegmentTranslator,
+    media_dir: Path = Path("media"),
+    sidecar: Path | None = None,
+    out_md: Path | None = None,
+    reference_docx: Path | None = None,
+    batch_size: int = TRANSLATE_BATCH_SIZE,
+    workers: int = 4,
+) -> dict:
+    """
+    DOCX -> Markdown -> translated Markdown -> DOCX, styled like reference_docx
+    (default: the input). Translations are remembered in sidecar (default:
+    <out_docx>.translations.json); the translated Markdown is also written to out_md
+    if given. Images are extracted to media_dir and linked relative to the working
+    directory, as with to-md/to-docx. Returns the counts from translate_markdown.
+    """
+    sidecar = sidecar or out_docx.with_name(f"{out_docx.name}.translations.json")
+    md = b"".join(stream_docx_to_md(input_docx, media_dir, Path("."))).decode("utf-8")
+    known = load_translation_sidecar(sidecar, target_language)
+    translated, translations, counts = translate_markdown(md, target_language, translator, known, batch_size, workers)
+    save_translation_sidecar(sidecar, target_language, translations)
+    if out_md is not None:
+        out_md.parent.mkdir(parents=True, exist_ok=True)
+        out_md.write_text(translated, encoding="utf-8")
+    out_docx.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_docx.with_name(f"{out_docx.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as out:
+            for chunk in stream_md_to_docx(translated, reference_docx or input_docx):
+                out.write(chunk)
+        os.replace(tmp, out_docx)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return counts
+
+
+def grpc_translator(address: str | None = None) -> SegmentTranslator:
+    """A SegmentTranslator backed by TranslationService.TranslateBatch (python-services/app.py)."""
+    import grpc
+    from proto import translation_pb2, translation_pb2_grpc
+
+    channel = grpc.insecure_channel(address or os.environ.get("PYTHON_GRPC_ADDR", "localhost:50051"))
+    stub = translation_pb2_grpc.TranslationServiceStub(channel)
+
+    def translate_batch(segments: list[str], target_language: str) -> list[str]:
+        request = translation_pb2.TranslateBatchRequest(segments=segments, target_language=target_language)
+        return list(stub.TranslateBatch(request).segments)
+
+    return translate_batch
+
+
+# ---------- batch ----------
+
+_batch_reference: Path | None = None
+
+
+def _batch_init(
+    reference_docx: Path | None,
+    cache_dir: Path | None = None,
+    cache_max_bytes: int | None = None,
+    metrics_out: Path | None = None,
+) -> None:
+    """Process-pool initializer: shared setup paid once per worker, not once per file."""
+    global _batch_reference
+    warm_up(cache_dir, cache_max_bytes, metrics_out)
+    # not checked here: a raising initializer breaks the whole pool, while a missing
+    # reference only fails the MD -> DOCX jobs that use it (see _reference_arg)
+    _batch_reference = reference_docx
+
+
+def _batch_convert(job: dict) -> dict:
+    """Convert one manifest entry; never raises, the outcome goes into the returned record."""
+    src, out = Path(job["input"]), Path(job["output"])
+    record = {"input": str(src), "output": str(out), "direction": job["direction"], "worker": os.getpid()}
+    start = time.perf_counter()
+    hits = _cache.hits if _cache is not None else 0
+    try:
+        record["bytes_in"] = src.stat().st_size
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if job["direction"] == "to-md":
+            docx_to_md(src, out, Path(job["media_dir"]))
+        else:
+            ref = job.get("ref")
+            md_to_docx(src, out, Path(ref) if ref else _batch_reference)
+        record["bytes_out"] = out.stat().st_size
+        record["status"] = "ok"
+        if _cache is not None:
+            record["cache"] = "hit" if _cache.hits > hits else "miss"
+    except Exception as exc:
+        record["status"] = "error"
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def _direction_for(path: Path) -> str | None:
+    suffix = path.suffix.lower()
+    if suffix == ".docx" and not path.name.startswith("~$"):  # skip Word lock files
+        return "to-md"
+    if suffix in (".md", ".markdown"):
+        return "to-docx"
+    return None
+
+
+def batch_jobs(source: Path, out_dir: Path, media_dir: Path | None = None, report: Path | None = None) -> list[dict]:
+    """
+    Build conversion jobs from a directory (every .docx/.md below it, outputs mirror the
+    tree under out_dir) or from a JSONL manifest. Manifest lines are either a bare path
+    or an object {"input", "output"?, "direction"?, "ref"?, "media_dir"?}. When out_dir
+    lies inside the source directory, what earlier runs wrote there (outputs, media_dir,
+    the report) is not picked up as input.
+    """
+    media_dir = media_dir or out_dir / "media"
+    jobs = []
+    generated = [d.resolve() for d in (out_dir, media_dir)]
+    report = report.resolve() if report is not None else None
+
+    def is_generated(path: Path) -> bool:
+        path = path.resolve()
+        return path == report or any(d == path or d in path.parents for d in generated)
+
+    def add(src: Path, rel: Path, extra: dict) -> None:
+        direction = extra.get("direction") or _direction_for(src)
+        if direction not in ("to-md", "to-docx"):
+            return
+        out = extra.get("output") or out_dir / rel.with_suffix(".md" if direction == "to-md" else ".docx")
+        jobs.append({
+            "input": str(src),
+            "output": str(out),
+            "direction": direction,
+            "ref": extra.get("ref"),
+            "media_dir": str(extra.get("media_dir") or media_dir),
+        })
+
+    if source.is_dir():
+        for src in sorted(source.rglob("*")):
+            if src.is_file() and not is_generated(src):
+                add(src, src.relative_to(source), {})
+        return jobs
+
+    with source.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"input": line}
+            src = Path(entry["input"])
+            add(src, Path(src.name), entry)
+    return jobs
+
+
+def run_batch(
+    jobs: list[dict],
+    report: Path,
+    workers: int | None = None,
+    reference_docx: Path | None = None,
+    cache_dir: Path | None = None,
+    cache_max_bytes: int | None = None,
+    metrics_out: Path | None = None,
+) -> Tuple[int, int]:
+    """
+    Run jobs across a process pool and append one JSON line per file to report as
+    results arrive. A failing file is recorded and does not stop the batch.
+    Returns (ok, failed).
+    """
+    report.parent.mkdir(parents=True, exist_ok=True)
+    ok = failed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        initializer=_batch_init,
+        initargs=(reference_docx, cache_dir, cache_max_bytes, metrics_out),
+    ) as pool, report.open("a", encoding="utf-8") as out:
+        futures = {pool.submit(_batch_convert, job): job for job in jobs}
+        for fut in as_completed(futures):
+            try:
+                record = fut.result()
+            except BrokenProcessPool as exc:
+                # a worker died (killed, out of memory): every job it took down fails, the report stays whole
+                job = futures[fut]
+                record = {"input": job["input"], "output": job["output"], "direction": job["direction"],
+                          "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+    return ok, failed
+
+
 # ---------- CLI ----------
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Round-trip DOCX <-> MD with style preservation.")
     sub = ap.add_subparsers(dest="cmd", required=True)
 
-    to_md = sub.add_parser("to-md", help="Convert DOCX to Markdown (preserving Word styles).")
+    run_args = argparse.ArgumentParser(add_help=False)
+    run_args.add_argument("--cache-dir", type=Path, default=os.environ.get("DOCX_MD_CACHE_DIR") or None, help="Reuse earlier results stored here (default: $DOCX_MD_CACHE_DIR, off if unset)")
+    run_args.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_BYTES >> 20, help="Evict least recently used results beyond this size")
+    run_args.add_argument("--metrics-out", default=os.environ.get("DOCX_MD_METRICS_OUT") or None, help="Append per-stage timing spans as JSON lines here; - for stderr (default: $DOCX_MD_METRICS_OUT)")
+
+    to_md = sub.add_parser("to-md", parents=[run_args], help="Convert DOCX to Markdown (preserving Word styles).")
     to_md.add_argument("input", type=Path)
-    to_md.add_argument("-o", "--out", type=Path, required=True, help="Output .md")
+    to_md.add_argument("-o", "--out", type=Path, required=True, help="Output .md, or - to stream to stdout")
     to_md.add_argument("--media-dir", type=Path, default=Path("media"), help="Relative path for exported images")
+    to_md.add_argument("--link-base", type=Path, default=None, help="Link images relative to this directory (default: the output's directory, or . with -o -)")
+    to_md.add_argument("--engine", choices=ENGINES, default="pandoc", help="HTML -> Markdown renderer; native runs in-process and falls back to pandoc per block")
+    to_md.add_argument("--parallel-chunks", type=int, default=0, metavar="N", help="Run HTML -> Markdown as N parallel pandoc processes over h1/h2 sections (large documents)")
+    to_md.add_argument("--images", choices=IMAGE_MODES, default="extract", help="extract images, skip them (placeholder links), or link them lazily (see extract-media)")
 
-    to_docx = sub.add_parser("to-docx", help="Convert Markdown back to DOCX (re-applying Word styles).")
+    to_docx = sub.add_parser("to-docx", parents=[run_args], help="Convert Markdown back to DOCX (re-applying Word styles).")
     to_docx.add_argument("input", type=Path, help="Input .md")
-    to_docx.add_argument("-o", "--out", type=Path, required=True, help="Output .docx")
+    to_docx.add_argument("-o", "--out", type=Path, required=True, help="Output .docx, or - to stream to stdout")
     to_docx.add_argument("--ref", type=Path, default=None, help="Reference .docx with style definitions (recommended: the original DOCX)")
 
+    gc = sub.add_parser("gc-media", help="Delete extracted images no longer referenced by any Markdown file.")
+    gc.add_argument("md_roots", type=Path, nargs="+", help="Markdown files or directories to scan (recursively)")
+    gc.add_argument("--media-dir", type=Path, default=Path("media"), help="Directory holding exported images")
+    gc.add_argument("--min-age", type=float, default=300.0, help="Keep files modified within this many seconds")
+    gc.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+
+    extract = sub.add_parser("extract-media", help="Extract the lazily linked images of Markdown files written with --images lazy.")
+    extract.add_argument("md_files", type=Path, nargs="+", help="Markdown files")
+
+    tr = sub.add_parser("translate", parents=[run_args], help="Translate a DOCX through TranslationService, keeping styles, images and tables.")
+    tr.add_argument("input", type=Path, help="Input .docx")
+    tr.add_argument("-o", "--out", type=Path, required=True, help="Translated .docx")
+    tr.add_argument("--to", dest="language", required=True, help="Target language code")
+    tr.add_argument("--media-dir", type=Path, default=Path("media"), help="Relative path for exported images")
+    tr.add_argument("--sidecar", type=Path, default=None, help="Per-segment translations reused on the next run (default: <out>.translations.json)")
+    tr.add_argument("--md-out", type=Path, default=None, help="Also write the translated Markdown here")
+    tr.add_argument("--ref", type=Path, default=None, help="Reference .docx with style definitions (default: the input)")
+    tr.add_argument("--server", default=None, help="TranslationService address (default: $PYTHON_GRPC_ADDR or localhost:50051)")
+    tr.add_argument("--batch-size", type=int, default=TRANSLATE_BATCH_SIZE, help="Segments per TranslateBatch call")
+    tr.add_argument("-j", "--workers", type=int, default=4, help="TranslateBatch calls in flight")
+
+    batch = sub.add_parser("batch", parents=[run_args], help="Convert a directory or JSONL manifest in parallel (both directions).")
+    batch.add_argument("source", type=Path, help="Directory of .docx/.md files, or a JSONL manifest")
+    batch.add_argument("-o", "--out-dir", type=Path, required=True, help="Output directory")
+    batch.add_argument("--media-dir", type=Path, default=None, help="Exported images (default: <out-dir>/media)")
+    batch.add_argument("--ref", type=Path, default=None, help="Reference .docx for MD -> DOCX entries without their own")
+    batch.add_argument("--report", type=Path, default=None, help="JSONL report (default: <out-dir>/report.jsonl)")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+
     args = ap.parse_args()
+    cache = None
+    if getattr(args, "cache_dir", None):
+        cache = configure_cache(args.cache_dir, args.cache_max_mb << 20)
+    if getattr(args, "metrics_out", None):
+        configure_metrics(args.metrics_out)
 
-    if args.cmd == "to-md":
-        docx_to_md(args.input, args.out, args.media_dir)
-        print(f"Wrote Markdown: {args.out}")
+    if args.cmd == "batch":
+        if str(args.out_dir) == "-":
+            ap.error("batch writes files under --out-dir; it cannot stream to stdout (-o -)")
+        if args.ref is not None and not args.ref.is_file():
+            ap.error(f"reference DOCX not found: {args.ref}")
+        report = args.report or args.out_dir / "report.jsonl"
+        jobs = batch_jobs(args.source, args.out_dir, args.media_dir, report)
+        t0 = time.perf_counter()
+        ok, failed = run_batch(jobs, report, args.workers, args.ref, args.cache_dir, args.cache_max_mb << 20, args.metrics_out)
+        print(f"Converted {ok}/{len(jobs)} file(s) in {time.perf_counter() - t0:.1f}s, {failed} failed. Report: {report}")
+        if failed:
+            sys.exit(1)
+    elif args.cmd == "to-md" and str(args.out) == "-":
+        chunks = stream_docx_to_md(args.input, args.media_dir, args.link_base or Path("."), args.parallel_chunks, args.engine, image_mode=args.images)
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+    elif args.cmd == "to-md":
+        docx_to_md(args.input, args.out, args.media_dir, args.parallel_chunks, args.engine, link_base=args.link_base, image_mode=args.images)
+        print(f"Wrote Markdown: {args.out}{' (cached)' if cache and cache.hits else ''}")
+    elif args.cmd == "translate":
+        counts = translate_docx(
+            args.input, args.out, args.language, grpc_translator(args.server), args.media_dir,
+            args.sidecar, args.md_out, args.ref, args.batch_size, args.workers,
+        )
+        print(f"Wrote DOCX: {args.out} ({counts['translated']} of {counts['distinct']} distinct segment(s) translated, {counts['reused']} reused)")
+    elif args.cmd == "gc-media":
+        removed = gc_media(args.media_dir, args.md_roots, args.min_age, args.dry_run)
+        for f in removed:
+            print(f)
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {len(removed)} unreferenced image(s) from {args.media_dir}")
+    elif args.cmd == "extract-media":
+        count = 0
+        for md in args.md_files:
+            # links are relative to the Markdown file's directory unless written with --link-base
+            count += len(materialize_lazy_links(md.read_bytes(), md.parent))
+        print(f"Extracted {count} image(s)")
+    elif str(args.out) == "-":
+        for chunk in stream_md_to_docx(args.input.read_bytes(), args.ref):
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
     else:
         md_to_docx(args.input, args.out, args.ref)
-        print(f"Wrote DOCX: {args.out}")
+        print(f"Wrote DOCX: {args.out}{' (cached)' if cache and cache.hits else ''}")
 
 
 if __name__ == "__main__":
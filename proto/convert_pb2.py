@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: convert.proto
+# Protobuf Python Version: 6.31.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    6,
+    31,
+    1,
+    '',
+    'convert.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rconvert.proto\x12\ndoccreator\"F\n\x0f\x44ocxToMdRequest\x12\x0c\n\x04\x64ocx\x18\x01 \x01(\x0c\x12\x11\n\tmedia_dir\x18\x02 \x01(\t\x12\x12\n\nimage_mode\x18\x03 \x01(\t\"$\n\x10\x44ocxToMdResponse\x12\x10\n\x08markdown\x18\x01 \x01(\x0c\";\n\x0fMdToDocxRequest\x12\x10\n\x08markdown\x18\x01 \x01(\x0c\x12\x16\n\x0ereference_docx\x18\x02 \x01(\x0c\" \n\x10MdToDocxResponse\x12\x0c\n\x04\x64ocx\x18\x01 \x01(\x0c\x32\x9e\x01\n\x0e\x43onvertService\x12\x45\n\x08\x44ocxToMd\x12\x1b.doccreator.DocxToMdRequest\x1a\x1c.doccreator.DocxToMdResponse\x12\x45\n\x08MdToDocx\x12\x1b.doccreator.MdToDocxRequest\x1a\x1c.doccreator.MdToDocxResponseb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'convert_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_DOCXTOMDREQUEST']._serialized_start=29
+  _globals['_DOCXTOMDREQUEST']._serialized_end=99
+  _globals['_DOCXTOMDRESPONSE']._serialized_start=101
+  _globals['_DOCXTOMDRESPONSE']._serialized_end=137
+  _globals['_MDTODOCXREQUEST']._serialized_start=139
+  _globals['_MDTODOCXREQUEST']._serialized_end=198
+  _globals['_MDTODOCXRESPONSE']._serialized_start=200
+  _globals['_MDTODOCXRESPONSE']._serialized_end=232
+  _globals['_CONVERTSERVICE']._serialized_start=235
+  _globals['_CONVERTSERVICE']._serialized_end=393
+# @@protoc_insertion_point(module_scope)
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11translation.proto\x12\ndoccreator\"9\n\x10TranslateRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x17\n\x0ftarget_language\x18\x02 \x01(\t\"!\n\x11TranslateResponse\x12\x0c\n\x04text\x18\x01 \x01(\t2^\n\x12TranslationService\x12H\n\tTranslate\x12\x1c.doccreator.TranslateRequest\x1a\x1d.doccreator.TranslateResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11translation.proto\x12\ndoccreator\"9\n\x10TranslateRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x17\n\x0ftarget_language\x18\x02 \x01(\t\"!\n\x11TranslateResponse\x12\x0c\n\x04text\x18\x01 \x01(\t\"B\n\x15TranslateBatchRequest\x12\x10\n\x08segments\x18\x01 \x03(\t\x12\x17\n\x0ftarget_language\x18\x02 \x01(\t\"S\n\x16TranslateBatchResponse\x12\x10\n\x08segments\x18\x01 \x03(\t\x12\x13\n\x0bmemory_hits\x18\x02 \x01(\x05\x12\x12\n\ntranslated\x18\x03 \x01(\x05\x32\xb7\x01\n\x12TranslationService\x12H\n\tTranslate\x12\x1c.doccreator.TranslateRequest\x1a\x1d.doccreator.TranslateResponse\x12W\n\x0eTranslateBatch\x12!.doccreator.TranslateBatchRequest\x1a\".doccreator.TranslateBatchResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,6 +35,10 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_TRANSLATEREQUEST']._serialized_end=90
   _globals['_TRANSLATERESPONSE']._serialized_start=92
   _globals['_TRANSLATERESPONSE']._serialized_end=125
-  _globals['_TRANSLATIONSERVICE']._serialized_start=127
-  _globals['_TRANSLATIONSERVICE']._serialized_end=221
+  _globals['_TRANSLATEBATCHREQUEST']._serialized_start=127
+  _globals['_TRANSLATEBATCHREQUEST']._serialized_end=193
+  _globals['_TRANSLATEBATCHRESPONSE']._serialized_start=195
+  _globals['_TRANSLATEBATCHRESPONSE']._serialized_end=278
+  _globals['_TRANSLATIONSERVICE']._serialized_start=281
+  _globals['_TRANSLATIONSERVICE']._serialized_end=464
 # @@protoc_insertion_point(module_scope)
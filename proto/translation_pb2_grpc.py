@@ -39,6 +39,11 @@ class TranslationServiceStub(object):
                 request_serializer=translation__pb2.TranslateRequest.SerializeToString,
                 response_deserializer=translation__pb2.TranslateResponse.FromString,
                 _registered_method=True)
+        self.TranslateBatch = channel.unary_unary(
+                '/doccreator.TranslationService/TranslateBatch',
+                request_serializer=translation__pb2.TranslateBatchRequest.SerializeToString,
+                response_deserializer=translation__pb2.TranslateBatchResponse.FromString,
+                _registered_method=True)
 
 
 class TranslationServiceServicer(object):
@@ -50,6 +55,13 @@ class TranslationServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def TranslateBatch(self, request, context):
+        """Many segments in one call; repeats and remembered segments never reach the engine
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_TranslationServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +70,11 @@ def add_TranslationServiceServicer_to_server(servicer, server):
                     request_deserializer=translation__pb2.TranslateRequest.FromString,
                     response_serializer=translation__pb2.TranslateResponse.SerializeToString,
             ),
+            'TranslateBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.TranslateBatch,
+                    request_deserializer=translation__pb2.TranslateBatchRequest.FromString,
+                    response_serializer=translation__pb2.TranslateBatchResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'doccreator.TranslationService', rpc_method_handlers)
@@ -95,3 +112,30 @@ class TranslationService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def TranslateBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/doccreator.TranslationService/TranslateBatch',
+            translation__pb2.TranslateBatchRequest.SerializeToString,
+            translation__pb2.TranslateBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
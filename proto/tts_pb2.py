@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ttts.proto\x12\ndoccreator\")\n\nTTSRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\r\n\x05voice\x18\x02 \x01(\t\"\x1c\n\x0bTTSResponse\x12\r\n\x05\x61udio\x18\x01 \x01(\x0c\x32K\n\nTTSService\x12=\n\nSynthesize\x12\x16.doccreator.TTSRequest\x1a\x17.doccreator.TTSResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ttts.proto\x12\ndoccreator\";\n\nTTSRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\r\n\x05voice\x18\x02 \x01(\t\x12\x10\n\x08language\x18\x03 \x01(\t\"\x1c\n\x0bTTSResponse\x12\r\n\x05\x61udio\x18\x01 \x01(\x0c\"F\n\x0b\x41udioFormat\x12\x13\n\x0bsample_rate\x18\x01 \x01(\x05\x12\x10\n\x08\x63hannels\x18\x02 \x01(\x05\x12\x10\n\x08\x65ncoding\x18\x03 \x01(\t\"`\n\x08TTSChunk\x12\'\n\x06\x66ormat\x18\x01 \x01(\x0b\x32\x17.doccreator.AudioFormat\x12\x0b\n\x03pcm\x18\x02 \x01(\x0c\x12\x10\n\x08sentence\x18\x03 \x01(\x05\x12\x0c\n\x04text\x18\x04 \x01(\t2\x8f\x01\n\nTTSService\x12=\n\nSynthesize\x12\x16.doccreator.TTSRequest\x1a\x17.doccreator.TTSResponse\x12\x42\n\x10SynthesizeStream\x12\x16.doccreator.TTSRequest\x1a\x14.doccreator.TTSChunk0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,9 +32,13 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'tts_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_TTSREQUEST']._serialized_start=25
-  _globals['_TTSREQUEST']._serialized_end=66
-  _globals['_TTSRESPONSE']._serialized_start=68
-  _globals['_TTSRESPONSE']._serialized_end=96
-  _globals['_TTSSERVICE']._serialized_start=98
-  _globals['_TTSSERVICE']._serialized_end=173
+  _globals['_TTSREQUEST']._serialized_end=84
+  _globals['_TTSRESPONSE']._serialized_start=86
+  _globals['_TTSRESPONSE']._serialized_end=114
+  _globals['_AUDIOFORMAT']._serialized_start=116
+  _globals['_AUDIOFORMAT']._serialized_end=186
+  _globals['_TTSCHUNK']._serialized_start=188
+  _globals['_TTSCHUNK']._serialized_end=284
+  _globals['_TTSSERVICE']._serialized_start=287
+  _globals['_TTSSERVICE']._serialized_end=430
 # @@protoc_insertion_point(module_scope)
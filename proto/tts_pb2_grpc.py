@@ -39,6 +39,11 @@ class TTSServiceStub(object):
                 request_serializer=tts__pb2.TTSRequest.SerializeToString,
                 response_deserializer=tts__pb2.TTSResponse.FromString,
                 _registered_method=True)
+        self.SynthesizeStream = channel.unary_stream(
+                '/doccreator.TTSService/SynthesizeStream',
+                request_serializer=tts__pb2.TTSRequest.SerializeToString,
+                response_deserializer=tts__pb2.TTSChunk.FromString,
+                _registered_method=True)
 
 
 class TTSServiceServicer(object):
@@ -50,6 +55,13 @@ class TTSServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SynthesizeStream(self, request, context):
+        """One sentence at a time, as soon as it is synthesized; the first message carries the format
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_TTSServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +70,11 @@ def add_TTSServiceServicer_to_server(servicer, server):
                     request_deserializer=tts__pb2.TTSRequest.FromString,
                     response_serializer=tts__pb2.TTSResponse.SerializeToString,
             ),
+            'SynthesizeStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.SynthesizeStream,
+                    request_deserializer=tts__pb2.TTSRequest.FromString,
+                    response_serializer=tts__pb2.TTSChunk.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'doccreator.TTSService', rpc_method_handlers)
@@ -95,3 +112,30 @@ class TTSService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SynthesizeStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/doccreator.TTSService/SynthesizeStream',
+            tts__pb2.TTSRequest.SerializeToString,
+            tts__pb2.TTSChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -1,42 +1,476 @@
 import asyncio
+import functools
+import hashlib
+import importlib
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import grpc
-from fastapi import FastAPI
-from typing import AsyncIterator
+import uvicorn
+from fastapi import FastAPI, Response
+from typing import AsyncIterator, Callable
 
+import docx_md_roundtrip
+from proto import convert_pb2_grpc, convert_pb2
 from proto import translation_pb2_grpc, translation_pb2
 from proto import tts_pb2_grpc, tts_pb2
 
+CONVERT_WORKERS = int(os.getenv("CONVERT_WORKERS", os.cpu_count() or 1))
+CONVERT_CACHE_DIR = os.getenv("CONVERT_CACHE_DIR") or None
+CONVERT_CACHE_MB = int(os.getenv("CONVERT_CACHE_MB", docx_md_roundtrip.DEFAULT_CACHE_BYTES >> 20))
+CONVERT_METRICS_OUT = os.getenv("CONVERT_METRICS_OUT") or None  # stage spans as JSON lines; "-" = stderr
+CONVERT_MAX_PANDOC = int(os.getenv("CONVERT_MAX_PANDOC", "0")) or None  # concurrent MD -> DOCX pandoc runs; default: CPU count
+CONVERT_MEDIA_ROOT = os.getenv("CONVERT_MEDIA_ROOT", "media")  # DocxToMd media_dir is resolved under this
+
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND") or None  # "module:factory"; default: echo placeholder
+TRANSLATION_MEMORY = os.getenv("TRANSLATION_MEMORY", "data/cache/translation-memory.sqlite3")
+TRANSLATE_BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "64"))  # segments per engine call
+
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))  # serving processes sharing the ports below
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+GRPC_PORT = int(os.getenv("GRPC_PORT", "50051"))
+HTTP_PORT = int(os.getenv("HTTP_PORT", "8000"))
+WORKER_STATUS_PORT = int(os.getenv("WORKER_STATUS_PORT", "0")) or None  # worker i also serves HTTP on this + i
+SHUTDOWN_GRACE = float(os.getenv("SHUTDOWN_GRACE", "30"))  # seconds in-flight calls get on SIGTERM
+
+XTTS_MODEL_PATH = os.getenv("XTTS_MODEL_PATH") or None
+XTTS_CONFIG_PATH = os.getenv("XTTS_CONFIG_PATH") or None
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "1"))  # processes, each with its own copy of the model; shared by all SERVE_WORKERS
+TTS_THREADS = int(os.getenv("TTS_THREADS", "0")) or None  # torch CPU threads per worker; default: CPU count / model copies
+TTS_DEVICE = os.getenv("TTS_DEVICE") or None  # e.g. "cuda"; default: where TTS puts it (CPU)
+TTS_LANGUAGE = os.getenv("TTS_LANGUAGE", "en")
+TTS_DEESSER = os.getenv("TTS_DEESSER") in ("1", "true")
+TTS_LUFS = float(os.environ["TTS_LUFS"]) if os.getenv("TTS_LUFS") else None
+TTS_CACHE_MEM_MB = int(os.getenv("TTS_CACHE_MEM_MB", "64"))  # synthesized sentences kept in memory
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or None  # and on disk, if set
+TTS_CACHE_MB = int(os.getenv("TTS_CACHE_MB", "1024"))
+
+# service name -> warm; /ready answers 200 only once every registered service is
+ready: dict[str, bool] = {}
+# name -> callable returning counters, served by /stats
+stats: dict[str, Callable[[], dict]] = {}
+# which serving process answered; draining once it has been told to stop
+identity: dict = {"worker": 0, "pid": os.getpid(), "draining": False}
+
 app = FastAPI()
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", **identity}
+
+
+@app.get("/ready")
+async def readiness(response: Response):
+    if identity["draining"] or not ready or not all(ready.values()):
+        response.status_code = 503
+    return {"ready": response.status_code != 503, "services": ready, **identity}
+
+
+@app.get("/stats")
+async def service_stats():
+    return {name: get() for name, get in stats.items()}
+
+
+class EchoBackend:
+    """Placeholder engine: returns every segment unchanged."""
+
+    version = "echo-1"
+
+    def translate_batch(self, segments: list[str], target_language: str) -> list[str]:
+        return list(segments)
+
+
+def load_translation_backend(spec: str | None):
+    """TRANSLATION_BACKEND is "module:factory"; the factory returns an object with a
+    version string and translate_batch(segments, target_language) -> list[str]."""
+    if not spec:
+        return EchoBackend()
+    module, _, factory = spec.partition(":")
+    return getattr(importlib.import_module(module), factory)()
+
+
+class TranslationMemory:
+    """Translations that survive restarts: SQLite, keyed by (segment hash, language, engine version)."""
+
+    def __init__(self, path: str | Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            " segment TEXT NOT NULL, language TEXT NOT NULL, engine TEXT NOT NULL, translation TEXT NOT NULL,"
+            " PRIMARY KEY (segment, language, engine))"
+        )
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def segment_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def lookup(self, segments: list[str], language: str, engine: str) -> dict[str, str]:
+        """Remembered translations of the given (distinct) segments, by segment text."""
+        by_hash = {self.segment_hash(s): s for s in segments}
+        found: dict[str, str] = {}
+        hashes = list(by_hash)
+        with self._lock:
+            for i in range(0, len(hashes), 500):  # stay under SQLite's bound-parameter limit
+                part = hashes[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT segment, translation FROM tm WHERE language = ? AND engine = ? AND segment IN ({','.join('?' * len(part))})",
+                    (language, engine, *part),
+                )
+                found.update((by_hash[h], t) for h, t in rows)
+            self.hits += len(found)
+            self.misses += len(segments) - len(found)
+        return found
+
+    def store(self, translations: dict[str, str], language: str, engine: str) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tm VALUES (?, ?, ?, ?)",
+                [(self.segment_hash(s), language, engine, t) for s, t in translations.items()],
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / lookups, 4) if lookups else None}
 
 
 class TranslationService(translation_pb2_grpc.TranslationServiceServicer):
+    """Segment translation through a persistent translation memory.
+
+    Each batch is deduplicated, looked up in the TranslationMemory at
+    TRANSLATION_MEMORY, and only the misses go to the engine (TRANSLATION_BACKEND),
+    TRANSLATE_BATCH_SIZE segments per call. Results are remembered under the
+    engine's version, so upgrading the engine never serves stale translations.
+    """
+
+    def __init__(self, backend=None, memory: TranslationMemory | None = None) -> None:
+        self.backend = backend or load_translation_backend(TRANSLATION_BACKEND)
+        self.memory = memory or TranslationMemory(TRANSLATION_MEMORY)
+        stats["translation_memory"] = self.memory.stats
+
+    async def translate(self, segments: list[str], target_language: str) -> tuple[list[str], int, int]:
+        """Translations in request order, plus (memory hits, segments sent to the engine)."""
+        engine = self.backend.version
+        distinct = [s for s in dict.fromkeys(segments) if s.strip()]
+        done = await asyncio.to_thread(self.memory.lookup, distinct, target_language, engine)
+        misses = [s for s in distinct if s not in done]
+        for i in range(0, len(misses), TRANSLATE_BATCH_SIZE):
+            batch = misses[i:i + TRANSLATE_BATCH_SIZE]
+            results = await asyncio.to_thread(self.backend.translate_batch, batch, target_language)
+            if len(results) != len(batch):
+                raise RuntimeError(f"translation engine returned {len(results)} segments for {len(batch)}")
+            translated = dict(zip(batch, results))
+            await asyncio.to_thread(self.memory.store, translated, target_language, engine)
+            done.update(translated)
+        return [done.get(s, s) for s in segments], len(distinct) - len(misses), len(misses)
+
     async def Translate(self, request: translation_pb2.TranslateRequest, context: grpc.aio.ServicerContext) -> translation_pb2.TranslateResponse:
-        # Placeholder implementation
-        return translation_pb2.TranslateResponse(text=request.text)
+        try:
+            (text,), _, _ = await self.translate([request.text], request.target_language)
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.INTERNAL, str(exc))
+        return translation_pb2.TranslateResponse(text=text)
+
+    async def TranslateBatch(self, request: translation_pb2.TranslateBatchRequest, context: grpc.aio.ServicerContext) -> translation_pb2.TranslateBatchResponse:
+        try:
+            segments, hits, translated = await self.translate(list(request.segments), request.target_language)
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.INTERNAL, str(exc))
+        return translation_pb2.TranslateBatchResponse(segments=segments, memory_hits=hits, translated=translated)
 
 
 class TTSService(tts_pb2_grpc.TTSServiceServicer):
+    """XTTS synthesis on a bounded pool of worker processes with the model resident.
+
+    Each of the TTS_WORKERS workers loads XTTS_MODEL_PATH once and runs a warm-up
+    inference before taking requests, so a request only pays for inference; at most
+    TTS_WORKERS sentences render at once and the rest queue. Text is synthesized
+    sentence by sentence through an AudioCache (TTS_CACHE_MEM_MB in memory, plus
+    TTS_CACHE_DIR on disk), so repeated boilerplate costs a lookup. Without the model
+    paths the service is disabled and its RPCs fail with FAILED_PRECONDITION.
+    """
+
+    def __init__(self, workers: int = TTS_WORKERS, threads: int | None = TTS_THREADS) -> None:
+        self.workers = max(1, workers)
+        self.pool = None
+        self.warming: asyncio.Task | None = None
+        self.checkpoint = ""
+        if XTTS_MODEL_PATH and XTTS_CONFIG_PATH:
+            from scripts import run_xtts  # numpy/pyloudnorm; only needed with a model configured
+
+            self.xtts = run_xtts
+            self.cache = run_xtts.AudioCache(TTS_CACHE_MEM_MB << 20, TTS_CACHE_DIR, TTS_CACHE_MB << 20)
+            threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=run_xtts.init_worker,
+                initargs=(XTTS_MODEL_PATH, XTTS_CONFIG_PATH, TTS_DEVICE, threads),
+            )
+            ready["tts"] = False
+            stats["tts_cache"] = self.cache.stats
+
+    def start(self) -> None:
+        """Start loading the model in every worker; /ready turns true when all are warm."""
+        if self.pool is not None and self.warming is None:
+            self.warming = asyncio.create_task(self.warm())
+
+    async def warm(self) -> None:
+        # the pool initializer loads the model before a worker takes its first task, so
+        # a worker that answers is warm; keep asking until every worker has
+        loop = asyncio.get_running_loop()
+        hashing = asyncio.to_thread(self.xtts.checkpoint_hash, XTTS_MODEL_PATH, XTTS_CONFIG_PATH)
+        pids: set[int] = set()
+        while len(pids) < self.workers:
+            pids.update(await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid) for _ in range(self.workers))))
+            if len(pids) < self.workers:
+                await asyncio.sleep(0.5)
+        self.checkpoint = await hashing
+        ready["tts"] = True
+
+    async def _accept(self, request: tts_pb2.TTSRequest, context: grpc.aio.ServicerContext) -> tuple:
+        """Validate a request, wait for the model, and return the arguments after the text."""
+        if self.pool is None:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "XTTS_MODEL_PATH and XTTS_CONFIG_PATH are not set")
+        if not request.text.strip():
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "text is required")
+        self.start()
+        try:
+            await asyncio.shield(self.warming)
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, f"XTTS model failed to load: {exc}")
+        return request.language or TTS_LANGUAGE, request.voice or None, TTS_DEESSER, TTS_LUFS
+
+    async def _sentence(self, sentence: str, args: tuple) -> tuple[int, bytes]:
+        """(sample rate, PCM) of one sentence: from the cache, or rendered on the pool and stored."""
+        language, voice, deesser, lufs = args
+        key = await asyncio.to_thread(self.cache.key, sentence, voice, language, self.checkpoint, deesser, lufs)
+        hit = await asyncio.to_thread(self.cache.get, key)
+        if hit is not None:
+            return hit
+        loop = asyncio.get_running_loop()
+        rate, pcm = await loop.run_in_executor(self.pool, self.xtts.synthesize_pcm_in_worker, sentence, *args)
+        await asyncio.to_thread(self.cache.put, key, rate, pcm)
+        return rate, pcm
+
     async def Synthesize(self, request: tts_pb2.TTSRequest, context: grpc.aio.ServicerContext) -> tts_pb2.TTSResponse:
-        # Placeholder implementation
-        return tts_pb2.TTSResponse(audio=b"")
+        args = await self._accept(request, context)
+        try:
+            parts = await asyncio.gather(*(self._sentence(s, args) for s in self.xtts.split_sentences(request.text)))
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.INTERNAL, str(exc))
+        return tts_pb2.TTSResponse(audio=self.xtts.pcm_to_wav(parts[0][0], b"".join(pcm for _, pcm in parts)))
+
+    async def SynthesizeStream(self, request: tts_pb2.TTSRequest, context: grpc.aio.ServicerContext) -> AsyncIterator[tts_pb2.TTSChunk]:
+        """Raw PCM per sentence as each finishes, so the first audio waits for one sentence only."""
+        args = await self._accept(request, context)
+        sentences = self.xtts.split_sentences(request.text)
+
+        def submit(i: int) -> asyncio.Task | None:
+            return asyncio.create_task(self._sentence(sentences[i], args)) if i < len(sentences) else None
+
+        # the next sentence renders while this one is sent, so playback has no gaps
+        pending = submit(0)
+        try:
+            for i, sentence in enumerate(sentences):
+                rate, pcm = await pending
+                pending = submit(i + 1)
+                chunk = tts_pb2.TTSChunk(pcm=pcm, sentence=i, text=sentence)
+                if i == 0:
+                    chunk.format.CopyFrom(tts_pb2.AudioFormat(sample_rate=rate, channels=1, encoding="pcm_s16le"))
+                yield chunk
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.INTERNAL, str(exc))
+        finally:
+            if pending is not None:
+                pending.cancel()  # client went away: drop the queued sentence
+
+
+class ConvertService(convert_pb2_grpc.ConvertServiceServicer):
+    """DOCX <-> Markdown conversions.
+
+    DOCX -> Markdown runs on a pool of pre-warmed worker processes, since mammoth is
+    Python CPU work. Each worker imports the converter, probes pandoc and writes the
+    Lua filter once, so a request only pays for mammoth and pandoc themselves.
+    Markdown -> DOCX is all pandoc, so it runs right on the event loop as an asyncio
+    subprocess (at most CONVERT_MAX_PANDOC at once), and a cancelled RPC kills it.
+    With CONVERT_CACHE_DIR set, all of them share a ConversionCache there; with
+    CONVERT_METRICS_OUT they report per-stage spans. Extracted images go to the
+    request's media_dir, which must resolve inside CONVERT_MEDIA_ROOT.
+    """
+
+    def __init__(self, workers: int = CONVERT_WORKERS) -> None:
+        self.workers = max(1, workers)
+        self.warm_args = (Path(CONVERT_CACHE_DIR) if CONVERT_CACHE_DIR else None, CONVERT_CACHE_MB << 20, CONVERT_METRICS_OUT)
+        # spawn rather than fork: forking a process that already runs grpc is unsafe
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=docx_md_roundtrip.warm_up,
+            initargs=self.warm_args,
+        )
+        ready["convert"] = False
+
+    async def warm(self) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            asyncio.to_thread(docx_md_roundtrip.warm_up, *self.warm_args, CONVERT_MAX_PANDOC),
+            *(loop.run_in_executor(self.pool, docx_md_roundtrip.warm_up, *self.warm_args) for _ in range(self.workers)),
+        )
+        ready["convert"] = True
+
+    @staticmethod
+    def media_dir(requested: str, root: str | Path | None = None) -> Path | None:
+        """requested (relative to root, default CONVERT_MEDIA_ROOT, or absolute) resolved; None if it lands outside root."""
+        base = Path(root or CONVERT_MEDIA_ROOT).resolve()
+        target = (base / requested).resolve()
+        return target if target == base or base in target.parents else None
+
+    async def DocxToMd(self, request: convert_pb2.DocxToMdRequest, context: grpc.aio.ServicerContext) -> convert_pb2.DocxToMdResponse:
+        loop = asyncio.get_running_loop()
+        media_dir = self.media_dir(request.media_dir)
+        if media_dir is None:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"media_dir must be inside {CONVERT_MEDIA_ROOT}")
+        image_mode = request.image_mode or "extract"
+        if image_mode not in docx_md_roundtrip.IMAGE_MODES:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"image_mode must be one of {', '.join(docx_md_roundtrip.IMAGE_MODES)}")
+        try:
+            markdown = await loop.run_in_executor(
+                self.pool,
+                functools.partial(docx_md_roundtrip.docx_bytes_to_md, request.docx, media_dir, image_mode=image_mode),
+            )
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.INTERNAL, str(exc))
+        return convert_pb2.DocxToMdResponse(markdown=markdown.encode("utf-8"))
+
+    async def MdToDocx(self, request: convert_pb2.MdToDocxRequest, context: grpc.aio.ServicerContext) -> convert_pb2.MdToDocxResponse:
+        reference = request.reference_docx or None
+        try:
+            docx = await docx_md_roundtrip.async_md_bytes_to_docx(request.markdown, reference)
+        except Exception as exc:
+            await context.abort(grpc.StatusCode.INTERNAL, str(exc))
+        return convert_pb2.MdToDocxResponse(docx=docx)
+
 
+def listen_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    """A bound TCP socket; with reuse_port, every worker binds the same port and the
+    kernel spreads incoming connections across them."""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
 
-async def serve_grpc() -> None:
-    server = grpc.aio.server()
-    translation_pb2_grpc.add_TranslationServiceServicer_to_server(TranslationService(), server)
-    tts_pb2_grpc.add_TTSServiceServicer_to_server(TTSService(), server)
-    server.add_insecure_port("0.0.0.0:50051")
+
+async def serve(worker: int = 0, workers: int = 1) -> None:
+    """One serving process: gRPC and HTTP on the same event loop until SIGTERM/SIGINT.
+
+    On a signal the worker drains: /ready turns 503, gRPC stops taking new calls and
+    waits up to SHUTDOWN_GRACE seconds for the ones in flight, then HTTP does the
+    same, and the worker pools are shut down.
+    """
+    identity.update(worker=worker, pid=os.getpid())
+    shared = workers > 1
+    server = grpc.aio.server(options=[("grpc.so_reuseport", 1 if shared else 0)])
+    convert_service = ConvertService()
+    translation_service = TranslationService()
+    tts_service = TTSService(tts_share(worker, workers), TTS_THREADS or max(1, (os.cpu_count() or 1) // max(TTS_WORKERS, workers)))
+    convert_pb2_grpc.add_ConvertServiceServicer_to_server(convert_service, server)
+    translation_pb2_grpc.add_TranslationServiceServicer_to_server(translation_service, server)
+    tts_pb2_grpc.add_TTSServiceServicer_to_server(tts_service, server)
+    if not server.add_insecure_port(f"{SERVE_HOST}:{GRPC_PORT}"):
+        raise RuntimeError(f"could not bind gRPC port {GRPC_PORT}")
+
+    sockets = [listen_socket(SERVE_HOST, HTTP_PORT, shared)]
+    if WORKER_STATUS_PORT:
+        sockets.append(listen_socket(SERVE_HOST, WORKER_STATUS_PORT + worker, False))  # this worker only
+    http = uvicorn.Server(uvicorn.Config(app, log_level="info", timeout_graceful_shutdown=SHUTDOWN_GRACE))
+    http.install_signal_handlers = lambda: None  # the handlers below drain gRPC too
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    http_task = asyncio.create_task(http.serve(sockets=sockets))
+    await convert_service.warm()
     await server.start()
-    await server.wait_for_termination()
+    tts_service.start()  # serve conversions while the model loads; /ready waits for it
+    await stop.wait()
 
+    identity["draining"] = True
+    await server.stop(SHUTDOWN_GRACE)
+    http.should_exit = True
+    await http_task
+    for pool in (convert_service.pool, tts_service.pool):
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def tts_share(worker: int, workers: int, total: int = TTS_WORKERS) -> int:
+    """The XTTS processes serving process worker runs: TTS_WORKERS split across
+    the workers, at least one each so every worker can answer TTS calls."""
+    return max(1, total // workers + (worker < total % workers))
 
-if __name__ == "__main__":
-    import uvicorn
 
-    loop = asyncio.get_event_loop()
-    loop.create_task(serve_grpc())
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+def run_worker(worker: int, workers: int) -> None:
+    asyncio.run(serve(worker, workers))
+
+
+def supervise(workers: int) -> None:
+    """Run workers serving processes and restart any that die; on SIGTERM/SIGINT,
+    pass the signal on and wait for them to drain."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise SystemExit("SERVE_WORKERS > 1 needs SO_REUSEPORT (Linux, macOS); run a single worker here")
+    # the CPU-bound pools are per worker; split the cores between them unless told otherwise
+    # (XTTS model copies are split in serve(): see tts_share)
+    os.environ.setdefault("CONVERT_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    ctx = multiprocessing.get_context("spawn")
+    procs: dict[int, multiprocessing.process.BaseProcess] = {}
+    stopping = threading.Event()
+
+    def start(i: int) -> None:
+        procs[i] = ctx.Process(target=run_worker, args=(i, workers), name=f"app-worker-{i}")
+        procs[i].start()
+
+    def forward(signum, frame) -> None:
+        stopping.set()
+        for proc in procs.values():
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for i in range(workers):
+        start(i)
+    while not stopping.is_set():
+        for i, proc in list(procs.items()):
+            if not proc.is_alive() and not stopping.is_set():
+                print(f"worker {i} (pid {proc.pid}) exited with {proc.exitcode}; restarting", file=sys.stderr)
+                start(i)
+        stopping.wait(1.0)
+    deadline = time.monotonic() + SHUTDOWN_GRACE + 5
+    for proc in procs.values():
+        proc.join(max(0.0, deadline - time.monotonic()))
+        if proc.is_alive():
+            proc.kill()
+
+
+if __name__ == "__main__":
+    if SERVE_WORKERS > 1:
+        supervise(SERVE_WORKERS)
+    else:
+        run_worker(0, 1)
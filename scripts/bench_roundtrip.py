@@ -0,0 +1,232 @@
+"""
+Benchmark docx_md_roundtrip.py on synthetic documents.
+
+Generates DOCX files of a given size with python-docx (same seed -> same files),
+times each conversion stage separately and prints one JSON report, so two
+commits can be compared by diffing their output. Each case runs in a fresh
+process, so its peak_rss_kb (this process) and children_peak_rss_kb (the largest
+pandoc) are its own high-water marks, not those of the cases before it:
+
+  python scripts/bench_roundtrip.py --sizes small,medium -o bench-before.json
+  python scripts/bench_roundtrip.py --pages 200 --tables 40 --images 20 --repeat 5
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import mammoth
+import yaml
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.shared import Inches
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import docx_md_roundtrip as rt  # noqa: E402
+
+PRESETS: Dict[str, Dict[str, int]] = {
+    "small": {"pages": 5, "tables": 2, "images": 2, "para_styles": 4, "char_styles": 2},
+    "medium": {"pages": 50, "tables": 15, "images": 10, "para_styles": 12, "char_styles": 6},
+    "large": {"pages": 300, "tables": 60, "images": 40, "para_styles": 30, "char_styles": 12},
+}
+WORDS = (
+    "scope deliverable milestone vendor acceptance schedule payment review contract "
+    "service report budget risk quality change request approval phase resource"
+).split()
+PARAGRAPHS_PER_PAGE = 8
+
+
+def png_bytes(rng: random.Random, size: int = 48) -> bytes:
+    """A small noisy RGB PNG; every call gives different bytes, so images are not deduplicated."""
+    rows = b"".join(b"\x00" + bytes(rng.getrandbits(8) for _ in range(size * 3)) for _ in range(size))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_docx(path: Path, pages: int, tables: int, images: int, para_styles: int, char_styles: int, seed: int = 0) -> Path:
+    """Write a synthetic document: headings, styled paragraphs and runs, tables and images spread over pages."""
+    rng = random.Random(seed)
+    doc = Document()
+    p_names = [f"Bench Para {i}" for i in range(para_styles)]
+    c_names = [f"Bench Char {i}" for i in range(char_styles)]
+    for name in p_names:
+        doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH).base_style = doc.styles["Normal"]
+    for name in c_names:
+        doc.styles.add_style(name, WD_STYLE_TYPE.CHARACTER).font.bold = True
+
+    for page in range(pages):
+        doc.add_heading(f"Section {page + 1}: {sentence(rng, 3)[:-1]}", level=1 + page % 2)
+        for i in range(PARAGRAPHS_PER_PAGE):
+            para = doc.add_paragraph(style=p_names[(page + i) % len(p_names)] if p_names else None)
+            para.add_run(sentence(rng, 25) + " ")
+            if c_names:
+                para.add_run(sentence(rng, 4), style=c_names[i % len(c_names)])
+            para.add_run(" " + sentence(rng, 20))
+        # tables and images spread evenly over the pages
+        for _ in range((page + 1) * tables // pages - page * tables // pages):
+            table = doc.add_table(rows=5, cols=4)
+            table.style = doc.styles["Table Grid"]
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = sentence(rng, 3)
+        for _ in range((page + 1) * images // pages - page * images // pages):
+            doc.add_picture(io.BytesIO(png_bytes(rng)), width=Inches(1.5))
+        if page < pages - 1:
+            doc.add_page_break()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(path))
+    return path
+
+
+def timed(fn: Callable, repeat: int) -> tuple:
+    """Run fn repeat times; return (last result, list of wall-clock seconds)."""
+    runs, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+
+def summary(runs: List[float]) -> dict:
+    return {"min_s": round(min(runs), 4), "median_s": round(statistics.median(runs), 4), "runs_s": [round(r, 4) for r in runs]}
+
+
+def bench_case(name: str, params: Dict[str, int], work: Path, repeat: int, seed: int) -> dict:
+    docx_path = make_docx(work / f"{name}.docx", seed=seed, **params)
+    media = work / f"{name}-media"
+    stages = {}
+
+    styles, runs = timed(lambda: rt.collect_used_styles(docx_path), repeat)
+    stages["collect_used_styles"] = summary(runs)
+
+    style_map_text = rt.build_mammoth_style_map(*styles)
+
+    def save_image(image):
+        target = rt.store_media(image.open, media, (image.content_type or "image/png").split("/")[-1])
+        return {"src": f"{media.name}/{target.name}"}
+
+    def run_mammoth() -> str:
+        with docx_path.open("rb") as f:
+            return mammoth.convert_to_html(f, style_map=style_map_text, convert_image=mammoth.images.inline(save_image)).value
+
+    html, runs = timed(run_mammoth, repeat)
+    stages["mammoth"] = summary(runs)
+
+    style_map = {k: v for d in styles for k, v in d.items()}
+    meta_file = rt.scratch_file(yaml.safe_dump({"style_map": style_map}, sort_keys=True, allow_unicode=True).encode("utf-8"), ".yaml")
+    md_body, runs = timed(lambda: rt.html_to_markdown(html, meta_file), repeat)
+    stages["pandoc_html_to_md"] = summary(runs)
+    _, runs = timed(lambda: rt.html_to_markdown_chunked(html, meta_file, workers=4), repeat)
+    stages["pandoc_html_to_md_chunked4"] = summary(runs)
+    _, runs = timed(lambda: rt.native_html_to_markdown(html, style_map, meta_file), repeat)
+    stages["native_html_to_md"] = summary(runs)
+
+    md_path = work / f"{name}.md"
+    _, runs = timed(lambda: rt.docx_to_md(docx_path, md_path, media), repeat)
+    stages["docx_to_md"] = summary(runs)
+
+    # a fresh directory each run, or compile_reference() returns the stored template
+    _, runs = timed(lambda: rt.compile_reference(docx_path, Path(tempfile.mkdtemp(dir=work))), repeat)
+    stages["compile_reference"] = summary(runs)
+    out_docx = work / f"{name}.out.docx"
+    _, runs = timed(lambda: rt.md_to_docx(md_path, out_docx, docx_path), repeat)
+    stages["md_to_docx"] = summary(runs)
+    _, runs = timed(lambda: rt.md_to_docx(md_path, out_docx), repeat)
+    stages["md_to_docx_no_ref"] = summary(runs)
+
+    return {
+        "name": name,
+        "params": params,
+        "docx_bytes": docx_path.stat().st_size,
+        "html_chars": len(html),
+        "markdown_bytes": len(md_body.encode("utf-8")),
+        "stages": stages,
+    }
+
+
+def run_case(name: str, params: Dict[str, int], work: Path, repeat: int, seed: int) -> dict:
+    """bench_case in a process of its own (see main), plus that process's peak memory."""
+    rt.warm_up()
+    result = bench_case(name, params, work, repeat, seed)
+    # ru_maxrss is KiB on Linux; children covers the largest pandoc process
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["children_peak_rss_kb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time docx_md_roundtrip stages on synthetic DOCX files")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma-separated presets: {', '.join(PRESETS)}")
+    parser.add_argument("--pages", type=int, help="Custom case instead of presets: number of pages")
+    parser.add_argument("--tables", type=int, default=0)
+    parser.add_argument("--images", type=int, default=0)
+    parser.add_argument("--para-styles", type=int, default=4)
+    parser.add_argument("--char-styles", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep generated files here (default: a temp dir)")
+    parser.add_argument("-o", "--out", type=Path, default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.pages:
+        cases = {"custom": {"pages": args.pages, "tables": args.tables, "images": args.images,
+                            "para_styles": args.para_styles, "char_styles": args.char_styles}}
+    else:
+        cases = {name: PRESETS[name] for name in args.sizes.split(",")}
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        work = args.work_dir or Path(tmp)
+        results = []
+        for name, params in cases.items():
+            # a fresh process per case: ru_maxrss only ever grows, so a shared one would
+            # report the largest case so far for every case after it
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results.append(pool.submit(run_case, name, params, work, args.repeat, args.seed).result())
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    report = {
+        "commit": commit or None,
+        "tool_version": rt.__version__,
+        "pandoc": rt.pandoc_version(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "cases": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Narrate a DOCX as one audio file with a chapter index.
+
+The document goes through docx_to_markdown (images skipped), pandoc parses the
+Markdown into blocks, and every heading, paragraph, list item and (unless
+--skip-tables) table row becomes one or more sentence segments. Segments are
+synthesized on a pool of warm XTTS workers and stored as they finish in a segment
+store next to the output, so an interrupted render picks up where it stopped and
+repeated sentences are rendered once. The segments are then joined with pauses
+around headings and between paragraphs, and each paragraph (or heading) is
+loudness-normalized to --lufs as a whole, so the level does not jump between
+its sentences:
+
+  python scripts/make_audiobook.py "SOW Final 2025.docx" -o sow.wav \\
+      --model-path runs/house_en_xtts/best_model.pth --config-path runs/house_en_xtts/config.json -j 2
+
+Writes sow.wav, sow.chapters.json (title, start and end of each chapter) and
+sow.ffmetadata (the same chapters for `ffmpeg -i sow.wav -i sow.ffmetadata
+-map_metadata 1 sow.m4b`). Segments are kept in sow.wav.parts/ until deleted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import docx_md_roundtrip as rt  # noqa: E402
+import run_xtts  # noqa: E402
+
+HEADING_STYLE = re.compile(r"^(?:Heading\s*(\d)|Title|Subtitle)$", re.IGNORECASE)
+DEFAULT_SKIP_STYLES = r"^toc\b"  # table-of-contents entries
+
+
+@dataclass
+class Segment:
+    text: str
+    pause_ms: int  # silence after this segment
+    heading: int = 0  # heading level, 0 for body text
+    key: str = ""
+    block: int = 0  # the heading, paragraph or row it was cut from
+
+
+# ---------- document -> blocks ----------
+
+def inline_text(inlines: list) -> str:
+    """Plain text of pandoc JSON inlines; notes, images and raw markup are not read out."""
+    parts = []
+    for el in inlines:
+        t, c = el["t"], el.get("c")
+        if t == "Str":
+            parts.append(c)
+        elif t in ("Space", "SoftBreak", "LineBreak"):
+            parts.append(" ")
+        elif t in ("Emph", "Strong", "Strikeout", "Superscript", "Subscript", "SmallCaps", "Underline"):
+            parts.append(inline_text(c))
+        elif t in ("Span", "Link", "Cite"):
+            parts.append(inline_text(c[1]))
+        elif t == "Quoted":
+            parts.append(f'"{inline_text(c[1])}"')
+        elif t in ("Code", "Math"):
+            parts.append(c[1])
+    return " ".join("".join(parts).split())
+
+
+def _style(attr: list) -> str:
+    return dict(attr[2]).get("custom-style", "")
+
+
+def _is_toc_line(inlines: list) -> bool:
+    """A paragraph made only of links to anchors in the document (a table-of-contents line)."""
+    links = [el for el in inlines if el["t"] not in ("Space", "SoftBreak", "LineBreak")]
+    return bool(links) and all(el["t"] == "Link" and el["c"][2][0].startswith("#") for el in links)
+
+
+def walk_blocks(blocks: list, skip_tables: bool, skip_styles: re.Pattern) -> Iterator[tuple[int, str]]:
+    """(heading level or 0, text) for every block that is read out, in document order."""
+    for block in blocks:
+        t, c = block["t"], block.get("c")
+        if t == "Header":
+            level, attr, inlines = c
+            if not skip_styles.search(_style(attr)):
+                yield level, inline_text(inlines)
+        elif t in ("Para", "Plain"):
+            if not _is_toc_line(c):
+                yield 0, inline_text(c)
+        elif t == "LineBlock":
+            for line in c:
+                yield 0, inline_text(line)
+        elif t == "BulletList":
+            for item in c:
+                yield from walk_blocks(item, skip_tables, skip_styles)
+        elif t == "OrderedList":
+            for item in c[1]:
+                yield from walk_blocks(item, skip_tables, skip_styles)
+        elif t == "BlockQuote":
+            yield from walk_blocks(c, skip_tables, skip_styles)
+        elif t == "Div":
+            attr, inner = c
+            style = _style(attr)
+            if style and skip_styles.search(style):
+                continue
+            m = HEADING_STYLE.match(style)
+            if m:
+                text = " ".join(text for _, text in walk_blocks(inner, skip_tables, skip_styles))
+                yield int(m.group(1) or 1), text
+            else:
+                yield from walk_blocks(inner, skip_tables, skip_styles)
+        elif t == "Table" and not skip_tables:
+            _, caption, _, head, bodies, foot = c
+            yield from walk_blocks(caption[1], skip_tables, skip_styles)
+            rows = head[1] + [row for body in bodies for row in body[2] + body[3]] + foot[1]
+            for row in rows:
+                cells = [" ".join(text for _, text in walk_blocks(cell[4], skip_tables, skip_styles)) for cell in row[1]]
+                yield 0, "; ".join(cell for cell in cells if cell)
+
+
+def document_blocks(docx: Path, skip_tables: bool, skip_styles: re.Pattern) -> List[tuple[int, str]]:
+    with tempfile.TemporaryDirectory(prefix="audiobook-") as tmp:
+        md = rt.docx_to_markdown(docx, Path(tmp), Path(tmp), image_mode="skip")
+    ast = subprocess.run(
+        ["pandoc", f"--from={rt.MD_FORMAT}", "--to=json"], input=md.encode("utf-8"), capture_output=True, check=True
+    ).stdout
+    return [(level, text) for level, text in walk_blocks(json.loads(ast)["blocks"], skip_tables, skip_styles) if text]
+
+
+def plan_segments(blocks: List[tuple[int, str]], heading_pause: int, paragraph_pause: int, sentence_pause: int) -> List[Segment]:
+    segments: List[Segment] = []
+    for block, (level, text) in enumerate(blocks):
+        if level and segments:
+            segments[-1].pause_ms = max(segments[-1].pause_ms, heading_pause)
+        sentences = run_xtts.split_sentences(text)
+        for i, sentence in enumerate(sentences):
+            last = i == len(sentences) - 1
+            pause = (heading_pause if level else paragraph_pause) if last else sentence_pause
+            segments.append(Segment(sentence, pause, level, block=block))
+    return segments
+
+
+# ---------- synthesis ----------
+
+def render(segments: List[Segment], cache: run_xtts.AudioCache, args: argparse.Namespace) -> None:
+    """Synthesize every segment missing from cache on a pool of warm workers; each is stored as it finishes."""
+    todo = {}
+    for seg in segments:
+        if not cache.has(seg.key):
+            todo.setdefault(seg.key, seg.text)
+    print(f"{len(segments)} segments, {len(set(s.key for s in segments))} distinct, {len(todo)} to render", file=sys.stderr)
+    if not todo:
+        return
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    t0, done = time.perf_counter(), 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=run_xtts.init_worker,
+        initargs=(args.model_path, args.config_path, args.device, threads),
+    ) as pool:
+        futures = {
+            pool.submit(run_xtts.synthesize_pcm_in_worker, text, args.language, args.voice, args.deesser): key
+            for key, text in todo.items()
+        }
+        try:
+            for fut in as_completed(futures):
+                rate, pcm = fut.result()
+                cache.put(futures[fut], rate, pcm)
+                done += 1
+                print(f"[{done}/{len(todo)}] {time.perf_counter() - t0:.0f}s {todo[futures[fut]][:60]}", file=sys.stderr)
+        except BaseException:
+            for fut in futures:
+                fut.cancel()  # what finished is stored; a rerun resumes from there
+            raise
+
+
+# ---------- assembly ----------
+
+def _runs(segments: List[Segment]) -> Iterator[range]:
+    """Index ranges of consecutive segments from the same block."""
+    start = 0
+    for i in range(1, len(segments) + 1):
+        if i == len(segments) or segments[i].block != segments[start].block:
+            yield range(start, i)
+            start = i
+
+
+def assemble(segments: List[Segment], cache: run_xtts.AudioCache, out: Path, lufs: float | None, chapter_level: int, title: str) -> dict:
+    """Join the segments into a 16-bit mono WAV at out, normalizing each block (its
+    sentences and the pauses between them) to lufs as a whole; return the chapter index."""
+    chapters: list[dict] = []
+    frames = 0
+    rate = None
+    tmp = out.with_name(f"{out.name}.tmp")
+    with wave.open(str(tmp), "wb") as w:
+        for run in _runs(segments):
+            parts = []
+            for i in run:
+                seg = segments[i]
+                seg_rate, pcm = cache.get(seg.key)
+                if rate is None:
+                    rate = seg_rate
+                    w.setnchannels(1)
+                    w.setsampwidth(2)
+                    w.setframerate(rate)
+                elif seg_rate != rate:
+                    raise RuntimeError(f"segment {i} has sample rate {seg_rate}, expected {rate}")
+                parts.append(np.frombuffer(pcm, dtype="<i2"))
+                if i != run[-1]:
+                    parts.append(np.zeros(int(rate * seg.pause_ms / 1000), dtype="<i2"))
+            first = segments[run[0]]
+            if (first.heading and first.heading <= chapter_level) or not chapters:
+                if chapters:
+                    chapters[-1]["end_s"] = round(frames / rate, 3)
+                chapters.append({"title": first.text if first.heading else title, "start_s": round(frames / rate, 3), "segment": run[0]})
+            samples = np.concatenate(parts).astype(np.float32)
+            samples /= 32768
+            if lufs is not None:
+                run_xtts.normalize_loudness(samples, rate, lufs)
+            w.writeframes(run_xtts.to_pcm16(samples))
+            silence = int(rate * segments[run[-1]].pause_ms / 1000)
+            w.writeframes(b"\0\0" * silence)
+            frames += len(samples) + silence
+    os.replace(tmp, out)
+    if chapters:
+        chapters[-1]["end_s"] = round(frames / rate, 3)
+    return {"audio": out.name, "sample_rate": rate, "duration_s": round(frames / rate, 3) if rate else 0, "chapters": chapters}
+
+
+def write_ffmetadata(index: dict, path: Path) -> None:
+    def esc(text: str) -> str:
+        return re.sub(r"([=;#\\\n])", r"\\\1", text)
+
+    lines = [";FFMETADATA1"]
+    for ch in index["chapters"]:
+        lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={round(ch['start_s'] * 1000)}", f"END={round(ch['end_s'] * 1000)}", f"title={esc(ch['title'])}"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Narrate a DOCX with XTTS into one WAV plus a chapter index")
+    parser.add_argument("input", type=Path, help="Input .docx")
+    parser.add_argument("-o", "--out", type=Path, required=True, help="Output .wav")
+    parser.add_argument("--model-path", default=os.getenv("XTTS_MODEL_PATH"), help="Model checkpoint (default: $XTTS_MODEL_PATH)")
+    parser.add_argument("--config-path", default=os.getenv("XTTS_CONFIG_PATH"), help="Model config (default: $XTTS_CONFIG_PATH)")
+    parser.add_argument("--language", default="en", help="Language code")
+    parser.add_argument("--voice", default=None, help="Reference .wav or model speaker name")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="XTTS worker processes (each loads the model)")
+    parser.add_argument("--threads", type=int, default=None, help="Torch CPU threads per worker (default: CPU count / workers)")
+    parser.add_argument("--device", default=None, help="Torch device for the workers, e.g. cuda")
+    parser.add_argument("--deesser", action="store_true", help="Apply simple de-esser to each segment")
+    parser.add_argument("--lufs", type=float, default=-18.0, help="Normalize each paragraph to this loudness (LUFS)")
+    parser.add_argument("--skip-tables", action="store_true", help="Do not read tables (default: one row at a time)")
+    parser.add_argument("--skip-styles", default=DEFAULT_SKIP_STYLES, help="Regex of custom-style names not to read")
+    parser.add_argument("--chapter-level", type=int, default=1, help="Headings up to this level start a chapter")
+    parser.add_argument("--heading-pause", type=int, default=1000, help="Silence before and after headings (ms)")
+    parser.add_argument("--paragraph-pause", type=int, default=500, help="Silence after paragraphs (ms)")
+    parser.add_argument("--sentence-pause", type=int, default=150, help="Silence between sentences (ms)")
+    parser.add_argument("--parts-dir", type=Path, default=None, help="Segment store for resuming (default: <out>.parts)")
+    args = parser.parse_args()
+    if not args.model_path or not args.config_path:
+        parser.error("--model-path and --config-path (or XTTS_MODEL_PATH / XTTS_CONFIG_PATH) are required")
+
+    blocks = document_blocks(args.input, args.skip_tables, re.compile(args.skip_styles, re.IGNORECASE))
+    segments = plan_segments(blocks, args.heading_pause, args.paragraph_pause, args.sentence_pause)
+    if not segments:
+        sys.exit(f"Nothing to read in {args.input}")
+
+    # the store is an AudioCache, so segments are keyed on text, voice and checkpoint
+    # like the TTS service's; it is never evicted (memory tier off: assembly streams)
+    cache = run_xtts.AudioCache(memory_bytes=0, disk_dir=args.parts_dir or args.out.with_name(f"{args.out.name}.parts"), disk_bytes=1 << 62)
+    checkpoint = run_xtts.checkpoint_hash(args.model_path, args.config_path)
+    for seg in segments:
+        seg.key = cache.key(seg.text, args.voice, args.language, checkpoint, args.deesser)
+
+    render(segments, cache, args)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    index = assemble(segments, cache, args.out, args.lufs, args.chapter_level, args.input.stem)
+    base = args.out.with_suffix("")
+    Path(f"{base}.chapters.json").write_text(json.dumps(index, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    write_ffmetadata(index, Path(f"{base}.ffmetadata"))
+    print(f"Wrote {args.out} ({index['duration_s'] / 60:.1f} min, {len(index['chapters'])} chapters)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 """Prepare dataset for XTTS fine-tuning.
 
 This script normalizes audio loudness, optionally segments long files
-using VAD from Whisper, and writes a metadata.csv file in the
-format required by Coqui TTS:
+into clips of at most --max-len seconds with an energy/zero-crossing VAD
+(--vad), and writes a metadata.csv file in the format required by Coqui TTS:
 
     wavs/0001.wav|Some text here.|spk1|en
 
@@ -10,18 +10,46 @@ Usage:
     python scripts/prep_xtts_data.py --input-dir raw_audio \
         --transcript-file transcripts.tsv --output-dir data/house_en
 
+    # split on speech pauses, spread the files over 8 processes
+    python scripts/prep_xtts_data.py --input-dir raw_audio \
+        --transcript-file transcripts.tsv --output-dir data/house_en --workers 8 --vad
+
+Clip numbers and metadata.csv rows follow the transcript order whatever the
+number of workers.
+
+Prep is incremental. output-dir/manifest.json maps each source (name, content hash,
+transcript text and prep parameters) to the clips it produced, which are kept in
+output-dir/clips/. A rerun only processes new or changed sources. wavs/ and
+metadata.csv are rebuilt from the manifest (hard links, no re-encoding). The
+manifest is saved after every finished file, so a crashed run resumes where it
+stopped. --progress-json prints one JSON line per finished file (files done,
+audio seconds per second, ETA) on stdout.
+
 The transcript file should contain lines of the form:
     filename.wav\tThis is the spoken text.
+A line with only a file name (no transcript) is transcribed with Whisper, and so
+are the clips of a file that VAD splits into several; Whisper is optional and only
+loaded when such a clip turns up.
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import List, Tuple
 
-from pydub import AudioSegment
+import numpy as np
 
 try:
     import whisper
@@ -36,76 +64,470 @@ def load_transcripts(path: Path) -> List[Tuple[str, str]]:
             line = line.strip()
             if not line or line.startswith("#"):
                 continue
-            name, text = line.split("\t", 1)
-            entries.append((name, text))
+            name, _, text = line.partition("\t")
+            entries.append((name, text.strip()))
     return entries
 
 
-def normalize(segment: AudioSegment, target_dbfs: float = -20.0) -> AudioSegment:
-    change = target_dbfs - segment.dBFS
-    return segment.apply_gain(change)
+TARGET_SAMPLE_RATE = 22050
 
 
-TARGET_SAMPLE_RATE = 22050
+# ---------- PCM ----------
+#
+# A source is decoded once into a mono 16-bit WAV (or used as is when it already
+# is one) and memory-mapped; clips are slices of that map, so memory follows the
+# clip length however long the recording is.
+
+PCM_BLOCK_FRAMES = 1 << 20  # frames per read when converting or scanning
+
+
+def _pcm_layout(path: Path) -> Tuple[int, int, int, int, int] | None:
+    """(channels, sample width, rate, frames, data offset) of a PCM WAV, or None."""
+    try:
+        with path.open("rb") as f, wave.open(f) as w:
+            offset = f.tell()  # the reader stops at the start of the data chunk
+            return w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes(), offset
+    except (wave.Error, EOFError):
+        return None
+
+
+def _downmix_wav(path: Path, dest: Path) -> None:
+    """16-bit PCM WAV -> mono, block by block, without ffmpeg."""
+    with wave.open(str(path), "rb") as src, wave.open(str(dest), "wb") as out:
+        channels = src.getnchannels()
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(src.getframerate())
+        while True:
+            block = np.frombuffer(src.readframes(PCM_BLOCK_FRAMES), dtype="<i2")
+            if not block.size:
+                break
+            out.writeframes(block.reshape(-1, channels).mean(axis=1).astype("<i2").tobytes())
+
+
+def open_pcm(path: Path, scratch: Path) -> Tuple[np.ndarray, int]:
+    """
+    Mono 16-bit samples of path as a read-only memory map, and the sample rate.
+    A mono 16-bit WAV is mapped in place; anything else is decoded once into
+    scratch (ffmpeg, or a plain downmix for 16-bit WAVs), which the caller removes.
+    """
+    layout = _pcm_layout(path)
+    if layout is None or layout[:2] != (1, 2):
+        if shutil.which("ffmpeg"):
+            cmd = ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", str(path), "-ac", "1", "-c:a", "pcm_s16le", "-f", "wav", str(scratch)]
+            subprocess.run(cmd, check=True)
+        elif layout is not None and layout[1] == 2:
+            _downmix_wav(path, scratch)
+        else:
+            raise RuntimeError(f"ffmpeg is needed to decode {path}")
+        path, layout = scratch, _pcm_layout(scratch)
+    _, _, rate, frames, offset = layout
+    if not frames:
+        return np.zeros(0, dtype="<i2"), rate
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames,)), rate
+
+
+def to_float(pcm: np.ndarray) -> np.ndarray:
+    """A slice of 16-bit PCM as float32 in [-1, 1] (the only copy of the clip)."""
+    samples = pcm.astype(np.float32)
+    samples /= 32768
+    return samples
+
+
+def normalize(samples: np.ndarray, target_dbfs: float = -20.0) -> np.ndarray:
+    """Scale samples in place to target_dbfs RMS (as pydub's dBFS); returns samples."""
+    rms = float(np.sqrt(np.mean(np.square(samples)))) if samples.size else 0.0
+    if rms > 0:
+        samples *= np.float32(10 ** (target_dbfs / 20) / rms)
+    return samples
+
+
+def resample(samples: np.ndarray, rate: int, target: int) -> np.ndarray:
+    """Linear-interpolation resampling of one clip."""
+    if rate == target or not samples.size:
+        return samples
+    n = int(round(len(samples) * target / rate))
+    return np.interp(np.arange(n) * (rate / target), np.arange(len(samples)), samples).astype(np.float32)
+
+
+def save_audio(samples: np.ndarray, path: Path, rate: int, sample_rate: int = TARGET_SAMPLE_RATE) -> None:
+    """Write float samples at rate as a 16-bit mono WAV at sample_rate."""
+    samples = resample(samples, rate, sample_rate)
+    np.clip(samples, -1.0, 1.0, out=samples)
+    samples *= 32767
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(samples.astype("<i2").tobytes())
+
+
+# ---------- VAD ----------
+#
+# Speech regions from frame energy and zero-crossing rate, all NumPy over a
+# (frames, samples) view: no model, a few milliseconds per minute of audio.
+
+VAD_VERSION = "energy-1"  # part of the prep parameters: bump when regions change
+VAD_FRAME_MS = 30
+VAD_MIN_SPEECH_MS = 250  # shorter blips are noise
+VAD_MIN_SILENCE_MS = 300  # shorter pauses stay inside a region
+VAD_MIN_CLIP_S = 2.0  # regions shorter than this are merged into a neighbour
+VAD_PAD_MS = 100
+
+
+def frame_features(samples: np.ndarray, frame: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-frame energy (dB) and zero-crossing rate (crossings per sample). samples
+    may be a 16-bit memory map; it is read PCM_BLOCK_FRAMES at a time."""
+    n = len(samples) // frame
+    energy = np.empty(n, dtype=np.float32)
+    zcr = np.empty(n, dtype=np.float32)
+    step = max(1, PCM_BLOCK_FRAMES // frame)
+    for i in range(0, n, step):
+        block = samples[i * frame:min(n, i + step) * frame]
+        if block.dtype != np.float32:
+            block = to_float(block)
+        frames = block.reshape(-1, frame)
+        energy[i:i + len(frames)] = 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr[i:i + len(frames)] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame
+    return energy, zcr
+
+
+def speech_mask(energy: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+    """Frames well above the noise floor (and above -50 dB), or up to 6 dB less loud
+    with a high ZCR (fricatives). When there is hardly any silence to measure a floor
+    from, a threshold 15 dB under the loud frames takes over."""
+    floor, loud = np.percentile(energy, [10, 95])
+    threshold = max(min(floor + 12, loud - 15), -50)
+    return (energy > threshold) | ((energy > threshold - 6) & (zcr > 0.25))
+
+
+def _runs(mask: np.ndarray) -> List[List[int]]:
+    """[start, end) frame index pairs of the True runs in mask."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges.reshape(-1, 2).tolist()
+
+
+def _split_long(start: int, end: int, energy: np.ndarray, max_frames: int) -> List[List[int]]:
+    """Cut [start, end) at the quietest frame of the second half of each max_frames window."""
+    parts = []
+    while end - start > max_frames:
+        lo = start + max_frames // 2
+        cut = lo + int(np.argmin(energy[lo:start + max_frames]))
+        parts.append([start, cut])
+        start = cut
+    parts.append([start, end])
+    return parts
+
+
+def vad_regions(samples: np.ndarray, rate: int, max_len: float) -> List[Tuple[int, int]]:
+    """
+    Speech regions of samples as (start_ms, end_ms), each at most max_len seconds:
+    runs of speech frames, with short pauses bridged, blips dropped, short regions
+    merged into a neighbour while they fit, a little padding, and anything still too
+    long cut at its quietest point.
+    """
+    frame = max(1, rate * VAD_FRAME_MS // 1000)
+    energy, zcr = frame_features(samples, frame)
+    if not len(energy):
+        return []
+    max_frames = max(1, int(max_len * 1000) // VAD_FRAME_MS)
+    min_silence = VAD_MIN_SILENCE_MS // VAD_FRAME_MS
+    regions: List[List[int]] = []
+    for start, end in _runs(speech_mask(energy, zcr)):
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    regions = [r for r in regions if (r[1] - r[0]) * VAD_FRAME_MS >= VAD_MIN_SPEECH_MS]
+
+    min_frames = int(VAD_MIN_CLIP_S * 1000) // VAD_FRAME_MS
+    merged: List[List[int]] = []
+    for region in regions:
+        short = region[1] - region[0] < min_frames or (merged and merged[-1][1] - merged[-1][0] < min_frames)
+        if merged and short and region[1] - merged[-1][0] <= max_frames:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
 
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    out = []
+    for i, (start, end) in enumerate(merged):
+        start = max(start - pad, merged[i - 1][1] if i else 0)
+        end = min(end + pad, merged[i + 1][0] if i + 1 < len(merged) else len(energy))
+        out.extend(_split_long(start, end, energy, max_frames))
+    return [(start * VAD_FRAME_MS, end * VAD_FRAME_MS) for start, end in out]
 
-def save_audio(segment: AudioSegment, path: Path) -> None:
-    segment = (
-        segment.set_frame_rate(TARGET_SAMPLE_RATE)
-        .set_channels(1)
-        .set_sample_width(2)
-    )
-    segment.export(path, format="wav")
 
+# ---------- Whisper (only for clips without a transcript) ----------
 
-def maybe_split(
-    path: Path, max_len: float, model, fallback_text: str
-) -> Iterable[Tuple[AudioSegment, str]]:
-    segment = AudioSegment.from_file(path)
-    if model is None:
-        yield segment, fallback_text
-        return
+WHISPER_MODEL = "base"
+WHISPER_BATCH = 16
+WHISPER_RATE = 16000
 
-    result = model.transcribe(str(path))
-    segments = result.get("segments", [])
-    if not segments:
-        yield segment, result.get("text", fallback_text).strip()
-        return
-    for s in segments:
-        start = int(s["start"] * 1000)
-        end = int(s["end"] * 1000)
-        if (end - start) / 1000 <= max_len + 0.1:
-            yield segment[start:end], s["text"].strip()
+
+def transcribe(model, clips: List[np.ndarray], rate: int, language: str) -> List[str]:
+    """Texts of clips; those up to 30 s are decoded WHISPER_BATCH at a time in one forward pass."""
+    import torch
+
+    texts = [""] * len(clips)
+    short = [i for i, c in enumerate(clips) if len(c) * WHISPER_RATE <= whisper.audio.N_SAMPLES * rate]
+    options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+    for i in range(0, len(short), WHISPER_BATCH):
+        batch = short[i:i + WHISPER_BATCH]
+        mels = [
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(resample(to_float(clips[j]), rate, WHISPER_RATE)), model.dims.n_mels)
+            for j in batch
+        ]
+        results = whisper.decode(model, torch.stack(mels).to(model.device), options)
+        for j, result in zip(batch, results):
+            texts[j] = result.text.strip()
+    for j in set(range(len(clips))) - set(short):
+        audio = resample(to_float(clips[j]), rate, WHISPER_RATE)
+        texts[j] = model.transcribe(audio, language=language, fp16=False)["text"].strip()
+    return texts
+
+
+def split_source(path: Path, pcm: np.ndarray, rate: int, text: str) -> List[Tuple[np.ndarray, str]]:
+    """The clips of a source (views of pcm) with their texts (see prepare_file)."""
+    if _vad:
+        clips = [pcm[start * rate // 1000:end * rate // 1000] for start, end in vad_regions(pcm, rate, _max_len)]
+    else:
+        clips = [pcm] if len(pcm) else []
+    if not clips:
+        return []
+    if text and len(clips) == 1:
+        return [(clips[0], text)]
+    # several clips (or no transcript at all): only Whisper can say what each one says
+    if whisper is None:
+        if text:
+            print(f"Warning: {path} has {len(clips)} speech regions but Whisper is not installed; keeping it whole", file=sys.stderr)
+            return [(pcm, text)]
+        print(f"Warning: skipping {path}: no transcript and Whisper is not installed", file=sys.stderr)
+        return []
+    texts = transcribe(_whisper(), clips, rate, _language)
+    return [(clip, t) for clip, t in zip(clips, texts) if t]
+
+
+# ---------- per-file work (in-process or on the pool) ----------
+
+_vad = False
+_max_len = 15.0
+_sample_rate = TARGET_SAMPLE_RATE
+_language = "en"
+_threads: int | None = None
+_model = None
+
+
+def init_worker(vad: bool, max_len: float, sample_rate: int = TARGET_SAMPLE_RATE, language: str = "en", threads: int | None = None) -> None:
+    global _vad, _max_len, _sample_rate, _language, _threads
+    _vad, _max_len, _sample_rate, _language, _threads = vad, max_len, sample_rate, language, threads
+
+
+def _whisper():
+    """Whisper, loaded on first use: once per process, and never if every clip has a transcript."""
+    global _model
+    if _model is None:
+        if _threads:
+            import torch
+
+            torch.set_num_threads(_threads)
+        _model = whisper.load_model(WHISPER_MODEL)
+    return _model
+
+
+def prepare_file(job: Tuple[str, str, str, str]) -> dict:
+    """Split, normalize and export one source file into clips/<key>-<n>.wav; returns
+    its manifest entry (clip files and texts, in order) minus the source fields."""
+    key, audio_path, text, clip_dir = job
+    scratch = Path(clip_dir) / f"{key[:20]}.decoded.tmp"
+    clips = []
+    try:
+        pcm, rate = open_pcm(Path(audio_path), scratch)
+        for n, (chunk, chunk_text) in enumerate(split_source(Path(audio_path), pcm, rate, text)):
+            name = f"{key[:20]}-{n:03d}.wav"
+            tmp = Path(clip_dir) / f"{name}.tmp"
+            save_audio(normalize(to_float(chunk)), tmp, rate, _sample_rate)
+            os.replace(tmp, Path(clip_dir) / name)
+            clips.append({"file": name, "text": chunk_text, "seconds": round(len(chunk) / rate, 3)})
+        seconds = len(pcm) / rate
+        del pcm  # unmap before the scratch file goes
+    finally:
+        scratch.unlink(missing_ok=True)
+    return {"key": key, "clips": clips, "seconds": round(seconds, 3)}
+
+
+# ---------- manifest ----------
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path: Path) -> dict:
+    if path.exists():
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "sources": {}}
+
+
+def save_manifest(manifest: dict, path: Path) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def source_hash(path: Path, previous: dict | None) -> str:
+    """Content hash of path, reused from the manifest while size and mtime are unchanged."""
+    st = path.stat()
+    if previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+        return previous["sha256"]
+    return file_sha256(path)
+
+
+def prep_key(name: str, sha256: str, text: str, params: dict) -> str:
+    """What a source's clips depend on: its audio, its transcript line and the prep parameters.
+    The file name is part of it so that two identical sources still get their own clips."""
+    return hashlib.sha256(json.dumps([name, sha256, text, params], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def link_or_copy(src: Path, dest: Path) -> None:
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def emit_progress(done: int, total: int, skipped: int, audio_seconds: float, elapsed: float, bytes_done: int, bytes_total: int) -> None:
+    rate = audio_seconds / elapsed if elapsed > 0 else 0.0
+    eta = elapsed * (bytes_total - bytes_done) / bytes_done if bytes_done else None
+    event = {
+        "event": "progress",
+        "files_done": done,
+        "files_total": total,
+        "files_skipped": skipped,
+        "percent": round(100 * done / total, 1) if total else 100.0,
+        "audio_seconds": round(audio_seconds, 1),
+        "audio_seconds_per_s": round(rate, 2),
+        "eta_s": round(eta, 1) if eta is not None else None,
+    }
+    print(json.dumps(event), flush=True)
 
 
 def main(args: argparse.Namespace) -> None:
     input_dir = Path(args.input_dir)
     out_dir = Path(args.output_dir)
     wav_dir = out_dir / "wavs"
+    clip_dir = out_dir / "clips"
     wav_dir.mkdir(parents=True, exist_ok=True)
+    clip_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / "manifest.json"
+    manifest = load_manifest(manifest_path)
+    params = {
+        "max_len": args.max_len,
+        "vad": VAD_VERSION if args.vad else None,
+        "whisper_model": WHISPER_MODEL if whisper is not None else None,
+        "language": args.language,
+        "sample_rate": args.sample_rate,
+        "target_dbfs": -20.0,
+    }
+
+    # every transcript line, in order; a source whose key is in the manifest is done
+    sources = []
+    jobs = []
+    sizes = {}  # name -> bytes, for every source to process
+    names = {}  # prep key -> name
+    seen = set()
+    log = sys.stderr if args.progress_json else sys.stdout
+    for name, text in load_transcripts(Path(args.transcript_file)):
+        audio_path = input_dir / name
+        if not audio_path.exists():
+            print(f"Warning: missing {audio_path}", file=log)
+            continue
+        if name in seen:
+            print(f"Warning: {name} is listed more than once; using its first line", file=log)
+            continue
+        previous = manifest["sources"].get(name)
+        sha = source_hash(audio_path, previous)
+        key = prep_key(name, sha, text, params)
+        st = audio_path.stat()
+        seen.add(name)
+        sources.append(name)
+        if previous and previous.get("key") == key and all((clip_dir / c["file"]).exists() for c in previous["clips"]):
+            previous.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            continue
+        manifest["sources"][name] = {"key": None, "sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "clips": []}
+        jobs.append((key, str(audio_path), text, str(clip_dir)))
+        sizes[name] = st.st_size
+        names[key] = name
+    skipped = len(sources) - len(jobs)
 
-    transcripts = load_transcripts(Path(args.transcript_file))
+    workers = max(1, min(args.workers, len(jobs) or 1))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    pool = None
+    if workers == 1:
+        if jobs:
+            init_worker(args.vad, args.max_len, args.sample_rate, args.language)
+        results = map(prepare_file, jobs)
+    else:
+        # spawn: torch (Whisper) is not fork-safe once initialized
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(args.vad, args.max_len, args.sample_rate, args.language, threads),
+        )
+        results = (fut.result() for fut in as_completed([pool.submit(prepare_file, job) for job in jobs]))
 
-    model = None
-    if args.vad and whisper is not None:
-        model = whisper.load_model("base")
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    bytes_done, bytes_total = 0, sum(sizes.values())
+    if not jobs and args.progress_json:
+        emit_progress(0, 0, skipped, 0.0, 0.0, 0, 0)  # nothing to do: report completion anyway
+    try:
+        for done, result in enumerate(results, 1):
+            name = names[result["key"]]
+            manifest["sources"][name].update(result)
+            save_manifest(manifest, manifest_path)  # a crash from here on keeps this file
+            audio_seconds += result["seconds"]
+            bytes_done += sizes[name]
+            if args.progress_json:
+                emit_progress(done, len(jobs), skipped, audio_seconds, time.perf_counter() - start, bytes_done, bytes_total)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
 
+    # drop sources no longer in the transcript, and clips no source refers to
+    manifest["sources"] = {name: manifest["sources"][name] for name in sources}
+    save_manifest(manifest, manifest_path)
+    live = {c["file"] for entry in manifest["sources"].values() for c in entry["clips"]}
+    for f in clip_dir.glob("*.wav"):
+        if f.name not in live:
+            f.unlink()
+
+    # numbered in transcript order, so the numbering never depends on timing
+    for f in wav_dir.glob("*.wav"):
+        f.unlink()
     metadata_path = out_dir / "metadata.csv"
+    index = 1
     with metadata_path.open("w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f, delimiter="|")
-        index = 1
-        for name, text in transcripts:
-            audio_path = input_dir / name
-            if not audio_path.exists():
-                print(f"Warning: missing {audio_path}")
-                continue
-            for chunk, chunk_text in maybe_split(audio_path, args.max_len, model, text):
-                chunk = normalize(chunk)
+        for name in sources:
+            for clip in manifest["sources"][name]["clips"]:
                 out_path = wav_dir / f"{index:04d}.wav"
-                save_audio(chunk, out_path)
-                writer.writerow([f"wavs/{out_path.name}", chunk_text or text, args.speaker, args.language])
+                link_or_copy(clip_dir / clip["file"], out_path)
+                writer.writerow([f"wavs/{out_path.name}", clip["text"], args.speaker, args.language])
                 index += 1
-    print(f"Wrote {index-1} clips to {metadata_path}")
+    summary = f"Wrote {index-1} clips to {metadata_path} ({len(jobs)} source(s) processed, {skipped} unchanged)"
+    print(summary, file=log)
 
 
 if __name__ == "__main__":
@@ -116,5 +538,8 @@ if __name__ == "__main__":
     parser.add_argument("--speaker", default="spk1", help="Speaker id")
     parser.add_argument("--language", default="en", help="Language code")
     parser.add_argument("--max-len", type=float, default=15.0, help="Max clip length in seconds")
-    parser.add_argument("--vad", action="store_true", help="Use VAD to split long files")
+    parser.add_argument("--vad", action="store_true", help="Split files into clips at speech pauses (energy/zero-crossing VAD)")
+    parser.add_argument("--sample-rate", type=int, default=TARGET_SAMPLE_RATE, help="Sample rate of the exported clips")
+    parser.add_argument("--progress-json", action="store_true", help="Print a JSON progress line per finished file on stdout")
+    parser.add_argument("--workers", type=int, default=1, help="Process files in parallel (each worker loads its own Whisper if it needs one)")
     main(parser.parse_args())
@@ -1,10 +1,431 @@
+"""
+XTTS inference: a CLI for one-off synthesis, and load_model() / synthesize() for
+long-lived processes. python-services/app.py keeps the model resident in a pool of
+worker processes set up with init_worker(), so a request only pays for inference.
+"""
+
 import argparse
+import hashlib
+import io
+import json
 import os
+import re
+import struct
+import threading
+import unicodedata
+import uuid
+import wave
+from collections import OrderedDict
+from pathlib import Path
 
 import numpy as np
 import pyloudnorm as pyln
-from pydub import AudioSegment
-from TTS.api import TTS
+
+
+def load_model(model_path: str, config_path: str, device: str | None = None, threads: int | None = None):
+    """Load an XTTS checkpoint; threads caps torch's CPU threads, device moves it (e.g. "cuda")."""
+    # imported here so the service process can import this module without torch
+    import torch
+    from TTS.api import TTS
+
+    if threads:
+        torch.set_num_threads(threads)
+    tts = TTS(model_path=model_path, config_path=config_path, progress_bar=False)
+    return tts.to(device) if device else tts
+
+
+DEESS_FREQ = 6000.0  # sibilance band starts here (Hz)
+DEESS_MAX_CUT_DB = 10.0
+DEESS_THRESHOLD = 0.3  # band RMS / full RMS above which a frame counts as sibilant
+DEESS_FRAME_S = 0.01
+DEESS_TAPS = 63  # FIR high-pass length: ~1.5 kHz transition at 24 kHz
+DEESS_BLOCK_FRAMES = 1024  # frames filtered at a time (~10 s), so memory does not grow with the clip
+
+
+def _frame_rms(x: np.ndarray, frame: int) -> np.ndarray:
+    frames = -(-len(x) // frame)
+    padded = np.zeros(frames * frame, dtype=np.float32)
+    padded[: len(x)] = x
+    return np.sqrt(np.mean(np.square(padded.reshape(frames, frame)), axis=1)) + 1e-9
+
+
+def _highpass_kernel(rate: int) -> np.ndarray:
+    """Linear-phase windowed-sinc high-pass centred on 0.875 * DEESS_FREQ."""
+    n = np.arange(DEESS_TAPS) - DEESS_TAPS // 2
+    cutoff = 0.875 * DEESS_FREQ / rate
+    lowpass = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(DEESS_TAPS)
+    kernel = -lowpass / lowpass.sum()
+    kernel[DEESS_TAPS // 2] += 1.0
+    return kernel.astype(np.float32)
+
+
+def _high_band(wav: np.ndarray, start: int, end: int, kernel: np.ndarray) -> np.ndarray:
+    """High band of wav[start:end], filtered with the samples on either side (zeros past the ends)."""
+    half = len(kernel) // 2
+    lo, hi = max(0, start - half), min(len(wav), end + half)
+    padded = np.zeros(end - start + 2 * half, dtype=np.float32)
+    padded[lo - start + half:hi - start + half] = wav[lo:hi]
+    return np.convolve(padded, kernel, mode="valid")
+
+
+def deess(wav: np.ndarray, rate: int) -> np.ndarray:
+    """
+    Turn down the band above DEESS_FREQ, in place, in the 10 ms frames where it is
+    loud relative to the whole signal (by up to DEESS_MAX_CUT_DB); returns wav.
+    Works through the clip DEESS_BLOCK_FRAMES frames at a time with a short FIR
+    high-pass, so the extra memory is a couple of blocks whatever the clip length.
+    """
+    n = len(wav)
+    if n == 0 or DEESS_FREQ >= rate / 2:
+        return wav
+    kernel = _highpass_kernel(rate)
+    frame = max(1, int(rate * DEESS_FRAME_S))
+    block = frame * DEESS_BLOCK_FRAMES
+    starts = range(0, n, block)
+    # pass 1: per-frame gains (one float per 10 ms)
+    full_rms = np.concatenate([_frame_rms(wav[i:i + block], frame) for i in starts])
+    high_rms = np.concatenate([_frame_rms(_high_band(wav, i, min(n, i + block), kernel), frame) for i in starts])
+    gain = np.clip(DEESS_THRESHOLD * full_rms / high_rms, 10 ** (-DEESS_MAX_CUT_DB / 20), 1.0)
+    centres = (np.arange(len(gain)) + 0.5) * frame
+    # pass 2: subtract the cut part of the band; the next block is filtered before this
+    # one changes, since its filter reaches back into this block's last samples
+    high = _high_band(wav, 0, min(n, block), kernel)
+    for i in starts:
+        end = min(n, i + block)
+        following = _high_band(wav, end, min(n, end + block), kernel) if end < n else None
+        # per-sample gain, interpolated between frame centres so the cut has no steps
+        high *= 1.0 - np.interp(np.arange(i, end), centres, gain).astype(np.float32)
+        wav[i:end] -= high
+        high = following
+    return wav
+
+
+def normalize_loudness(wav: np.ndarray, rate: int, lufs: float) -> np.ndarray:
+    """Scale wav in place to lufs integrated loudness; returns wav. Clips shorter than
+    one 400 ms measurement block, or silent ones, are left as they are."""
+    if len(wav) < 0.4 * rate:
+        return wav
+    loudness = pyln.Meter(rate).integrated_loudness(wav)
+    if np.isfinite(loudness):
+        wav *= np.float32(10 ** ((lufs - loudness) / 20))
+    return wav
+
+
+def postprocess(wav: np.ndarray, rate: int, deesser: bool = False, lufs: float | None = None) -> np.ndarray:
+    """Optional de-esser and loudness normalization to lufs (integrated LUFS) of float32
+    mono samples, in place and without an encode/decode pass; returns wav."""
+    if deesser:
+        deess(wav, rate)
+    if lufs is not None:
+        normalize_loudness(wav, rate, lufs)
+    return wav
+
+
+def to_pcm16(wav: np.ndarray) -> bytes:
+    """Float samples (clipped to [-1, 1] in place) as 16-bit little-endian PCM."""
+    np.clip(wav, -1.0, 1.0, out=wav)
+    wav *= 32767
+    return wav.astype("<i2").tobytes()
+
+
+# sentence ends, or line breaks; long sentences are cut further at , ; : and then spaces
+SENTENCE_END = re.compile(r"(?<=[.!?\u2026])\s+|\s*\n\s*")
+CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+MAX_SENTENCE_CHARS = 250  # XTTS's per-call limit for English
+
+
+def split_sentences(text: str, max_chars: int = MAX_SENTENCE_CHARS) -> list[str]:
+    """Split text into sentences of at most max_chars, for synthesis one at a time."""
+    sentences = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        pieces = [sentence]
+        if len(sentence) > max_chars:
+            pieces = _pack(CLAUSE_END.split(sentence), max_chars)
+            pieces = [p for piece in pieces for p in (_pack(piece.split(), max_chars) if len(piece) > max_chars else [piece])]
+        sentences.extend(p for p in pieces if p.strip())
+    return sentences
+
+
+def _pack(parts: list[str], max_chars: int) -> list[str]:
+    """Join consecutive parts with spaces into runs of at most max_chars (a longer part stays whole)."""
+    runs: list[str] = []
+    for part in parts:
+        if runs and len(runs[-1]) + 1 + len(part) <= max_chars:
+            runs[-1] += " " + part
+        else:
+            runs.append(part)
+    return runs
+
+
+def _infer(tts, text: str, language: str, speaker: str | None) -> np.ndarray:
+    kwargs = {}
+    if speaker:
+        kwargs["speaker_wav" if os.path.isfile(speaker) else "speaker"] = speaker
+    return np.asarray(tts.tts(text=text, language=language, **kwargs), dtype=np.float32)
+
+
+def synthesize(
+    tts,
+    text: str,
+    language: str = "en",
+    speaker: str | None = None,
+    deesser: bool = False,
+    lufs: float | None = None,
+) -> bytes:
+    """
+    Synthesize text with a loaded model and return WAV bytes. speaker is a reference
+    recording (path to a .wav) or the name of one of the model's speakers.
+    """
+    wav = _infer(tts, text, language, speaker)
+    rate = tts.synthesizer.output_sample_rate
+    # same scaling as tts_to_file: peak-normalized
+    peak = float(np.max(np.abs(wav))) if wav.size else 0.0
+    wav *= np.float32(1 / max(0.01, peak))
+    return pcm_to_wav(rate, to_pcm16(postprocess(wav, rate, deesser, lufs)))
+
+
+def synthesize_pcm(
+    tts,
+    text: str,
+    language: str = "en",
+    speaker: str | None = None,
+    deesser: bool = False,
+    lufs: float | None = None,
+) -> tuple[int, bytes]:
+    """
+    Synthesize one sentence as raw 16-bit little-endian mono PCM and return
+    (sample rate, bytes), for streaming sentence by sentence. Samples are clipped
+    rather than peak-normalized so consecutive sentences keep the same level.
+    """
+    wav = _infer(tts, text, language, speaker)
+    np.clip(wav, -1.0, 1.0, out=wav)
+    rate = tts.synthesizer.output_sample_rate
+    return rate, to_pcm16(postprocess(wav, rate, deesser, lufs))
+
+
+def pcm_to_wav(rate: int, pcm: bytes) -> bytes:
+    """Wrap 16-bit mono PCM (as from synthesize_pcm) in a WAV header."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return out.getvalue()
+
+
+# ---------- sentence audio cache ----------
+
+AUDIO_CACHE_VERSION = "3"  # bump when synthesize_pcm's output changes for the same inputs
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def checkpoint_hash(model_path: str | Path, config_path: str | Path) -> str:
+    """Identity of a fine-tuned voice: the checkpoint and config contents (reads the whole checkpoint)."""
+    return hashlib.sha256(f"{file_sha256(model_path)}:{file_sha256(config_path)}".encode()).hexdigest()
+
+
+def normalize_sentence(text: str) -> str:
+    """The form cache keys use: NFC, with runs of whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class AudioCache:
+    """
+    Synthesized sentences (sample rate + PCM, see synthesize_pcm), in two tiers: an
+    in-memory LRU of up to memory_bytes in front of an optional on-disk LRU of up to
+    disk_bytes under disk_dir. Disk entries are written atomically and use file
+    mtimes as the LRU clock, like docx_md_roundtrip.ConversionCache; a disk hit is
+    promoted to memory. stats() reports per-tier hits, misses, evictions and sizes.
+    """
+
+    def __init__(self, memory_bytes: int = 64 << 20, disk_dir: str | Path | None = None, disk_bytes: int = 1 << 30) -> None:
+        self.memory_bytes = memory_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict = OrderedDict()  # key -> entry, least recently used first
+        self._memory_total = 0
+        self._disk: OrderedDict | None = None  # key -> size
+        self._disk_total = 0
+        self.counts = dict.fromkeys(
+            ("memory_hits", "disk_hits", "misses", "memory_evictions", "disk_evictions"), 0
+        )
+
+    @staticmethod
+    def key(
+        text: str,
+        voice: str | None,
+        language: str,
+        checkpoint: str,
+        deesser: bool = False,
+        lufs: float | None = None,
+    ) -> str:
+        if voice and os.path.isfile(voice):
+            voice = f"wav:{file_sha256(voice)}"  # a reference recording counts by content
+        parts = [normalize_sentence(text), voice or "", language, checkpoint, deesser, lufs, AUDIO_CACHE_VERSION]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _pack(rate: int, pcm: bytes) -> bytes:
+        return struct.pack("<I", rate) + pcm
+
+    @staticmethod
+    def _unpack(entry: bytes) -> tuple[int, bytes]:
+        return struct.unpack_from("<I", entry)[0], entry[4:]
+
+    def get(self, key: str) -> tuple[int, bytes] | None:
+        """(sample rate, PCM) for key, or None."""
+        with self._lock:
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory[key] = entry
+                self.counts["memory_hits"] += 1
+                return self._unpack(entry)
+            entry = self._disk_get(key)
+            if entry is None:
+                self.counts["misses"] += 1
+                return None
+            self.counts["disk_hits"] += 1
+            self._memory_put(key, entry)
+            return self._unpack(entry)
+
+    def has(self, key: str) -> bool:
+        """Whether key is cached, without reading it or counting a lookup."""
+        with self._lock:
+            return key in self._memory or (self.disk_dir is not None and self._disk_path(key).exists())
+
+    def put(self, key: str, rate: int, pcm: bytes) -> None:
+        entry = self._pack(rate, pcm)
+        with self._lock:
+            self._memory_put(key, entry)
+            self._disk_put(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counts["memory_hits"] + self.counts["disk_hits"] + self.counts["misses"]
+            hits = lookups - self.counts["misses"]
+            return {
+                **self.counts,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_total,
+                "disk_entries": len(self._disk or ()),
+                "disk_bytes": self._disk_total,
+            }
+
+    def _memory_put(self, key: str, entry: bytes) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_total -= len(old)
+        if len(entry) > self.memory_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_total += len(entry)
+        while self._memory_total > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_total -= len(dropped)
+            self.counts["memory_evictions"] += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / key
+
+    def _disk_scan(self) -> None:
+        entries = []
+        for f in self.disk_dir.glob("??/*"):
+            if f.name.endswith(".tmp"):
+                continue
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, f.name, st.st_size))
+        entries.sort()
+        self._disk = OrderedDict((name, size) for _, name, size in entries)
+        self._disk_total = sum(self._disk.values())
+
+    def _disk_get(self, key: str) -> bytes | None:
+        if self.disk_dir is None:
+            return None
+        if self._disk is None:
+            self._disk_scan()
+        path = self._disk_path(key)
+        try:
+            entry = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            self._disk_total -= self._disk.pop(key, 0)
+            return None
+        self._disk_total -= self._disk.pop(key, 0)
+        self._disk[key] = len(entry)
+        self._disk_total += len(entry)
+        return entry
+
+    def _disk_put(self, key: str, entry: bytes) -> None:
+        if self.disk_dir is None:
+            return
+        if self._disk is None:
+            self._disk_scan()
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(entry)
+        os.replace(tmp, path)
+        self._disk_total -= self._disk.pop(key, 0)
+        self._disk[key] = len(entry)
+        self._disk_total += len(entry)
+        if self._disk_total > self.disk_bytes:
+            self._disk_scan()  # pick up what other processes wrote since the last scan
+            while self._disk_total > self.disk_bytes and self._disk:
+                old, size = self._disk.popitem(last=False)
+                self._disk_total -= size
+                self._disk_path(old).unlink(missing_ok=True)
+                self.counts["disk_evictions"] += 1
+
+
+# ---------- resident model for worker processes ----------
+
+_worker_tts = None
+
+
+def init_worker(model_path: str, config_path: str, device: str | None = None, threads: int | None = None) -> None:
+    """Process pool initializer: load the model once and run a short warm-up inference."""
+    global _worker_tts
+    _worker_tts = load_model(model_path, config_path, device, threads)
+    synthesize(_worker_tts, "Ready.")  # the first inference allocates its buffers; pay that here
+
+
+def synthesize_in_worker(
+    text: str,
+    language: str = "en",
+    speaker: str | None = None,
+    deesser: bool = False,
+    lufs: float | None = None,
+) -> bytes:
+    """synthesize() with the model loaded by init_worker()."""
+    if _worker_tts is None:
+        raise RuntimeError("XTTS model not loaded; use init_worker() as the pool initializer")
+    return synthesize(_worker_tts, text, language, speaker, deesser, lufs)
+
+
+def synthesize_pcm_in_worker(
+    text: str,
+    language: str = "en",
+    speaker: str | None = None,
+    deesser: bool = False,
+    lufs: float | None = None,
+) -> tuple[int, bytes]:
+    """synthesize_pcm() with the model loaded by init_worker()."""
+    if _worker_tts is None:
+        raise RuntimeError("XTTS model not loaded; use init_worker() as the pool initializer")
+    return synthesize_pcm(_worker_tts, text, language, speaker, deesser, lufs)
 
 
 def main():
@@ -18,22 +439,9 @@ def main():
     parser.add_argument("--lufs", type=float, help="Normalize output to target LUFS")
     args = parser.parse_args()
 
-    tts = TTS(model_path=args.model_path, config_path=args.config_path, progress_bar=False)
-    tts.tts_to_file(text=args.text, language=args.language, file_path=args.out)
-
-    if args.deesser or args.lufs is not None:
-        seg = AudioSegment.from_file(args.out)
-        if args.deesser:
-            high = seg.high_pass_filter(6000)
-            seg = seg.overlay(high, gain_during_overlay=-10)
-        if args.lufs is not None:
-            samples = np.array(seg.get_array_of_samples()).astype(np.float32)
-            if seg.channels > 1:
-                samples = samples.reshape((-1, seg.channels)).mean(axis=1)
-            meter = pyln.Meter(seg.frame_rate)
-            loudness = meter.integrated_loudness(samples / (1 << 15))
-            seg = seg.apply_gain(args.lufs - loudness)
-        seg.export(args.out, format="wav")
+    tts = load_model(args.model_path, args.config_path)
+    # post-processing runs on the model's samples, so the file is written once
+    Path(args.out).write_bytes(synthesize(tts, args.text, args.language, None, args.deesser, args.lufs))
 
 
 if __name__ == "__main__":
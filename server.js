@@ -12,7 +12,6 @@ const { logger, requestIdMiddleware, httpLogger } = require('./utils/logger');
 const redis = require('./queues/redis');
 const { validateEnv } = require('./utils/env');
 const { getPython } = require('./utils/python');
-const cache = require('./utils/cache');
 
 validateEnv();
 const app = express();
@@ -30,6 +29,30 @@ const httpRequestDuration = new client.Histogram({
   help: 'Duration of HTTP requests in ms',
   labelNames: ['method', 'route', 'code'],
 });
+// fed from the JSON span lines docx_md_roundtrip.py writes with --metrics-out -
+const convertStageDuration = new client.Histogram({
+  name: 'convert_stage_duration_ms',
+  help: 'Duration of docx_md_roundtrip.py conversion stages in ms',
+  labelNames: ['stage', 'direction'],
+});
+const convertStageBytes = new client.Counter({
+  name: 'convert_stage_bytes_total',
+  help: 'Bytes into and out of docx_md_roundtrip.py conversion stages',
+  labelNames: ['stage', 'direction', 'io'],
+});
+function recordConvertSpans(stderr, direction) {
+  for (const line of stderr.split('\n')) {
+    if (!line.startsWith('{"span"')) continue;
+    try {
+      const span = JSON.parse(line);
+      convertStageDuration.observe({ stage: span.span, direction }, span.seconds * 1000);
+      if (span.bytes_in) convertStageBytes.inc({ stage: span.span, direction, io: 'in' }, span.bytes_in);
+      if (span.bytes_out) convertStageBytes.inc({ stage: span.span, direction, io: 'out' }, span.bytes_out);
+    } catch (err) {
+      logger.warn(`Unparseable conversion span: ${line}`);
+    }
+  }
+}
 app.use((req, res, next) => {
   const end = httpRequestDuration.startTimer();
   res.on('finish', () => {
@@ -55,49 +78,86 @@ const apiKeyMiddleware = (req, res, next) => {
 
 app.use('/api', apiKeyMiddleware);
 
+const CONVERT_DIRECTIONS = new Set(['to-md', 'to-docx']);
+
 app.post('/convert', upload.single('file'), (req, res) => {
   const file = req.file;
   const direction = req.body.direction;
   if (!file) {
     return res.status(400).send('No file uploaded');
   }
-  const outputExt = direction === 'to-md' ? '.md' : '.docx';
-  const buffer = fs.readFileSync(file.path);
+  // direction becomes the converter's subcommand; anything else (e.g. batch) would read the upload as a manifest
+  if (!CONVERT_DIRECTIONS.has(direction)) {
+    fs.unlink(file.path, () => {});
+    return res.status(400).send('direction must be to-md or to-docx');
+  }
+  if (process.env.CONVERT_VIA_GRPC === 'true') {
+    // warm worker pool in python-services/app.py; no interpreter spawn per request
+    return require('./utils/pythonService')
+      .convert(direction, fs.readFileSync(file.path))
+      .then((data) => {
+        if (direction === 'to-md') return res.json({ content: Buffer.from(data).toString('utf8') });
+        res.attachment('output.docx');
+        res.send(Buffer.from(data));
+      })
+      .catch((err) => {
+        logger.error(`gRPC conversion failed: ${err.message}`);
+        res.status(500).send('Conversion failed');
+      });
+  }
+  // "-o -": the converter streams its output on stdout, so nothing is written to and re-read from uploads/
+  const args = ['docx_md_roundtrip.py', direction, file.path, '-o', '-', '--metrics-out', '-'];
+  if (direction === 'to-md') {
+    args.push('--link-base', 'uploads'); // image links as if the Markdown were saved next to the upload
+  }
   if (process.env.ENABLE_CONVERT_CACHE === 'true') {
-    const cached = cache.get(buffer, outputExt);
-    if (cached) {
-      if (direction === 'to-md') {
-        return res.json({ content: cached.toString('utf8') });
-      }
-      const tmp = path.join('uploads', file.filename + outputExt);
-      fs.writeFileSync(tmp, cached);
-      return res.download(tmp, 'output.docx');
-    }
+    // keyed on input, --ref, pandoc and converter version; LRU-bounded by CONVERT_CACHE_MB
+    args.push('--cache-dir', process.env.CONVERT_CACHE_DIR || path.join('data', 'cache', 'convert'));
+    if (process.env.CONVERT_CACHE_MB) args.push('--cache-max-mb', process.env.CONVERT_CACHE_MB);
   }
-  const outputPath = path.join('uploads', file.filename + outputExt);
-  const args = ['docx_md_roundtrip.py', direction, file.path, '-o', outputPath];
   const py = spawn(getPython('COQUI_PY'), args);
+  const chunks = [];
+  let stderr = '';
+  py.stderr.on('data', (chunk) => {
+    stderr += chunk;
+  });
+  if (direction === 'to-md') {
+    py.stdout.on('data', (chunk) => chunks.push(chunk));
+  } else {
+    res.attachment('output.docx');
+    py.stdout.pipe(res, { end: false });
+  }
   py.on('close', (code) => {
+    recordConvertSpans(stderr, direction);
     if (code !== 0) {
+      if (res.headersSent) return res.destroy();
+      res.removeHeader('Content-Disposition');
       return res.status(500).send('Conversion failed');
     }
-    const data = fs.readFileSync(outputPath);
-    if (process.env.ENABLE_CONVERT_CACHE === 'true') {
-      cache.set(buffer, outputExt, data);
-    }
     if (direction === 'to-md') {
-      res.json({ content: data.toString('utf8') });
-    } else {
-      res.download(outputPath, 'output.docx');
+      return res.json({ content: Buffer.concat(chunks).toString('utf8') });
     }
+    res.end();
   });
 });
 
 app.post('/api/tts', (req, res) => {
-  const { text } = req.body;
+  const { text, voice, language } = req.body;
   if (!text) {
     return res.status(400).send('Text is required');
   }
+  if (process.env.TTS_VIA_GRPC === 'true') {
+    // model stays loaded in python-services/app.py; only inference per request
+    const outputFile = path.join('media', `tts_${Date.now()}.wav`);
+    return require('./utils/pythonService')
+      .synthesize(text, voice, language)
+      .then((audio) => fs.promises.writeFile(outputFile, audio))
+      .then(() => res.json({ audio: outputFile }))
+      .catch((err) => {
+        logger.error(`gRPC TTS failed: ${err.message}`);
+        res.status(500).send('TTS failed');
+      });
+  }
   const modelPath = process.env.XTTS_MODEL_PATH;
   const configPath = process.env.XTTS_CONFIG_PATH;
   if (!modelPath || !configPath) {
@@ -121,6 +181,50 @@ app.post('/api/tts', (req, res) => {
   });
 });
 
+// WAV header for a stream of unknown length (sizes set to the maximum, as players expect)
+function streamingWavHeader({ sample_rate, channels }) {
+  const header = Buffer.alloc(44);
+  header.write('RIFF', 0);
+  header.writeUInt32LE(0xffffffff, 4);
+  header.write('WAVEfmt ', 8);
+  header.writeUInt32LE(16, 16);
+  header.writeUInt16LE(1, 20); // PCM
+  header.writeUInt16LE(channels, 22);
+  header.writeUInt32LE(sample_rate, 24);
+  header.writeUInt32LE(sample_rate * channels * 2, 28);
+  header.writeUInt16LE(channels * 2, 32);
+  header.writeUInt16LE(16, 34);
+  header.write('data', 36);
+  header.writeUInt32LE(0xffffffff, 40);
+  return header;
+}
+
+// Audio starts as soon as the first sentence is synthesized (needs the gRPC TTS service)
+app.post('/api/tts/stream', (req, res) => {
+  const { text, voice, language } = req.body;
+  if (!text) {
+    return res.status(400).send('Text is required');
+  }
+  const { call, done } = require('./utils/pythonService').synthesizeStream(text, voice, language, {
+    onFormat: (format) => {
+      res.type('audio/wav');
+      res.write(streamingWavHeader(format));
+    },
+    onAudio: (pcm) => res.write(pcm),
+  });
+  res.on('close', () => {
+    if (!res.writableFinished) call.cancel();
+  });
+  done
+    .then(() => res.end())
+    .catch((err) => {
+      if (err.code === 1) return; // cancelled because the client went away
+      logger.error(`gRPC TTS stream failed: ${err.message}`);
+      if (res.headersSent) return res.destroy();
+      res.status(500).send('TTS failed');
+    });
+});
+
 const training = require('./routes/training');
 app.use('/api', training);
 
@@ -8,3 +8,11 @@ test('health endpoint', async () => {
   assert.equal(res.status, 200);
   assert.ok(res.body.ok);
 });
+
+test('convert rejects directions other than to-md and to-docx', async () => {
+  const res = await request(app)
+    .post('/convert')
+    .field('direction', 'batch')
+    .attach('file', Buffer.from('{"input": "/etc/hostname", "output": "/tmp/x.md"}\n'), 'manifest.jsonl');
+  assert.equal(res.status, 400);
+});
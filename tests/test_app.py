@@ -0,0 +1,143 @@
+import asyncio
+import io
+import shutil
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "proto"), str(ROOT / "python-services")]
+
+pytest.importorskip("grpc")
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+import grpc  # noqa: E402
+
+import app  # noqa: E402
+import docx_md_roundtrip as rt  # noqa: E402
+from proto import convert_pb2  # noqa: E402
+
+SAMPLE_DOCX = ROOT / "data" / "SOW Final 2025.docx"
+
+
+class Aborted(Exception):
+    pass
+
+
+class Context:
+    """What the servicers use of grpc.aio.ServicerContext: abort raises."""
+
+    async def abort(self, code, details):
+        raise Aborted(code, details)
+
+
+def test_convert_media_dir_stays_under_the_root(tmp_path):
+    root = tmp_path / "media"
+    assert app.ConvertService.media_dir("", root) == root.resolve()
+    assert app.ConvertService.media_dir("job-1/images", root) == (root / "job-1" / "images").resolve()
+    assert app.ConvertService.media_dir(str(root / "abs"), root) == (root / "abs").resolve()
+    for escape in ("..", "../elsewhere", "job/../../elsewhere", "/tmp", str(tmp_path / "mediaX")):
+        assert app.ConvertService.media_dir(escape, root) is None
+
+
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc not on PATH")
+def test_convert_service_pool_matches_file_based_conversion(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app, "CONVERT_MEDIA_ROOT", str(tmp_path / "media"))
+    data = SAMPLE_DOCX.read_bytes()
+
+    async def run():
+        service = app.ConvertService(workers=2)
+        try:
+            await service.warm()
+            assert app.ready["convert"]
+            calls = [convert_pb2.DocxToMdRequest(docx=data, media_dir="job") for _ in range(3)]
+            replies = await asyncio.gather(*(service.DocxToMd(call, Context()) for call in calls))
+            errors = []
+            for request in (
+                convert_pb2.DocxToMdRequest(docx=data, media_dir="../outside"),
+                convert_pb2.DocxToMdRequest(docx=data, image_mode="inline"),
+            ):
+                with pytest.raises(Aborted) as exc:
+                    await service.DocxToMd(request, Context())
+                errors.append(exc.value.args[0])
+            md = replies[0].markdown
+            docx = await service.MdToDocx(convert_pb2.MdToDocxRequest(markdown=md), Context())
+            return replies, errors, docx.docx
+        finally:
+            service.pool.shutdown()
+
+    replies, errors, docx = asyncio.run(run())
+    expected = rt.docx_to_md(SAMPLE_DOCX, tmp_path / "a.md", tmp_path / "media" / "job", link_base=tmp_path).read_text(encoding="utf-8")
+    assert {r.markdown.decode("utf-8") for r in replies} == {expected}
+    assert errors == [grpc.StatusCode.INVALID_ARGUMENT] * 2
+    assert not (tmp_path / "outside").exists()
+    with zipfile.ZipFile(io.BytesIO(docx)) as a, zipfile.ZipFile(io.BytesIO(rt.md_bytes_to_docx(replies[0].markdown))) as b:
+        assert a.read("word/document.xml") == b.read("word/document.xml")
+
+
+def test_tts_workers_are_split_across_serving_processes():
+    assert [app.tts_share(i, 3, total=7) for i in range(3)] == [3, 2, 2]
+    assert [app.tts_share(i, 4, total=1) for i in range(4)] == [1, 1, 1, 1]  # every worker can answer TTS
+    assert app.tts_share(0, 1, total=2) == 2
+
+
+class FakeEngine:
+    """Upper-cases segments and records every batch it is sent."""
+
+    def __init__(self, version="fake-1", drop=False):
+        self.version = version
+        self.drop = drop
+        self.batches = []
+
+    def translate_batch(self, segments, target_language):
+        self.batches.append(list(segments))
+        out = [f"{s.upper()} [{target_language}]" for s in segments]
+        return out[:-1] if self.drop else out
+
+
+def test_translation_dedupes_batches_and_remembers(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "TRANSLATE_BATCH_SIZE", 2)
+    engine = FakeEngine()
+    service = app.TranslationService(engine, app.TranslationMemory(tmp_path / "tm.sqlite3"))
+    segments = ["one", "two", "one", " ", "three", "four", "five", "two"]
+
+    out, hits, sent = asyncio.run(service.translate(segments, "de"))
+    assert out == ["ONE [de]", "TWO [de]", "ONE [de]", " ", "THREE [de]", "FOUR [de]", "FIVE [de]", "TWO [de]"]
+    assert (hits, sent) == (0, 5)
+    assert engine.batches == [["one", "two"], ["three", "four"], ["five"]]  # distinct, non-blank, in batches
+
+    # a new process on the same file: everything comes from memory, per language
+    engine.batches.clear()
+    service = app.TranslationService(engine, app.TranslationMemory(tmp_path / "tm.sqlite3"))
+    assert asyncio.run(service.translate(["two", "six"], "de")) == (["TWO [de]", "SIX [de]"], 1, 1)
+    assert asyncio.run(service.translate(["two"], "fr")) == (["TWO [fr]"], 0, 1)
+    assert engine.batches == [["six"], ["two"]]
+    assert service.memory.stats() == {"hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+def test_translation_memory_is_keyed_by_engine_version(tmp_path):
+    memory = app.TranslationMemory(tmp_path / "tm.sqlite3")
+    asyncio.run(app.TranslationService(FakeEngine("fake-1"), memory).translate(["hello"], "de"))
+    upgraded = FakeEngine("fake-2")
+    assert asyncio.run(app.TranslationService(upgraded, memory).translate(["hello"], "de")) == (["HELLO [de]"], 0, 1)
+    assert upgraded.batches == [["hello"]]
+    assert memory.lookup(["hello", "other"], "de", "fake-1") == {"hello": "HELLO [de]"}
+
+
+def test_translate_batch_rejects_a_short_engine_reply(tmp_path):
+    from proto import translation_pb2
+
+    memory = app.TranslationMemory(tmp_path / "tm.sqlite3")
+    service = app.TranslationService(FakeEngine(drop=True), memory)
+    request = translation_pb2.TranslateBatchRequest(segments=["a", "b"], target_language="de")
+    with pytest.raises(Aborted) as exc:
+        asyncio.run(service.TranslateBatch(request, Context()))
+    assert exc.value.args[0] == grpc.StatusCode.INTERNAL and "1 segments for 2" in exc.value.args[1]
+    assert memory.lookup(["a", "b"], "de", "fake-1") == {}  # nothing half-stored
+
+    reply = asyncio.run(app.TranslationService(FakeEngine(), memory).TranslateBatch(request, Context()))
+    assert (list(reply.segments), reply.memory_hits, reply.translated) == (["A [de]", "B [de]"], 0, 2)
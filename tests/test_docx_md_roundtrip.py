@@ -0,0 +1,503 @@
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import docx_md_roundtrip as rt  # noqa: E402
+
+SAMPLE_DOCX = ROOT / "data" / "SOW Final 2025.docx"
+
+pytestmark = pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc not on PATH")
+
+
+@pytest.fixture
+def sample_html(tmp_path):
+    """Mammoth HTML and pandoc metadata file for the sample SOW, as docx_to_markdown builds them."""
+    import mammoth
+
+    styles = rt.collect_used_styles(SAMPLE_DOCX)
+    with SAMPLE_DOCX.open("rb") as f:
+        html = mammoth.convert_to_html(
+            f,
+            style_map=rt.build_mammoth_style_map(*styles),
+            convert_image=mammoth.images.inline(lambda image: {"src": "media/img.png"}),
+        ).value
+    meta = tmp_path / "meta.yaml"
+    meta.write_text(rt.yaml.safe_dump({"style_map": {k: v for d in styles for k, v in d.items()}}), encoding="utf-8")
+    return html, meta
+
+
+def python_docx_styles(path):
+    """The style scan collect_used_styles replaced, on python-docx's object model."""
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
+
+    doc = Document(str(path))
+    found = ({}, {}, {})
+    for p in doc.paragraphs:
+        if p.style is not None and p.style.type == WD_STYLE_TYPE.PARAGRAPH:
+            found[0].setdefault(rt.slug_token(p.style.name), p.style.name)
+        for r in p.runs:
+            if r.style is not None and r.style.type == WD_STYLE_TYPE.CHARACTER:
+                found[1].setdefault(rt.slug_token(r.style.name), r.style.name)
+    for t in doc.tables:
+        if t.style is not None and t.style.type == WD_STYLE_TYPE.TABLE:
+            found[2].setdefault(rt.slug_token(t.style.name), t.style.name)
+    return found
+
+
+def test_collect_used_styles_matches_python_docx_on_sample():
+    assert rt.collect_used_styles(SAMPLE_DOCX) == python_docx_styles(SAMPLE_DOCX)
+
+
+def test_collect_used_styles_matches_python_docx_on_edge_cases(tmp_path):
+    from docx import Document
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    def set_style(parent, pr_tag, style_tag, style_id):
+        pr = parent.find(qn(pr_tag))
+        if pr is None:
+            pr = OxmlElement(pr_tag)
+            parent.insert(0, pr)
+        el = OxmlElement(style_tag)
+        el.set(qn("w:val"), style_id)
+        pr.append(el)
+
+    doc = Document()
+    doc.add_heading("Built-in heading", level=1)  # styles.xml says "heading 1"; the UI name is "Heading 1"
+    missing = doc.add_paragraph("Unknown style id")
+    set_style(missing._p, "w:pPr", "w:pStyle", "NoSuchStyle")  # falls back to the default (Normal)
+    mismatched = doc.add_paragraph("Character style as paragraph style, ")
+    set_style(mismatched._p, "w:pPr", "w:pStyle", "Strong")
+    set_style(mismatched.add_run("paragraph style as character style")._r, "w:rPr", "w:rStyle", "Quote")
+    linked = doc.add_paragraph("Text then ")
+    link = OxmlElement("w:hyperlink")
+    link.append(linked.add_run("a linked run")._r)  # runs inside a hyperlink are not direct runs
+    set_style(link[0], "w:rPr", "w:rStyle", "IntenseEmphasis")
+    linked._p.append(link)
+    doc.add_paragraph("Emphasised", style="List Bullet").add_run(" words").style = "Emphasis"
+    table = doc.add_table(rows=1, cols=1)  # no tblStyle: the default table style
+    cell = table.cell(0, 0)
+    cell.paragraphs[0].style = "Intense Quote"  # not a body-level paragraph
+    cell.paragraphs[0].add_run("in a cell").style = "Book Title"
+    cell.add_table(rows=1, cols=1).style = "Light Grid"  # nor a body-level table
+    doc.add_table(rows=1, cols=1).style = "Table Grid"
+    path = tmp_path / "edge.docx"
+    doc.save(str(path))
+
+    p_styles, r_styles, t_styles = rt.collect_used_styles(path)
+    assert (p_styles, r_styles, t_styles) == python_docx_styles(path)
+    assert "Heading 1" in p_styles.values() and "NoSuchStyle" not in p_styles.values()
+    assert "Strong" not in p_styles.values() and "Quote" not in r_styles.values()
+    assert not {"Intense Emphasis", "Book Title"} & set(r_styles.values()) and "Emphasis" in r_styles.values()
+    assert "Intense Quote" not in p_styles.values() and "Light Grid" not in t_styles.values()
+    assert set(t_styles.values()) == {"Normal Table", "Table Grid"}
+
+
+def test_split_html_sections_cuts_only_before_top_level_headings():
+    html = '<h1>A</h1><p>x<br />y</p><table><tr><td><h1>nested</h1></td></tr></table><h2 class="S">B</h2><ul><li>z</li></ul>'
+    parts = rt.split_html_sections(html)
+    assert "".join(parts) == html
+    assert parts == [
+        '<h1>A</h1><p>x<br />y</p><table><tr><td><h1>nested</h1></td></tr></table>',
+        '<h2 class="S">B</h2><ul><li>z</li></ul>',
+    ]
+
+
+def test_chunked_html_to_markdown_matches_single_pass(sample_html):
+    html, meta = sample_html
+    assert len(rt.split_html_sections(html)) > 2
+    single = rt.html_to_markdown(html, meta)
+    # min_chunk=1 forces one pandoc run per section
+    assert rt.html_to_markdown_chunked(html, meta, workers=4, min_chunk=1) == single
+
+
+def test_chunked_html_to_markdown_numbers_attributed_headings_like_a_single_pass(sample_html, monkeypatch):
+    html, meta = sample_html
+    styled = re.sub(r"<h([12])>", r'<h\1 class="styled">', html)
+    styled += '<h1 class="styled">Project Name</h1><p>Again.</p><h2 class="styled">Project Name</h2><h3 class="x">Training</h3>'
+    single = rt.html_to_markdown(styled, meta)
+    assert "# Project Name {#project-name-1 .styled}" in single and "{#training-1 .x}" in single
+
+    runs = []
+    one_pass = rt.html_to_markdown
+    monkeypatch.setattr(rt, "html_to_markdown", lambda chunk, meta_file: runs.append(chunk) or one_pass(chunk, meta_file))
+    assert rt.html_to_markdown_chunked(styled, meta, workers=4, min_chunk=1) == single
+    assert len(runs) > 2  # still split, not one pass over the whole document
+
+
+def test_docx_to_markdown_parallel_chunks_is_identical(tmp_path):
+    single = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path)
+    chunked = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path, parallel_chunks=4)
+    assert chunked == single
+
+
+STYLE_MAP = {"Body_Text": "Body Text", "Heading_1": "Heading 1", "Grid": "Grid Table"}
+
+# Blocks the native engine renders on its own, without calling pandoc.
+NATIVE_CORPUS = [
+    "<p>Plain text, with punctuation; don’t “quote” – dash — and… more.</p>",
+    "<p>Escapes: a*b [x] 2^3 ~y~ `c` x|y &lt;tag&gt; $5 snake_case</p>",
+    "<p><strong>bold </strong><em>italic</em> <s>gone</s> H<sub>2</sub>O x<sup>2</sup></p>",
+    "<p>line one<br />line two</p>",
+    '<p><a href="https://example.com/a">a link</a></p>',
+    '<p><a id="_Toc1"></a>Anchored <span class="Nope">span</span> <span class="Body_Text">styled</span></p>',
+    '<p><img src="media/img-0.png" alt="a chart" /></p>',
+    "<h1>Scope</h1><h2>Scope</h2><h3>Scope of work</h3>",
+    '<h1 class="Heading_1">Styled</h1><h1 class="Heading_1">Styled</h1>',
+    "<ul><li>one</li><li><strong>two</strong></li></ul><p>between</p><ol><li>first</li><li>second</li></ol>",
+    "<table><thead><tr><th><p>Name</p></th><th><p>Value</p></th></tr></thead>"
+    "<tbody><tr><td><p>a</p></td><td><p>1</p></td></tr><tr><td><p>longer name</p></td><td><p>22</p></td></tr></tbody></table>",
+    '<table class="Grid"><tr><td><p>x</p></td><td><p>y</p></td></tr></table>',
+    '<div class="Body_Text"><p>inside a styled div</p></div>',
+]
+
+# Blocks that need pandoc (complex tables, odd nesting, ...); the native engine must splice them in unchanged.
+FALLBACK_CORPUS = [
+    "<ul><li>a</li></ul><ul><li>b</li></ul>",
+    "<p><sup>with space</sup> <sub>a b</sub></p>",
+    "<table><tr><td><p>one</p><p>two</p></td></tr></table>",
+    "<ul><li><p>para</p><ul><li>nested</li></ul></li></ul>",
+    '<p><a href="#_Toc1"><a id="_Toc2"></a></a>text</p>',
+    "<p>1. looks like a list</p><p>plain</p><p>- also</p>",
+    '<p>_lead <a href="https://example.com">https://example.com</a></p>',
+    "<p>ok!<span class=\"Nope\">x</span></p><blockquote><p>quoted</p></blockquote>",
+]
+
+
+@pytest.fixture
+def meta_file(tmp_path):
+    meta = tmp_path / "meta.yaml"
+    meta.write_text(rt.yaml.safe_dump({"style_map": STYLE_MAP}), encoding="utf-8")
+    return meta
+
+
+@pytest.mark.parametrize("html", NATIVE_CORPUS + FALLBACK_CORPUS)
+def test_native_engine_matches_pandoc(html, meta_file):
+    assert rt.native_html_to_markdown(html, STYLE_MAP, meta_file) == rt.html_to_markdown(html, meta_file)
+
+
+@pytest.mark.parametrize("html", NATIVE_CORPUS)
+def test_native_engine_does_not_call_pandoc_for_supported_blocks(html, meta_file, monkeypatch):
+    expected = rt.html_to_markdown(html, meta_file)
+
+    def no_pandoc(*args, **kwargs):
+        raise AssertionError("pandoc was called")
+
+    monkeypatch.setattr(rt, "html_to_markdown", no_pandoc)
+    assert rt.native_html_to_markdown(html, STYLE_MAP, meta_file) == expected
+
+
+def test_native_engine_matches_pandoc_on_sample(sample_html):
+    html, meta = sample_html
+    style_map = rt.yaml.safe_load(meta.read_text(encoding="utf-8"))["style_map"]
+    assert rt.native_html_to_markdown(html, style_map, meta) == rt.html_to_markdown(html, meta)
+
+
+def test_docx_to_markdown_native_engine_is_identical(tmp_path):
+    pandoc = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path)
+    native = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path, engine="native")
+    assert native == pandoc
+
+
+def test_conversion_cache_keys_counts_and_evicts(tmp_path):
+    cache = rt.ConversionCache(tmp_path / "cache", max_bytes=25)
+    key = cache.key("to-docx", b"# Title\n")
+    assert key != cache.key("to-md", b"# Title\n")
+    assert key != cache.key("to-docx", b"# Title\n", b"reference bytes")
+    assert cache.get(key) is None
+
+    cache.put(key, b"x" * 10)
+    assert cache.get(key) == b"x" * 10
+    cache.put("b" * 64, b"y" * 10)
+    cache.get(key)  # key is now the most recently used
+    cache.put("c" * 64, b"z" * 10)  # 30 bytes > 25: evicts "b..."
+    assert cache.get("b" * 64) is None
+    assert cache.stats() == {"hits": 2, "misses": 2, "evictions": 1, "entries": 2, "bytes": 20}
+    assert not list((tmp_path / "cache").rglob("*.tmp"))
+
+
+def test_docx_to_md_cache_hit_is_identical(tmp_path):
+    cache = rt.ConversionCache(tmp_path / "cache")
+    first = rt.docx_to_md(SAMPLE_DOCX, tmp_path / "a.md", tmp_path / "media", cache=cache).read_text(encoding="utf-8")
+    second = rt.docx_to_md(SAMPLE_DOCX, tmp_path / "b.md", tmp_path / "media", cache=cache).read_text(encoding="utf-8")
+    assert second == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a hit whose images were deleted is a miss, and the images come back
+    for img in (tmp_path / "media").iterdir():
+        img.unlink()
+    rt.docx_to_md(SAMPLE_DOCX, tmp_path / "c.md", tmp_path / "media", cache=cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert rt.MEDIA_NAME.findall(first) and all((tmp_path / "media" / n).exists() for n in rt.MEDIA_NAME.findall(first))
+
+
+def test_image_modes_skip_and_lazy(tmp_path):
+    extracted = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path)
+    names = rt.MEDIA_NAME.findall(extracted)
+    assert names
+
+    skipped = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "skip", tmp_path, image_mode="skip")
+    assert "#skipped-image-1" in skipped and not rt.MEDIA_NAME.findall(skipped)
+    assert not list((tmp_path / "skip").iterdir())
+
+    lazy = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "lazy", tmp_path, image_mode="lazy")
+    links = sorted({m.group(0) for m in rt.LAZY_NAME.finditer(lazy)})
+    assert len(links) == len(set(names)) and not list((tmp_path / "lazy").glob("lazy-*"))
+    paths = rt.materialize_lazy_links(lazy, tmp_path)
+    assert sorted(p.name for p in paths) == links
+    extracted_bytes = sorted((tmp_path / "media" / n).read_bytes() for n in set(names))
+    assert sorted(p.read_bytes() for p in paths) == extracted_bytes
+    assert not list((tmp_path / "lazy" / rt.LAZY_DIR).glob("*.docx"))  # a file on disk is not copied
+
+
+def test_lazy_images_follow_their_source_file(tmp_path):
+    source = tmp_path / "doc.docx"
+    shutil.copyfile(SAMPLE_DOCX, source)
+    lazy = rt.docx_to_markdown(source, tmp_path / "media", tmp_path, image_mode="lazy")
+    name = rt.LAZY_NAME.search(lazy).group(0)
+    os.utime(source, ns=(0, 0))  # touched, not changed
+    rt.materialize_media(tmp_path / "media", name).unlink()
+    source.rename(tmp_path / "moved.docx")
+    with pytest.raises(FileNotFoundError, match="gone or changed"):
+        rt.materialize_media(tmp_path / "media", name)
+
+    # a transient stream has nothing to point at: its bytes are kept
+    streamed = rt.docx_to_markdown(io.BytesIO(SAMPLE_DOCX.read_bytes()), tmp_path / "media", tmp_path, image_mode="lazy")
+    assert streamed == lazy
+    assert len(list((tmp_path / "media" / rt.LAZY_DIR).glob("*.docx"))) == 1
+    assert rt.materialize_media(tmp_path / "media", name).exists()
+
+
+def test_compile_reference_keeps_styles_and_drops_body(tmp_path):
+    template = rt.compile_reference(SAMPLE_DOCX, tmp_path)
+    assert rt.compile_reference(SAMPLE_DOCX.read_bytes(), tmp_path) == template
+    assert template.stat().st_size < SAMPLE_DOCX.stat().st_size
+
+    with zipfile.ZipFile(SAMPLE_DOCX) as src, zipfile.ZipFile(template) as slim:
+        for part in ("word/styles.xml", "word/numbering.xml", "word/theme/theme1.xml"):
+            assert slim.read(part) == src.read(part)
+        assert not any(name.startswith("customXml/") for name in slim.namelist())
+        document = slim.read("word/document.xml")
+        assert b"<w:p " not in document and b"<w:p>" not in document
+        assert document.count(b"<w:sectPr") == 1 and b"w:headerReference" in document
+
+
+def test_md_to_docx_with_slim_reference_matches_full_reference(tmp_path):
+    md = rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path).encode("utf-8")
+    full_cmd = rt._md_to_docx_cmd(None) + [f"--reference-doc={SAMPLE_DOCX}", "-o", "-"]
+    full = subprocess.run(full_cmd, input=md, capture_output=True, cwd=tmp_path, check=True).stdout
+    slim_cmd = rt._md_to_docx_cmd(SAMPLE_DOCX) + ["-o", "-"]
+    assert str(SAMPLE_DOCX) not in " ".join(slim_cmd)
+    slim = subprocess.run(slim_cmd, input=md, capture_output=True, cwd=tmp_path, check=True).stdout
+
+    with zipfile.ZipFile(io.BytesIO(full)) as a, zipfile.ZipFile(io.BytesIO(slim)) as b:
+        assert a.namelist() == b.namelist()
+        for part in ("word/document.xml", "word/styles.xml", "word/numbering.xml", "word/header1.xml"):
+            assert a.read(part) == b.read(part)
+
+
+def test_in_memory_conversions_match_file_based(tmp_path):
+    from_file = rt.docx_to_md(SAMPLE_DOCX, tmp_path / "a.md", tmp_path / "media", link_base=tmp_path).read_text(encoding="utf-8")
+    in_memory = rt.docx_bytes_to_md(SAMPLE_DOCX.read_bytes(), tmp_path / "media", link_base=tmp_path)
+    assert in_memory == from_file
+
+    md = tmp_path / "skip.md"
+    md.write_text(rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "skip", tmp_path, image_mode="skip"), encoding="utf-8")
+    docx = rt.md_bytes_to_docx(md.read_bytes(), SAMPLE_DOCX)
+    with zipfile.ZipFile(io.BytesIO(docx)) as a, zipfile.ZipFile(rt.md_to_docx(md, tmp_path / "a.docx", SAMPLE_DOCX)) as b:
+        assert a.namelist() == b.namelist()
+        for part in ("word/document.xml", "word/styles.xml", "word/numbering.xml"):
+            assert a.read(part) == b.read(part)
+
+
+def test_stream_docx_to_md_yields_front_matter_first(tmp_path):
+    chunks = list(rt.stream_docx_to_md(SAMPLE_DOCX, tmp_path / "media", tmp_path))
+    assert chunks[0].startswith(b"---\n") and chunks[0].endswith(b"---\n\n")
+    assert b"".join(chunks).decode("utf-8") == rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path)
+
+
+def test_stream_md_to_docx_yields_a_docx_and_can_be_abandoned():
+    md = b"# Title\n\n" + b"Some text.\n\n" * 2000
+    docx = b"".join(rt.stream_md_to_docx(md))
+    assert "word/document.xml" in zipfile.ZipFile(io.BytesIO(docx)).namelist()
+
+    stream = rt.stream_pandoc(["pandoc", "--from=markdown", "--to=html"], md, "MD->HTML", chunk_size=1024)
+    assert next(stream)
+    stream.close()  # kills pandoc; must not raise or hang
+
+
+def test_stream_pandoc_reports_failures():
+    with pytest.raises(RuntimeError, match="pandoc MD->X failed"):
+        b"".join(rt.stream_pandoc(["pandoc", "--from=markdown", "--to=no-such-format"], b"x", "MD->X"))
+
+
+def test_batch_refuses_stdout_output(tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text(json.dumps({"input": str(SAMPLE_DOCX)}) + "\n")
+    proc = subprocess.run(
+        [sys.executable, str(ROOT / "docx_md_roundtrip.py"), "batch", str(manifest), "-o", "-"],
+        capture_output=True, cwd=tmp_path,
+    )
+    assert proc.returncode == 2
+    assert not (tmp_path / "-").exists()
+
+
+def test_batch_into_a_nested_out_dir_does_not_reconvert_its_outputs(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    shutil.copy(SAMPLE_DOCX, src / "sow.docx")
+    (src / "notes.md").write_text("# Notes\n\nSome text.\n", encoding="utf-8")
+    cmd = [sys.executable, str(ROOT / "docx_md_roundtrip.py"), "batch", str(src), "-o", str(src / "out"), "-j", "2"]
+    for _ in range(2):
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=tmp_path)
+        assert proc.returncode == 0, proc.stderr
+        assert "Converted 2/2 file(s)" in proc.stdout
+    assert sorted(p.name for p in (src / "out").iterdir() if p.is_file()) == ["notes.docx", "report.jsonl", "sow.md"]
+    assert not (src / "out" / "out").exists()
+
+
+def test_batch_reference_problems_only_fail_the_jobs_that_use_it(tmp_path):
+    md = tmp_path / "notes.md"
+    md.write_text("# Notes\n", encoding="utf-8")
+    jobs = rt.batch_jobs(tmp_path, tmp_path / "out")
+    jobs.append({**jobs[0], "input": str(SAMPLE_DOCX), "output": str(tmp_path / "out" / "sow.md"), "direction": "to-md"})
+    ok, failed = rt.run_batch(jobs, tmp_path / "out" / "report.jsonl", workers=2, reference_docx=tmp_path / "missing.docx")
+    assert (ok, failed) == (1, 1)
+    records = {Path(r["input"]).name: r for r in map(json.loads, (tmp_path / "out" / "report.jsonl").read_text().splitlines())}
+    assert records[SAMPLE_DOCX.name]["status"] == "ok"
+    assert records["notes.md"]["status"] == "error" and "missing.docx" in records["notes.md"]["error"]
+
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text(json.dumps({"input": str(md)}) + "\n")
+    proc = subprocess.run(
+        [sys.executable, str(ROOT / "docx_md_roundtrip.py"), "batch", str(manifest), "-o", str(tmp_path / "o2"), "--ref", str(tmp_path / "missing.docx")],
+        capture_output=True, text=True,
+    )
+    assert proc.returncode == 2 and "reference DOCX not found" in proc.stderr and "Traceback" not in proc.stderr
+
+
+def _killed_mid_file(job):
+    os._exit(1)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="patches the worker function through fork")
+def test_batch_records_jobs_lost_to_a_dead_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(rt, "_batch_convert", _killed_mid_file)
+    jobs = [{"input": f"in{i}.md", "output": f"out{i}.docx", "direction": "to-docx", "ref": None, "media_dir": "media"} for i in range(3)]
+    assert rt.run_batch(jobs, tmp_path / "report.jsonl", workers=2) == (0, 3)
+    records = [json.loads(line) for line in (tmp_path / "report.jsonl").read_text().splitlines()]
+    assert sorted(r["input"] for r in records) == ["in0.md", "in1.md", "in2.md"]
+    assert all(r["status"] == "error" and r["error"].startswith("BrokenProcessPool") for r in records)
+
+
+def test_async_api_matches_sync_and_cancellation_kills_pandoc(tmp_path):
+    md = b"# Title\n\n" + b"Some text.\n\n" * 2000
+
+    async def run():
+        rt.configure_concurrency(2)
+        try:
+            markdown, *docxs = await asyncio.gather(
+                rt.async_docx_bytes_to_md(SAMPLE_DOCX.read_bytes(), tmp_path / "media", tmp_path),
+                *(rt.async_md_bytes_to_docx(md) for _ in range(4)),
+            )
+            assert markdown == rt.docx_to_markdown(SAMPLE_DOCX, tmp_path / "media", tmp_path)
+            assert all("word/document.xml" in zipfile.ZipFile(io.BytesIO(d)).namelist() for d in docxs)
+
+            started = asyncio.Event()
+
+            async def consume():
+                stream = rt.async_stream_pandoc(["pandoc", "--from=markdown", "--to=html"], md * 20, "MD->HTML", 1024)
+                async with contextlib.aclosing(stream):
+                    async for _ in stream:
+                        started.set()
+                        await asyncio.sleep(3600)
+
+            task = asyncio.create_task(consume())
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert rt._pandoc_slot()._value == 2  # the slot came back, pandoc is gone
+        finally:
+            rt.configure_concurrency(None)
+
+    asyncio.run(run())
+
+
+def test_configure_concurrency_default_honours_the_environment(monkeypatch):
+    monkeypatch.setenv("DOCX_MD_MAX_PANDOC", "3")
+    try:
+        assert rt.configure_concurrency(5) == 5
+        assert rt.configure_concurrency(None) == 3
+        monkeypatch.delenv("DOCX_MD_MAX_PANDOC")
+        assert rt.configure_concurrency(None) == rt.DEFAULT_MAX_PANDOC
+        assert rt.configure_concurrency(1) == 1
+        for bad in (0, -2):
+            with pytest.raises(ValueError, match="at least 1"):
+                rt.configure_concurrency(bad)
+        assert rt._max_pandoc == 1  # a rejected cap changes nothing
+    finally:
+        rt.configure_concurrency(None)
+
+
+def test_metrics_spans_are_json_lines(tmp_path):
+    metrics = tmp_path / "metrics.jsonl"
+    rt.configure_metrics(metrics)
+    try:
+        md = rt.docx_to_md(SAMPLE_DOCX, tmp_path / "out.md", tmp_path / "media")
+        rt.md_to_docx(md, tmp_path / "out.docx", SAMPLE_DOCX)
+    finally:
+        rt.configure_metrics(None)
+
+    spans = {s["span"]: s for s in map(json.loads, metrics.read_text(encoding="utf-8").splitlines())}
+    assert {"collect_styles", "mammoth", "html_to_md", "docx_to_md", "reference", "pandoc_md_to_docx", "md_to_docx"} <= set(spans)
+    assert spans["collect_styles"]["styles"] > 0 and spans["mammoth"]["images"] > 0
+    assert spans["docx_to_md"]["bytes_out"] == md.stat().st_size
+    assert spans["md_to_docx"]["bytes_out"] == (tmp_path / "out.docx").stat().st_size
+    assert all(s["seconds"] >= 0 for s in spans.values())
+
+
+def test_translate_docx_keeps_markup_and_reuses_the_sidecar(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # images link relative to the working directory, as with to-md
+    sent = []
+
+    def upper(segments, language):
+        sent.append(list(segments))
+        return [s.upper() for s in segments]
+
+    out = tmp_path / "out.docx"
+    counts = rt.translate_docx(SAMPLE_DOCX, out, "xx", upper, out_md=tmp_path / "out.md", batch_size=16)
+    assert counts["translated"] == counts["distinct"] > 16 and len(sent) > 1
+    assert all(len(batch) <= 16 for batch in sent)
+
+    source = rt.docx_to_markdown(SAMPLE_DOCX, Path("media"), Path("."))
+    translated = (tmp_path / "out.md").read_text(encoding="utf-8")
+    assert rt.split_front_matter(translated)[0] == rt.split_front_matter(source)[0]
+    assert sorted(rt.CUSTOM_STYLE.findall(translated)) == sorted(rt.CUSTOM_STYLE.findall(source))
+    assert sorted(rt.MEDIA_NAME.findall(translated)) == sorted(rt.MEDIA_NAME.findall(source))
+    assert "Services Statement of Work".upper() in translated
+    assert zipfile.is_zipfile(out)
+
+    sent.clear()
+    assert rt.translate_docx(SAMPLE_DOCX, out, "xx", upper)["translated"] == 0 and not sent
+
+    known = rt.load_translation_sidecar(out.with_name("out.docx.translations.json"), "xx")
+    edited = source.replace("Services Statement of Work", "Services Statement of Works", 1)
+    _, _, counts = rt.translate_markdown(edited, "xx", upper, known)
+    assert counts["translated"] == 1 and sent == [["Services Statement of Works"]]
+    assert rt.load_translation_sidecar(out.with_name("out.docx.translations.json"), "yy") == {}
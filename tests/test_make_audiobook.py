@@ -0,0 +1,169 @@
+import argparse
+import json
+import re
+import shutil
+import subprocess
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+pytest.importorskip("pyloudnorm")
+
+import make_audiobook as ab  # noqa: E402
+import run_xtts  # noqa: E402
+
+RATE = 16000
+SKIP = re.compile(ab.DEFAULT_SKIP_STYLES, re.IGNORECASE)
+
+MARKDOWN = """\
+::: {custom-style="TOC 1"}
+[Scope](#scope)
+:::
+
+[Scope](#scope) [Fees](#fees)
+
+# Scope
+
+::: {custom-style="Heading 2"}
+Styled *heading*
+:::
+
+First sentence. Second **one**.
+
+- item one
+- item [two](https://example.com)
+
+| Name | Value |
+|------|-------|
+| a    | 1     |
+
+# Fees {#fees}
+"""
+
+
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="pandoc not on PATH")
+def test_walk_blocks_reads_headings_paragraphs_lists_and_tables():
+    ast = subprocess.run(["pandoc", "--from=markdown", "--to=json"], input=MARKDOWN.encode(), capture_output=True, check=True).stdout
+    blocks = json.loads(ast)["blocks"]
+    assert list(ab.walk_blocks(blocks, False, SKIP)) == [
+        (1, "Scope"),
+        (2, "Styled heading"),
+        (0, "First sentence. Second one."),
+        (0, "item one"),
+        (0, "item two"),
+        (0, "Name; Value"),
+        (0, "a; 1"),
+        (1, "Fees"),
+    ]
+    assert (0, "a; 1") not in list(ab.walk_blocks(blocks, True, SKIP))
+
+
+def test_plan_segments_pauses_and_blocks():
+    blocks = [(0, "Intro."), (1, "Scope"), (0, "First sentence. Second one."), (0, "Last.")]
+    segments = ab.plan_segments(blocks, heading_pause=1000, paragraph_pause=500, sentence_pause=150)
+    assert [(s.text, s.pause_ms, s.heading, s.block) for s in segments] == [
+        ("Intro.", 1000, 0, 0),  # a heading follows
+        ("Scope", 1000, 1, 1),
+        ("First sentence.", 150, 0, 2),
+        ("Second one.", 500, 0, 2),
+        ("Last.", 500, 0, 3),
+    ]
+
+
+class FakeCache:
+    """The part of AudioCache assemble uses: get(key) -> (rate, PCM)."""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, key):
+        return self.entries[key]
+
+
+def tone(seconds, amplitude, rate=RATE):
+    t = np.arange(int(seconds * rate)) / rate
+    return run_xtts.to_pcm16((amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+
+
+def read_wav(path):
+    with wave.open(str(path)) as w:
+        return w.getframerate(), np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").astype(np.float32) / 32768
+
+
+def test_assemble_normalizes_paragraphs_and_indexes_chapters(tmp_path):
+    segments = [
+        ab.Segment("Intro", 200, 0, "intro", block=0),
+        ab.Segment("Chapter one", 300, 1, "h1", block=1),
+        ab.Segment("Loud sentence.", 100, 0, "loud", block=2),
+        ab.Segment("Quiet sentence.", 200, 0, "quiet", block=2),
+        ab.Segment("Sub heading", 300, 2, "h2", block=3),
+        ab.Segment("Chapter two", 0, 1, "h1b", block=4),
+    ]
+    cache = FakeCache({
+        "intro": (RATE, tone(1.0, 0.1)),
+        "h1": (RATE, tone(1.0, 0.5)),
+        "loud": (RATE, tone(1.0, 0.4)),
+        "quiet": (RATE, tone(1.0, 0.1)),
+        "h2": (RATE, tone(1.0, 0.2)),
+        "h1b": (RATE, tone(1.0, 0.3)),
+    })
+    index = ab.assemble(segments, cache, tmp_path / "book.wav", -23.0, 1, "Doc")
+    rate, audio = read_wav(tmp_path / "book.wav")
+    assert rate == RATE and index["sample_rate"] == RATE
+    assert len(audio) == 6 * RATE + int(1.1 * RATE) and index["duration_s"] == 7.1
+    assert [(c["title"], c["start_s"], c["end_s"], c["segment"]) for c in index["chapters"]] == [
+        ("Doc", 0.0, 1.2, 0),
+        ("Chapter one", 1.2, 6.1, 1),
+        ("Chapter two", 6.1, 7.1, 5),
+    ]
+
+    def rms(start_s, seconds=1.0):
+        part = audio[int(start_s * RATE):int((start_s + seconds) * RATE)]
+        return float(np.sqrt(np.mean(part ** 2)))
+
+    # one gain per paragraph: its sentences keep their 4:1 balance ...
+    loud, quiet = rms(2.5), rms(3.6)
+    assert loud / quiet == pytest.approx(4.0, rel=0.01)
+    # ... and each block, pauses included, lands on the target
+    meter = run_xtts.pyln.Meter(RATE)
+    assert meter.integrated_loudness(audio[int(2.5 * RATE):int(4.6 * RATE)].astype(np.float64)) == pytest.approx(-23.0, abs=0.3)
+    assert meter.integrated_loudness(audio[:RATE].astype(np.float64)) == pytest.approx(-23.0, abs=0.3)
+    assert not (tmp_path / "book.wav.tmp").exists()
+
+    cache.entries["h2"] = (22050, tone(1.0, 0.2, 22050))
+    with pytest.raises(RuntimeError, match="segment 4 has sample rate 22050"):
+        ab.assemble(segments, cache, tmp_path / "bad.wav", None, 1, "Doc")
+
+
+def test_render_resumes_from_the_segment_store(tmp_path):
+    store = tmp_path / "book.wav.parts"
+    segments = [ab.Segment(text, 150) for text in ("One.", "Two.", "One.")]
+    cache = run_xtts.AudioCache(memory_bytes=0, disk_dir=store, disk_bytes=1 << 62)
+    for seg in segments:
+        seg.key = cache.key(seg.text, None, "en", "ckpt")
+    assert segments[0].key == segments[2].key and not cache.has(segments[0].key)
+    cache.put(segments[0].key, RATE, tone(0.5, 0.1))
+    cache.put(segments[1].key, RATE, tone(0.5, 0.1))
+
+    # a later run opens the same store: nothing is left to render, so no model is loaded
+    resumed = run_xtts.AudioCache(memory_bytes=0, disk_dir=store, disk_bytes=1 << 62)
+    assert all(resumed.has(seg.key) for seg in segments)
+    ab.render(segments, resumed, argparse.Namespace(workers=1, threads=None, model_path=None, config_path=None, device=None))
+    index = ab.assemble(segments, resumed, tmp_path / "book.wav", None, 1, "Doc")
+    assert index["duration_s"] == 1.95
+
+
+def test_write_ffmetadata_escapes_titles(tmp_path):
+    index = {"chapters": [{"title": "Scope; fees = 1#", "start_s": 0.0, "end_s": 1.5}, {"title": "Next", "start_s": 1.5, "end_s": 3.0}]}
+    ab.write_ffmetadata(index, tmp_path / "book.ffmetadata")
+    assert (tmp_path / "book.ffmetadata").read_text().splitlines() == [
+        ";FFMETADATA1",
+        "[CHAPTER]", "TIMEBASE=1/1000", "START=0", "END=1500", "title=Scope\\; fees \\= 1\\#",
+        "[CHAPTER]", "TIMEBASE=1/1000", "START=1500", "END=3000", "title=Next",
+    ]
@@ -0,0 +1,195 @@
+import argparse
+import json
+import shutil
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import prep_xtts_data as prep  # noqa: E402
+
+RATE = 16000
+
+
+def speech(seconds, rng):
+    """Noise-modulated 150 Hz tone: loud enough and busy enough to count as speech."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 150 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)) + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def silence(seconds, rng):
+    return (0.001 * rng.standard_normal(int(seconds * RATE))).astype(np.float32)
+
+
+def test_vad_regions_finds_pauses_and_merges_short_regions():
+    rng = np.random.default_rng(0)
+    parts = [silence(1, rng), speech(4, rng), silence(1, rng), speech(0.8, rng), silence(0.6, rng), speech(3, rng), silence(0.1, rng), speech(2, rng), silence(1, rng)]
+    regions = prep.vad_regions(np.concatenate(parts), RATE, max_len=15.0)
+    # the 0.8 s region joins a neighbour, the 0.1 s pause is bridged
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert 800 <= s1 <= 1000 and e2 >= 12400
+    assert all(end - start <= 15000 for start, end in regions)
+
+
+def test_vad_regions_split_long_speech_instead_of_dropping_it():
+    rng = np.random.default_rng(1)
+    parts = []
+    for _ in range(8):  # 8 x 5 s of speech with only 150 ms breaths between them
+        parts += [speech(5, rng), silence(0.15, rng)]
+    samples = np.concatenate(parts)
+    regions = prep.vad_regions(samples, RATE, max_len=12.0)
+    assert len(regions) >= 4 and all(end - start <= 12000 for start, end in regions)
+    covered = sum(end - start for start, end in regions)
+    assert covered >= 0.95 * len(samples) / RATE * 1000  # nothing lost
+    assert all(a[1] <= b[0] for a, b in zip(regions, regions[1:]))
+
+
+def test_vad_regions_ignore_background_noise():
+    rng = np.random.default_rng(2)
+    assert prep.vad_regions(silence(5, rng), RATE, max_len=15.0) == []
+    assert prep.vad_regions(np.zeros(100, dtype=np.float32), RATE, max_len=15.0) == []
+
+
+def write_wav(path, samples, rate, channels=1):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.repeat(samples, channels) * 32767).astype("<i2").tobytes())
+
+
+def test_prepare_file_cuts_clips_from_a_memory_map(tmp_path):
+    rng = np.random.default_rng(3)
+    samples = np.concatenate([silence(1, rng), speech(3, rng), silence(1, rng)])
+    write_wav(tmp_path / "mono.wav", samples, RATE)
+    write_wav(tmp_path / "stereo.wav", samples, RATE, channels=2)
+
+    pcm, rate = prep.open_pcm(tmp_path / "mono.wav", tmp_path / "unused.tmp")
+    assert isinstance(pcm, np.memmap) and rate == RATE and len(pcm) == len(samples)
+    assert not (tmp_path / "unused.tmp").exists()  # already mono 16-bit: mapped in place
+    stereo, _ = prep.open_pcm(tmp_path / "stereo.wav", tmp_path / "stereo.tmp")
+    assert np.array_equal(np.asarray(stereo), np.asarray(pcm))
+
+    prep.init_worker(vad=True, max_len=15.0, sample_rate=22050)
+    clips = tmp_path / "clips"
+    clips.mkdir()
+    entry = prep.prepare_file(("k" * 64, str(tmp_path / "mono.wav"), "Whole text.", str(clips)))
+    assert entry["seconds"] == round(len(samples) / RATE, 3)
+    assert [c["text"] for c in entry["clips"]] == ["Whole text."]  # one region: the transcript applies
+    assert 3.0 <= entry["clips"][0]["seconds"] < 3.5  # trimmed to the speech
+    with wave.open(str(clips / entry["clips"][0]["file"])) as w:
+        assert (w.getframerate(), w.getnchannels()) == (22050, 1)
+        out = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").astype(np.float32) / 32768
+    assert abs(20 * np.log10(np.sqrt(np.mean(out ** 2))) + 20) < 0.5  # normalized to -20 dBFS
+    assert not list(clips.glob("*.tmp"))
+
+
+def make_sources(tmp_path, lines):
+    """Write one short speech file per transcript line; lines are (name, text, seed)."""
+    raw = tmp_path / "raw"
+    raw.mkdir(exist_ok=True)
+    for name, _, seed in lines:
+        rng = np.random.default_rng(seed)
+        write_wav(raw / name, np.concatenate([silence(0.2, rng), speech(1 + seed % 3, rng)]), RATE)
+    write_transcript(tmp_path, lines)
+    return raw
+
+
+def write_transcript(tmp_path, lines):
+    (tmp_path / "transcripts.tsv").write_text("".join(f"{name}\t{text}\n" for name, text, _ in lines), encoding="utf-8")
+
+
+def run_prep(tmp_path, out="out", workers=1):
+    prep.main(argparse.Namespace(
+        input_dir=str(tmp_path / "raw"), transcript_file=str(tmp_path / "transcripts.tsv"), output_dir=str(tmp_path / out),
+        speaker="spk1", language="en", max_len=15.0, vad=False, sample_rate=22050, progress_json=True, workers=workers,
+    ))
+
+
+def progress_events(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def metadata(out):
+    return (out / "metadata.csv").read_text(encoding="utf-8").splitlines()
+
+
+def test_prep_skips_unchanged_sources_and_resumes(tmp_path, capsys):
+    lines = [("a.wav", "First line.", 1), ("b.wav", "Second line.", 2), ("c.wav", "Third line.", 3)]
+    make_sources(tmp_path, lines)
+    out = tmp_path / "out"
+    run_prep(tmp_path)
+    events = progress_events(capsys)
+    assert [e["files_done"] for e in events] == [1, 2, 3] and events[-1]["percent"] == 100.0
+    assert metadata(out) == [f"wavs/{i:04d}.wav|{text}|spk1|en" for i, (_, text, _) in enumerate(lines, 1)]
+    stamps = {f.name: f.stat().st_mtime_ns for f in (out / "clips").iterdir()}
+
+    run_prep(tmp_path)  # nothing changed: one final event so the job still reaches 100%
+    assert progress_events(capsys) == [{
+        "event": "progress", "files_done": 0, "files_total": 0, "files_skipped": 3, "percent": 100.0,
+        "audio_seconds": 0.0, "audio_seconds_per_s": 0.0, "eta_s": None,
+    }]
+    assert {f.name: f.stat().st_mtime_ns for f in (out / "clips").iterdir()} == stamps
+
+    # a crash after b.wav was recorded but before its clip was kept, and an edited transcript line
+    manifest = json.loads((out / "manifest.json").read_text())
+    (out / "clips" / manifest["sources"]["b.wav"]["clips"][0]["file"]).unlink()
+    lines[2] = ("c.wav", "Third line, corrected.", 3)
+    write_transcript(tmp_path, lines)
+    run_prep(tmp_path)
+    events = progress_events(capsys)
+    assert [(e["files_done"], e["files_total"], e["files_skipped"]) for e in events] == [(1, 2, 1), (2, 2, 1)]
+    assert metadata(out)[2] == "wavs/0003.wav|Third line, corrected.|spk1|en"
+    assert len(list((out / "clips").glob("*.wav"))) == 3  # the superseded clip of c.wav is gone
+
+
+def test_prep_numbers_clips_in_transcript_order(tmp_path, capsys):
+    lines = [("a.wav", "First line.", 1), ("b.wav", "Second line.", 2), ("c.wav", "Third line.", 3)]
+    make_sources(tmp_path, lines)
+    out = tmp_path / "out"
+    run_prep(tmp_path)
+    clips = {name: (out / "wavs" / f"{i:04d}.wav").read_bytes() for i, (name, _, _) in enumerate(lines, 1)}
+
+    lines.reverse()  # reordered only: renumbered from the manifest, nothing reprocessed
+    write_transcript(tmp_path, lines)
+    run_prep(tmp_path)
+    assert progress_events(capsys)[-1]["files_skipped"] == 3
+    assert metadata(out) == [f"wavs/{i:04d}.wav|{text}|spk1|en" for i, (_, text, _) in enumerate(lines, 1)]
+    for i, (name, _, _) in enumerate(lines, 1):
+        assert (out / "wavs" / f"{i:04d}.wav").read_bytes() == clips[name]
+
+
+def test_prep_keeps_identical_sources_apart(tmp_path, capsys):
+    make_sources(tmp_path, [("a.wav", "Same line.", 1)])
+    shutil.copy(tmp_path / "raw" / "a.wav", tmp_path / "raw" / "b.wav")
+    write_transcript(tmp_path, [("a.wav", "Same line.", 1), ("b.wav", "Same line.", 1)])
+    out = tmp_path / "out"
+    run_prep(tmp_path)
+    assert metadata(out) == ["wavs/0001.wav|Same line.|spk1|en", "wavs/0002.wav|Same line.|spk1|en"]
+    manifest = json.loads((out / "manifest.json").read_text())
+    assert manifest["sources"]["a.wav"]["clips"] and manifest["sources"]["b.wav"]["clips"]
+    assert len(list((out / "clips").glob("*.wav"))) == 2
+
+    run_prep(tmp_path)
+    assert progress_events(capsys)[-1]["files_skipped"] == 2
+    assert len(metadata(out)) == 2
+
+
+def test_prep_output_does_not_depend_on_the_worker_count(tmp_path, capsys):
+    # longer files first, so parallel workers finish out of transcript order
+    lines = [(f"s{i}.wav", f"Line {i}.", seed) for i, seed in enumerate([5, 2, 4, 1, 3, 0])]
+    make_sources(tmp_path, lines)
+    run_prep(tmp_path, "serial", workers=1)
+    run_prep(tmp_path, "parallel", workers=3)
+    serial, parallel = tmp_path / "serial", tmp_path / "parallel"
+    assert metadata(parallel) == metadata(serial)
+    assert len(metadata(serial)) == len(lines)
+    names = sorted(f.name for f in (serial / "wavs").iterdir())
+    assert sorted(f.name for f in (parallel / "wavs").iterdir()) == names
+    for name in names:
+        assert (parallel / "wavs" / name).read_bytes() == (serial / "wavs" / name).read_bytes()
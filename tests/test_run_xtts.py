@@ -0,0 +1,108 @@
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+pytest.importorskip("pyloudnorm")
+
+import run_xtts  # noqa: E402
+
+
+def test_split_sentences_caps_length():
+    assert run_xtts.split_sentences("Hello there. How are you?\nFine!") == ["Hello there.", "How are you?", "Fine!"]
+    long = "word, " * 80 + "end. Next one."
+    parts = run_xtts.split_sentences(long)
+    assert parts[-1] == "Next one." and all(len(p) <= run_xtts.MAX_SENTENCE_CHARS for p in parts)
+    assert " ".join(parts) == " ".join(long.split())
+
+
+def test_audio_cache_tiers_and_eviction(tmp_path):
+    key = run_xtts.AudioCache.key
+    assert key("Hello  world", None, "en", "ck") == key("Hello world", None, "en", "ck")
+    assert key("Hello world", None, "en", "ck") != key("Hello world", None, "en", "ck", lufs=-16.0)
+    assert key("Hello world", None, "en", "ck") != key("Hello world", None, "de", "ck")
+
+    cache = run_xtts.AudioCache(memory_bytes=30, disk_dir=tmp_path, disk_bytes=50)
+    keys = [key(f"Sentence {i}.", None, "en", "ck") for i in range(3)]
+    assert cache.get(keys[0]) is None
+    for k in keys:
+        cache.put(k, 24000, bytes(20))  # 24 bytes per entry: one fits in memory, two on disk
+    assert cache.get(keys[2]) == (24000, bytes(20))  # memory
+    assert cache.get(keys[1]) == (24000, bytes(20))  # disk, promoted to memory
+    assert cache.get(keys[0]) is None  # evicted from both
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 2)
+    assert stats["hit_rate"] == 0.5 and stats["disk_bytes"] <= 50 and stats["memory_bytes"] <= 30
+
+    # a fresh process sees the disk tier
+    assert run_xtts.AudioCache(disk_dir=tmp_path).get(keys[2]) == (24000, bytes(20))
+
+
+class FakeTTS:
+    """Stands in for a loaded XTTS model: a 200 Hz tone with a 7 kHz burst in the middle."""
+
+    class synthesizer:
+        output_sample_rate = 24000
+
+    def tts(self, text, language, **kwargs):
+        t = np.arange(24000) / 24000
+        wav = 0.3 * np.sin(2 * np.pi * 200 * t)
+        wav[10000:14000] += 0.3 * np.sin(2 * np.pi * 7000 * t[10000:14000])
+        return wav.tolist()
+
+
+def band_rms(wav, rate, lo, hi):
+    spectrum = np.abs(np.fft.rfft(wav))
+    freqs = np.fft.rfftfreq(len(wav), 1 / rate)
+    return float(np.sqrt(np.mean(spectrum[(freqs >= lo) & (freqs < hi)] ** 2)))
+
+
+def test_postprocess_in_place_deesses_and_normalizes():
+    wav = np.asarray(FakeTTS().tts("", "en"), dtype=np.float32)
+    before = wav.copy()
+    assert run_xtts.postprocess(wav, 24000, deesser=True) is wav
+    assert band_rms(wav, 24000, 6500, 7500) < 0.5 * band_rms(before, 24000, 6500, 7500)
+    assert abs(band_rms(wav, 24000, 150, 250) / band_rms(before, 24000, 150, 250) - 1) < 0.05
+
+    run_xtts.postprocess(wav, 24000, lufs=-20.0)
+    assert abs(run_xtts.pyln.Meter(24000).integrated_loudness(wav) + 20.0) < 0.1
+    short = np.full(2400, 0.1, dtype=np.float32)  # under one 400 ms block: left alone
+    assert np.array_equal(run_xtts.normalize_loudness(short, 24000, -20.0), np.full(2400, 0.1, dtype=np.float32))
+
+
+def test_deess_is_block_wise_with_bounded_memory(monkeypatch):
+    rng = np.random.default_rng(0)
+    rate = 24000
+    wav = (0.1 * rng.standard_normal(60 * rate)).astype(np.float32)  # one minute of hiss
+    monkeypatch.setattr(run_xtts, "DEESS_BLOCK_FRAMES", 1 << 20)  # one block: the whole clip at once
+    whole = run_xtts.deess(wav.copy(), rate)
+    monkeypatch.setattr(run_xtts, "DEESS_BLOCK_FRAMES", 7)  # many blocks, boundaries everywhere
+    assert np.allclose(run_xtts.deess(wav.copy(), rate), whole, atol=1e-6)
+
+    def peak_bytes(clip):
+        tracemalloc.start()
+        try:
+            run_xtts.deess(clip, rate)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    monkeypatch.setattr(run_xtts, "DEESS_BLOCK_FRAMES", 1024)
+    long = np.tile(wav, 4)
+    one_minute, four_minutes = peak_bytes(wav), peak_bytes(long)
+    assert four_minutes < 1.2 * one_minute  # a few ~10 s blocks, whatever the length
+    assert four_minutes < long.nbytes // 2
+
+
+def test_synthesize_writes_pcm_without_a_decode_pass():
+    rate, pcm = run_xtts.synthesize_pcm(FakeTTS(), "Hello.", deesser=True, lufs=-20.0)
+    assert rate == 24000 and len(pcm) == 2 * 24000
+    wav = run_xtts.synthesize(FakeTTS(), "Hello.")
+    assert wav[:4] == b"RIFF" and len(wav) == 44 + 2 * 24000
+    peak = np.max(np.abs(np.frombuffer(wav[44:], dtype="<i2")))
+    assert peak >= 32000  # peak-normalized, as tts_to_file writes it
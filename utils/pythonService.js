@@ -18,6 +18,7 @@ function loadProto(filename) {
 
 const translationProto = loadProto('translation.proto');
 const ttsProto = loadProto('tts.proto');
+const convertProto = loadProto('convert.proto');
 
 const translationClient = new translationProto.TranslationService(
   process.env.PYTHON_GRPC_ADDR || 'localhost:50051',
@@ -29,6 +30,11 @@ const ttsClient = new ttsProto.TTSService(
   grpc.credentials.createInsecure()
 );
 
+const convertClient = new convertProto.ConvertService(
+  process.env.PYTHON_GRPC_ADDR || 'localhost:50051',
+  grpc.credentials.createInsecure()
+);
+
 function translate(text, target_language) {
   return new Promise((resolve, reject) => {
     translationClient.Translate({ text, target_language }, (err, resp) => {
@@ -38,13 +44,55 @@ function translate(text, target_language) {
   });
 }
 
-function synthesize(text, voice) {
+// Translates many segments in one call; resolves to { segments, memory_hits, translated }
+// with segments in request order.
+function translateBatch(segments, target_language) {
+  return new Promise((resolve, reject) => {
+    translationClient.TranslateBatch({ segments, target_language }, (err, resp) => {
+      if (err) return reject(err);
+      resolve(resp);
+    });
+  });
+}
+
+function synthesize(text, voice, language) {
   return new Promise((resolve, reject) => {
-    ttsClient.Synthesize({ text, voice }, (err, resp) => {
+    ttsClient.Synthesize({ text, voice: voice || '', language: language || '' }, (err, resp) => {
       if (err) return reject(err);
       resolve(resp.audio);
     });
   });
 }
 
-module.exports = { translate, synthesize };
+// Streams synthesized speech sentence by sentence. Calls onFormat({ sample_rate,
+// channels, encoding }) once, before the first onAudio(pcmBuffer, sentenceIndex, text).
+// Resolves when the last sentence has arrived; call.cancel() on the returned
+// `call` stops synthesis early.
+function synthesizeStream(text, voice, language, { onFormat, onAudio } = {}) {
+  const call = ttsClient.SynthesizeStream({ text, voice: voice || '', language: language || '' });
+  const done = new Promise((resolve, reject) => {
+    call.on('data', (chunk) => {
+      if (chunk.format && onFormat) onFormat(chunk.format);
+      if (onAudio) onAudio(chunk.pcm, chunk.sentence, chunk.text);
+    });
+    call.on('end', resolve);
+    call.on('error', reject);
+  });
+  return { call, done };
+}
+
+function convert(direction, buffer, referenceDocx) {
+  return new Promise((resolve, reject) => {
+    const done = (err, resp) => {
+      if (err) return reject(err);
+      resolve(direction === 'to-md' ? resp.markdown : resp.docx);
+    };
+    if (direction === 'to-md') {
+      convertClient.DocxToMd({ docx: buffer }, done);
+    } else {
+      convertClient.MdToDocx({ markdown: buffer, reference_docx: referenceDocx || Buffer.alloc(0) }, done);
+    }
+  });
+}
+
+module.exports = { translate, translateBatch, synthesize, synthesizeStream, convert };
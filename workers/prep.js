@@ -29,11 +29,12 @@ const worker = new Worker(
       '--language',
       language,
       '--sample-rate',
-      String(sampleRate),
+      String(sampleRate || 22050),
       '--max-len',
       String(maxLen || 15),
     ];
     if (vad) args.push('--vad');
+    args.push('--progress-json');
 
     const logDir = path.join('logs', 'jobs');
     fs.mkdirSync(logDir, { recursive: true });
@@ -44,7 +45,24 @@ const worker = new Worker(
       const child = spawn(python, args, {
         env: { ...process.env, JOB_ID: job.id, REQUEST_ID: requestId || '' },
       });
-      child.stdout.on('data', (d) => logStream.write(d.toString()));
+      // one JSON line per finished source file: { percent, files_done, files_total, audio_seconds_per_s, eta_s, ... }
+      let pending = '';
+      child.stdout.on('data', (d) => {
+        const text = d.toString();
+        logStream.write(text);
+        const lines = (pending + text).split('\n');
+        pending = lines.pop();
+        for (const line of lines) {
+          try {
+            const evt = JSON.parse(line);
+            if (evt.event === 'progress') {
+              job.updateProgress(evt);
+            }
+          } catch {
+            // ignore non-JSON lines
+          }
+        }
+      });
       child.stderr.on('data', (d) => logStream.write(d.toString()));
       child.on('close', (code) => {
         logStream.end();